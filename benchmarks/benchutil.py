@@ -0,0 +1,147 @@
+"""
+Helpers shared by the client benchmarks.
+
+The emulated STC ReST API server is run in a child process, so that the work
+it does is not measured as client overhead, and does not contend with the
+client for the interpreter lock.
+
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+try:
+    clock = time.perf_counter
+    cpu_clock = time.process_time
+except AttributeError:
+    clock = time.time
+    cpu_clock = time.clock
+
+
+class EmulatorProcess(object):
+
+    """
+    STC ReST API emulator running in a child process.
+
+    Arguments:
+    latency      -- Seconds the emulator waits before each response.
+    per_kb       -- Additional seconds per KiB of request and response body.
+    jitter       -- Random variation of the wait, as a fraction of it.
+    seed         -- Seed of the random variation.
+    object_attrs -- Extra attributes given to each object.
+
+    """
+
+    def __init__(self, latency=0.0, per_kb=0.0, jitter=0.0, seed=0,
+                 object_attrs=0):
+        self.host = '127.0.0.1'
+        self.port = None
+        self._args = ['--host', self.host, '--port', '0',
+                      '--latency', str(latency), '--per-kb', str(per_kb),
+                      '--jitter', str(jitter), '--seed', str(seed),
+                      '--object-attrs', str(object_attrs)]
+        self._proc = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            p for p in (REPO_DIR, env.get('PYTHONPATH')) if p)
+        self._proc = subprocess.Popen(
+            [sys.executable, '-m', 'stcrestclient.stcemulator'] + self._args,
+            stdout=subprocess.PIPE, env=env)
+        line = self._proc.stdout.readline().decode('utf-8')
+        m = re.search(r':(\d+)/stcapi', line)
+        if m is None:
+            self.stop()
+            raise RuntimeError('emulator did not start: %r' % line)
+        self.port = int(m.group(1))
+
+    def stop(self):
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc.stdout.close()
+            self._proc = None
+
+
+def percentile(sorted_samples, q):
+    """Return q-th percentile (0 to 100) of sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    k = (len(sorted_samples) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_samples) - 1)
+    return sorted_samples[lo] + (
+        sorted_samples[hi] - sorted_samples[lo]) * (k - lo)
+
+
+def platform_info():
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'system': platform.system()}
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results, meta=None):
+    doc = {'platform': platform_info(), 'results': results}
+    if meta:
+        doc.update(meta)
+    with open(path, 'w') as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, metrics):
+    """Return list of (name, metric, base, current) regressions.
+
+    Arguments:
+    results  -- Dictionary of {name: {metric: value}} just measured.
+    baseline -- Baseline document with the same kind of results.
+    metrics  -- Dictionary of {metric: (higher_is_better, threshold)} to
+                compare, where threshold is the fraction the metric may get
+                worse before it is a regression.
+
+    """
+    regressions = []
+    base_results = baseline.get('results', {})
+    for name, current in sorted(results.items()):
+        base = base_results.get(name)
+        if not base:
+            continue
+        for metric, (higher_is_better, threshold) in metrics.items():
+            b = base.get(metric)
+            c = current.get(metric)
+            if not b or c is None:
+                continue
+            if higher_is_better:
+                worse = c < b * (1.0 - threshold)
+            else:
+                worse = c > b * (1.0 + threshold)
+            if worse:
+                regressions.append((name, metric, b, c))
+    return regressions
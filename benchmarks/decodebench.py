@@ -0,0 +1,207 @@
+"""
+Benchmark of decoding large JSON responses.
+
+A bulkget-shaped response, a list of objects that each have a handle and 5
+string attributes, is decoded by RestHttp._handle_response, with and without
+to_lower, as StcHttp does for every response.  The walk cases decode the same
+body the way responses were decoded before the parsed data was returned as
+is: parsed, then rebuilt by walking every value.  No server is involved, so
+the time is all client CPU.
+
+Usage:
+    python benchmarks/decodebench.py                # run and print results
+    python benchmarks/decodebench.py --compare      # compare with baseline
+    python benchmarks/decodebench.py --save         # update baseline
+
+Timings depend on the machine, so compare against a baseline saved on the
+same machine.  Peak memory does not, and is the most reliable signal.
+
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import requests
+
+import benchutil
+from stcrestclient import resthttp
+
+DEFAULT_BASELINE = os.path.join(benchutil.BENCH_DIR,
+                                'decodebench_baseline.json')
+
+# Numbers of objects in the decoded responses.
+DEFAULT_OBJECTS = (10000, 100000)
+
+# Metrics compared with the baseline, as {metric: (higher_is_better,
+# threshold)}.  See microbench.COMPARE_METRICS.
+COMPARE_METRICS = {'p50_ms': (False, 0.5), 'peak_mb': (False, 0.1)}
+
+# Metrics that fail a comparison when they regress.
+GATE_METRICS = ('peak_mb',)
+
+
+def make_body(count):
+    """Return JSON body of a bulkget response with count objects."""
+    objects = [{'handle': 'emulateddevice%d' % i,
+                'Name': 'Device %d' % i,
+                'Active': 'true',
+                'RouterId': '192.0.%d.%d' % (i // 256 % 256, i % 256),
+                'DeviceCount': '1',
+                'Tag': 'Group %d' % (i % 10)}
+               for i in range(count)]
+    return json.dumps({'objects': objects}).encode('utf-8')
+
+
+def make_response(body):
+    rsp = requests.Response()
+    rsp.status_code = 200
+    rsp.headers['content-type'] = 'application/json'
+    rsp._content = body
+    return rsp
+
+
+def op_decode(rest, rsp):
+    rest._handle_response(rsp)
+
+
+def op_decode_lower(rest, rsp):
+    rest._handle_response(rsp, True)
+
+
+def op_walk(rest, rsp):
+    rest._conv_to_str3(rsp.json(), False)
+
+
+def op_walk_lower(rest, rsp):
+    rest._conv_to_str3(rsp.json(), True)
+
+
+CASES = (
+    ('decode', op_decode),
+    ('decode_lower', op_decode_lower),
+    ('walk', op_walk),
+    ('walk_lower', op_walk_lower),
+)
+
+
+def measure(rest, rsp, op, repeat):
+    """Return dictionary of metrics of decoding a response."""
+    op(rest, rsp)
+    samples = []
+    for _ in range(repeat):
+        t = benchutil.clock()
+        op(rest, rsp)
+        samples.append(benchutil.clock() - t)
+    samples.sort()
+    result = {'runs': repeat,
+              'p50_ms': benchutil.percentile(samples, 50) * 1000.0,
+              'min_ms': samples[0] * 1000.0}
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            op(rest, rsp)
+            result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def print_results(results, names, baseline=None):
+    cols = ('p50_ms', 'min_ms', 'peak_mb')
+    print('%-22s %10s %10s %10s' % ('case', 'p50 ms', 'min ms', 'peak MB'))
+    base = (baseline or {}).get('results', {})
+    for name in names:
+        r = results[name]
+        print('%-22s %10.1f %10.1f %10.1f' % (
+            (name,) + tuple(r.get(c, 0.0) for c in cols)))
+        b = base.get(name)
+        if b:
+            changes = tuple(_change(b.get(c), r.get(c)) for c in cols)
+            print('%-22s %10s %10s %10s' % (('  vs baseline',) + changes))
+
+
+def _change(base, current):
+    if not base or current is None:
+        return '-'
+    return '%+.0f%%' % ((current - base) / base * 100.0)
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description='Measure decoding of large JSON responses.')
+    ap.add_argument('--objects',
+                    default=','.join(str(n) for n in DEFAULT_OBJECTS),
+                    help='Comma-separated numbers of objects in responses '
+                    '(default %(default)s).')
+    ap.add_argument('-n', '--repeat', type=int, default=5,
+                    help='Timed decodes of each case (default 5).')
+    ap.add_argument('--cases', help='Comma-separated cases to run.')
+    ap.add_argument('--baseline', default=DEFAULT_BASELINE,
+                    help='Baseline file (default %(default)s).')
+    ap.add_argument('--save', action='store_true',
+                    help='Save results as the new baseline.')
+    ap.add_argument('--compare', action='store_true',
+                    help='Compare with baseline, and exit with status 1 if '
+                    'peak memory regressed.')
+    ap.add_argument('--threshold', type=float,
+                    help='Fraction any metric may get worse before it is a '
+                    'regression, instead of the default of each metric.')
+    ap.add_argument('--strict', action='store_true',
+                    help='Fail comparison on regression of any metric.')
+    args = ap.parse_args()
+
+    cases = CASES
+    if args.cases:
+        wanted = args.cases.split(',')
+        cases = [(name, op) for name, op in CASES if name in wanted]
+
+    rest = resthttp.RestHttp('http://127.0.0.1/stcapi')
+    results = {}
+    names = []
+    for count in (int(n) for n in args.objects.split(',')):
+        rsp = make_response(make_body(count))
+        for case, op in cases:
+            name = '%s_%dk' % (case, count // 1000)
+            results[name] = measure(rest, rsp, op, args.repeat)
+            names.append(name)
+
+    baseline = None
+    if args.compare:
+        baseline = benchutil.load_baseline(args.baseline)
+    print_results(results, names, baseline)
+
+    if args.save:
+        benchutil.save_baseline(args.baseline, results,
+                                {'repeat': args.repeat})
+        print('saved baseline:', args.baseline)
+
+    if baseline is not None:
+        metrics = COMPARE_METRICS
+        if args.threshold is not None:
+            metrics = dict((m, (better, args.threshold))
+                           for m, (better, _) in metrics.items())
+        regressions = benchutil.compare(results, baseline, metrics)
+        failed = False
+        for name, metric, base, current in regressions:
+            gate = args.strict or metric in GATE_METRICS
+            failed = failed or gate
+            print('%s: %s %s %.3f -> %.3f' % (
+                'REGRESSION' if gate else 'warning', name, metric, base,
+                current))
+        if failed:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""
+Microbenchmarks of the per-call overhead of StcHttp operations.
+
+Each operation is called repeatedly against the STC ReST API emulator, with
+no emulated latency, and the calls per second, p50 and p99 latency, client
+CPU time per call, and memory allocated per call are reported.  Since the
+emulator runs in a separate process, client CPU time per call is the client
+overhead of the operation.
+
+Usage:
+    python benchmarks/microbench.py                 # run and print results
+    python benchmarks/microbench.py --compare       # compare with baseline
+    python benchmarks/microbench.py --save          # update baseline
+
+Timings depend on the machine, so compare against a baseline saved on the
+same machine.  Allocations do not, and are the most reliable signal.
+
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import benchutil
+from stcrestclient import stchttp, stcpythonrest
+
+DEFAULT_BASELINE = os.path.join(benchutil.BENCH_DIR,
+                                'microbench_baseline.json')
+
+# Size of files downloaded and uploaded.
+FILE_SIZE = 64 * 1024
+
+# Metrics compared with the baseline, as {metric: (higher_is_better,
+# threshold)}, where threshold is the fraction the metric may get worse before
+# it is a regression.  Timings are noisy, even on one machine.
+COMPARE_METRICS = {'calls_per_sec': (True, 0.5), 'p50_ms': (False, 0.5),
+                   'p99_ms': (False, 1.0), 'cpu_us': (False, 0.5),
+                   'alloc_kb': (False, 0.1)}
+
+# Metrics that fail a comparison when they regress.  Regressions of other
+# metrics are reported as warnings, unless --strict is given.
+GATE_METRICS = ('alloc_kb',)
+
+
+class Context(object):
+
+    """Session and objects that the operations use."""
+
+    def __init__(self, emu, work_dir):
+        self.work_dir = work_dir
+        self.stc = stchttp.StcHttp(emu.host, emu.port)
+        self.stc.new_session('bench', 'microbench')
+        self.port = self.stc.create('port', 'project1',
+                                    location='//10.1.1.1/1/1')
+        self.src_file = os.path.join(work_dir, 'bench.bin')
+        with open(self.src_file, 'wb') as f:
+            f.write(os.urandom(FILE_SIZE))
+        self.stc.upload(self.src_file)
+        self.save_path = os.path.join(work_dir, 'download.bin')
+
+        os.environ['STC_SERVER_PORT'] = str(emu.port)
+        self.adapter = stcpythonrest.StcPythonRest()
+        self.adapter_stc = self.adapter.new_session(
+            emu.host, 'microbench', 'bench', existing_session='join')
+
+    def close(self):
+        self.adapter_stc.end_session(None)
+        self.stc.end_session(timeout=0)
+
+
+def op_get(ctx, i):
+    ctx.stc.get(ctx.port, 'name')
+
+
+def op_config(ctx, i):
+    ctx.stc.config(ctx.port, name='port %d' % i)
+
+
+def op_create(ctx, i):
+    ctx.stc.create('emulateddevice', 'project1', name='dev %d' % i)
+
+
+def op_perform(ctx, i):
+    ctx.stc.perform('GetObjectsCommand', ClassName='port',
+                    PropertyList='name location')
+
+
+def op_bulkget(ctx, i):
+    ctx.stc.bulkget('port', ['name', 'location'])
+
+
+def op_bulkcreate(ctx, i):
+    ctx.stc.bulkcreate('emulateddevice', {
+        'name': 'bulk %d' % i, 'ipv4if': {'Address': '10.0.0.1'}})
+
+
+def op_download(ctx, i):
+    ctx.stc.download('bench.bin', ctx.save_path)
+
+
+def op_upload(ctx, i):
+    ctx.stc.upload(ctx.src_file, 'upload.bin')
+
+
+def op_adapter_get(ctx, i):
+    ctx.adapter.get(ctx.port, 'name')
+
+
+def op_adapter_config(ctx, i):
+    ctx.adapter.config(ctx.port, name='port %d' % i)
+
+
+def op_make_url(ctx, i):
+    ctx.stc._rest.make_url('objects', ctx.port)
+
+
+OPERATIONS = (
+    ('get', op_get),
+    ('config', op_config),
+    ('create', op_create),
+    ('perform', op_perform),
+    ('bulkget', op_bulkget),
+    ('bulkcreate', op_bulkcreate),
+    ('download', op_download),
+    ('upload', op_upload),
+    ('adapter_get', op_adapter_get),
+    ('adapter_config', op_adapter_config),
+    ('make_url', op_make_url),
+)
+
+
+def measure(ctx, op, iterations, warmup, alloc_calls):
+    """Return dictionary of metrics of an operation."""
+    for i in range(warmup):
+        op(ctx, i)
+
+    samples = []
+    clock = benchutil.clock
+    cpu_start = benchutil.cpu_clock()
+    start = clock()
+    for i in range(iterations):
+        t = clock()
+        op(ctx, i)
+        samples.append(clock() - t)
+    elapsed = clock() - start
+    cpu = benchutil.cpu_clock() - cpu_start
+
+    samples.sort()
+    result = {
+        'calls': iterations,
+        'calls_per_sec': iterations / elapsed if elapsed else 0.0,
+        'p50_ms': benchutil.percentile(samples, 50) * 1000.0,
+        'p99_ms': benchutil.percentile(samples, 99) * 1000.0,
+        'cpu_us': cpu / iterations * 1e6,
+    }
+
+    if (alloc_calls and tracemalloc is not None and
+            hasattr(tracemalloc, 'reset_peak')):
+        tracemalloc.start()
+        try:
+            total = 0
+            for i in range(alloc_calls):
+                current = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                op(ctx, i)
+                total += tracemalloc.get_traced_memory()[1] - current
+        finally:
+            tracemalloc.stop()
+        result['alloc_kb'] = total / alloc_calls / 1024.0
+    return result
+
+
+def print_results(results, baseline=None):
+    cols = ('calls_per_sec', 'p50_ms', 'p99_ms', 'cpu_us', 'alloc_kb')
+    print('%-16s %10s %9s %9s %11s %10s' % (
+        'operation', 'calls/s', 'p50 ms', 'p99 ms', 'cpu us/call',
+        'alloc KiB'))
+    base = (baseline or {}).get('results', {})
+    for name, _ in OPERATIONS:
+        r = results.get(name)
+        if r is None:
+            continue
+        print('%-16s %10.1f %9.3f %9.3f %11.1f %10.1f' % (
+            (name,) + tuple(r.get(c, 0.0) for c in cols)))
+        b = base.get(name)
+        if b:
+            changes = tuple(_change(b.get(c), r.get(c)) for c in cols)
+            print('%-16s %10s %9s %9s %11s %10s' % (
+                ('  vs baseline',) + changes))
+
+
+def _change(base, current):
+    if not base or current is None:
+        return '-'
+    return '%+.0f%%' % ((current - base) / base * 100.0)
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description='Measure per-call overhead of StcHttp operations.')
+    ap.add_argument('-n', '--iterations', type=int, default=300,
+                    help='Calls of each operation to time (default 300).')
+    ap.add_argument('--warmup', type=int, default=20,
+                    help='Calls of each operation before timing.')
+    ap.add_argument('--alloc-calls', type=int, default=50,
+                    help='Calls of each operation to trace allocations of.')
+    ap.add_argument('--ops', help='Comma-separated operations to run.')
+    ap.add_argument('--baseline', default=DEFAULT_BASELINE,
+                    help='Baseline file (default %(default)s).')
+    ap.add_argument('--save', action='store_true',
+                    help='Save results as the new baseline.')
+    ap.add_argument('--compare', action='store_true',
+                    help='Compare with baseline, and exit with status 1 if '
+                    'allocations regressed.')
+    ap.add_argument('--threshold', type=float,
+                    help='Fraction any metric may get worse before it is a '
+                    'regression, instead of the default of each metric.')
+    ap.add_argument('--strict', action='store_true',
+                    help='Fail comparison on regression of any metric.')
+    args = ap.parse_args()
+
+    ops = OPERATIONS
+    if args.ops:
+        wanted = args.ops.split(',')
+        ops = [(name, op) for name, op in OPERATIONS if name in wanted]
+
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix='stcbench')
+    try:
+        with benchutil.EmulatorProcess() as emu:
+            ctx = Context(emu, work_dir)
+            try:
+                for name, op in ops:
+                    results[name] = measure(ctx, op, args.iterations,
+                                            args.warmup, args.alloc_calls)
+            finally:
+                ctx.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        baseline = benchutil.load_baseline(args.baseline)
+    print_results(results, baseline)
+
+    if args.save:
+        benchutil.save_baseline(args.baseline, results,
+                                {'iterations': args.iterations})
+        print('saved baseline:', args.baseline)
+
+    if baseline is not None:
+        metrics = COMPARE_METRICS
+        if args.threshold is not None:
+            metrics = dict((m, (better, args.threshold))
+                           for m, (better, _) in metrics.items())
+        regressions = benchutil.compare(results, baseline, metrics)
+        failed = False
+        for name, metric, base, current in regressions:
+            gate = args.strict or metric in GATE_METRICS
+            failed = failed or gate
+            print('%s: %s %s %.3f -> %.3f' % (
+                'REGRESSION' if gate else 'warning', name, metric, base,
+                current))
+        if failed:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
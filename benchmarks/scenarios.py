@@ -0,0 +1,277 @@
+"""
+Scenario benchmarks comparing ways to build, query, modify, and delete a
+configuration.
+
+A configuration of ports, each with emulated devices running BGP, each
+advertising route blocks, is handled by each strategy:
+
+    loop -- One request per object, using create, get, config, and delete.
+    cmd  -- DeviceCreateCommand to create devices, GetObjectsCommand to
+            query, and DeleteCommand to delete.
+    bulk -- The bulk API: bulkcreateex, bulkget, bulkconfig, and bulkdelete.
+
+For each strategy and phase, the wall time, number of requests, and bytes
+sent and received are reported.  Each strategy runs in its own session of
+the STC ReST API emulator, run in a child process.
+
+Usage:
+    python benchmarks/scenarios.py --ports 2 --devices 100 --routes 4
+    python benchmarks/scenarios.py --latency 0.002 --strategies loop,bulk
+
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+import benchutil
+from stcrestclient import stchttp
+
+PHASES = ('build', 'query', 'modify', 'delete')
+
+
+class Scenario(object):
+
+    """
+    Configuration scale, and checks of what each phase produced.
+
+    Arguments:
+    ports   -- Number of ports.
+    devices -- Emulated devices per port.
+    routes  -- BGP route blocks per device.
+
+    """
+
+    def __init__(self, ports, devices, routes):
+        self.ports = ports
+        self.devices = devices
+        self.routes = routes
+
+    @property
+    def total_routes(self):
+        return self.ports * self.devices * self.routes
+
+    def route_attrs(self, p, d, r):
+        return {'Name': 'route %d.%d.%d' % (p, d, r),
+                'AsPath': '%d%d%d' % (p, d, r)}
+
+    def block_attrs(self, p, d, r):
+        return {'StartIpList': '10.%d.%d.%d' % (p, d % 256, r % 256)}
+
+    def check_routes(self, routes):
+        """Raise error if query did not return every route."""
+        if len(routes) != self.total_routes:
+            raise RuntimeError('query returned %d routes, expected %d' %
+                               (len(routes), self.total_routes))
+
+
+class LoopStrategy(object):
+
+    name = 'loop'
+
+    def build(self, stc, sc):
+        for p in range(sc.ports):
+            port = stc.create('port', 'project1',
+                              location='//10.0.0.1/1/%d' % (p + 1))
+            for d in range(sc.devices):
+                dev = stc.create('EmulatedDevice', 'project1', {
+                    'Name': 'device %d.%d' % (p, d),
+                    'AffiliationPort-targets': port})
+                bgp = stc.create('BgpRouterConfig', dev, AsNum='1111')
+                for r in range(sc.routes):
+                    route = stc.create('BgpIpv4RouteConfig', bgp,
+                                       sc.route_attrs(p, d, r))
+                    stc.create('Ipv4NetworkBlock', route,
+                               sc.block_attrs(p, d, r))
+
+    def query(self, stc, sc):
+        routes = {}
+        for port in stc.get('project1', 'children-port').split():
+            for dev in stc.get(port, 'affiliationport-sources').split():
+                bgp = stc.get(dev, 'children-bgprouterconfig')
+                if not bgp:
+                    continue
+                for route in stc.get(
+                        bgp, 'children-bgpipv4routeconfig').split():
+                    routes[route] = {
+                        'Name': stc.get(route, 'Name'),
+                        'StartIpList': stc.get(route + '.ipv4networkblock',
+                                               'StartIpList')}
+        return routes
+
+    def modify(self, stc, sc, routes):
+        for route in routes:
+            stc.config(route, AsPath='9999')
+
+    def delete(self, stc, sc):
+        for dev in stc.get('project1', 'children-emulateddevice').split():
+            stc.delete(dev)
+        for port in stc.get('project1', 'children-port').split():
+            stc.delete(port)
+
+
+class CommandStrategy(LoopStrategy):
+
+    name = 'cmd'
+
+    def build(self, stc, sc):
+        for p in range(sc.ports):
+            port = stc.create('port', 'project1',
+                              location='//10.0.0.1/1/%d' % (p + 1))
+            data = stc.perform('DeviceCreateCommand',
+                               DeviceType='EmulatedDevice',
+                               ParentList='project1', CreateCount=sc.devices,
+                               Port=port, IfStack='Ipv4If EthIIIf',
+                               IfCount='1 1')
+            for d, dev in enumerate(data['ReturnList'].split()):
+                bgp = stc.create('BgpRouterConfig', dev, AsNum='1111')
+                for r in range(sc.routes):
+                    route = stc.create('BgpIpv4RouteConfig', bgp,
+                                       sc.route_attrs(p, d, r))
+                    stc.create('Ipv4NetworkBlock', route,
+                               sc.block_attrs(p, d, r))
+
+    def query(self, stc, sc):
+        data = stc.perform('GetObjectsCommand',
+                           ClassName='BgpIpv4RouteConfig',
+                           PropertyList='Name ipv4networkblock.StartIpList')
+        return json.loads(data['PropertyValues'])
+
+    def delete(self, stc, sc):
+        handles = (stc.get('project1', 'children-emulateddevice').split() +
+                   stc.get('project1', 'children-port').split())
+        stc.perform('DeleteCommand', ConfigList=' '.join(handles))
+
+
+class BulkStrategy(object):
+
+    name = 'bulk'
+
+    def build(self, stc, sc):
+        for p in range(sc.ports):
+            port = stc.create('port', 'project1',
+                              location='//10.0.0.1/1/%d' % (p + 1))
+            devices = []
+            for d in range(sc.devices):
+                routes = []
+                for r in range(sc.routes):
+                    route = sc.route_attrs(p, d, r)
+                    route['Ipv4NetworkBlock'] = sc.block_attrs(p, d, r)
+                    routes.append(route)
+                devices.append({
+                    'object_type': 'EmulatedDevice',
+                    'Name': 'device %d.%d' % (p, d),
+                    'AffiliationPort-targets': port,
+                    'BgpRouterConfig': {'AsNum': '1111',
+                                        'BgpIpv4RouteConfig': routes}})
+            stc.bulkcreateex('project1', devices)
+
+    def query(self, stc, sc):
+        data = stc.bulkget('//bgpipv4routeconfig', depth=2)
+        routes = {}
+        for obj in data['objects']:
+            blocks = obj.get('children') or [{}]
+            routes[obj['handle']] = {
+                'Name': obj.get('Name'),
+                'StartIpList': blocks[0].get('StartIpList')}
+        return routes
+
+    def modify(self, stc, sc, routes):
+        stc.bulkconfig('//bgpipv4routeconfig', {'AsPath': '9999'})
+
+    def delete(self, stc, sc):
+        handles = (stc.get('project1', 'children-emulateddevice').split() +
+                   stc.get('project1', 'children-port').split())
+        stc.bulkdelete(' '.join(handles))
+
+
+STRATEGIES = (LoopStrategy, CommandStrategy, BulkStrategy)
+
+
+def run_strategy(emu, strategy, sc):
+    """Run phases of a strategy in a new session, and return results."""
+    stc = stchttp.StcHttp(emu.host, emu.port)
+    stc.new_session('bench', 'scenario-' + strategy.name)
+    results = {}
+    try:
+        routes = None
+        for phase in PHASES:
+            stc.reset_stats()
+            start = benchutil.clock()
+            if phase == 'query':
+                routes = strategy.query(stc, sc)
+                sc.check_routes(routes)
+            elif phase == 'modify':
+                strategy.modify(stc, sc, routes)
+            else:
+                getattr(strategy, phase)(stc, sc)
+            elapsed = benchutil.clock() - start
+            stats = stc.stats().values()
+            results[phase] = {
+                'seconds': elapsed,
+                'requests': sum(s['requests'] for s in stats),
+                'request_bytes': sum(s['request_bytes'] for s in stats),
+                'response_bytes': sum(s['response_bytes'] for s in stats)}
+    finally:
+        stc.end_session(timeout=0)
+    return results
+
+
+def print_results(sc, results):
+    print('scale: %d ports x %d devices x %d routes = %d routes' % (
+        sc.ports, sc.devices, sc.routes, sc.total_routes))
+    print('%-8s %-8s %10s %9s %11s %11s' % (
+        'strategy', 'phase', 'seconds', 'requests', 'KiB sent',
+        'KiB recv'))
+    for name, phases in results:
+        for phase in PHASES:
+            r = phases[phase]
+            print('%-8s %-8s %10.3f %9d %11.1f %11.1f' % (
+                name, phase, r['seconds'], r['requests'],
+                r['request_bytes'] / 1024.0, r['response_bytes'] / 1024.0))
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description='Compare strategies for handling large configurations.')
+    ap.add_argument('--ports', type=int, default=2,
+                    help='Number of ports (default 2).')
+    ap.add_argument('--devices', type=int, default=50,
+                    help='Emulated devices per port (default 50).')
+    ap.add_argument('--routes', type=int, default=2,
+                    help='BGP route blocks per device (default 2).')
+    ap.add_argument('--strategies', default='loop,cmd,bulk',
+                    help='Comma-separated strategies to run.')
+    ap.add_argument('--latency', type=float, default=0.0,
+                    help='Seconds the emulator waits before each response.')
+    ap.add_argument('--per-kb', type=float, default=0.0,
+                    help='Additional seconds per KiB of body.')
+    ap.add_argument('--json', metavar='FILE',
+                    help='Also write results to FILE as JSON.')
+    args = ap.parse_args()
+
+    sc = Scenario(args.ports, args.devices, args.routes)
+    wanted = args.strategies.split(',')
+    strategies = [cls() for cls in STRATEGIES if cls.name in wanted]
+    results = []
+    with benchutil.EmulatorProcess(args.latency, args.per_kb) as emu:
+        for strategy in strategies:
+            results.append((strategy.name, run_strategy(emu, strategy, sc)))
+
+    print_results(sc, results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'platform': benchutil.platform_info(),
+                       'scale': {'ports': sc.ports, 'devices': sc.devices,
+                                 'routes': sc.routes},
+                       'latency': args.latency,
+                       'results': dict(results)}, f, indent=2, sort_keys=True)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -61,6 +61,27 @@ def get_all_bgpv4_via_cmd():
     end_time = time.time()
     print(f"===>Time Taken via GetObjectsCommand:{end_time - start_time}")
 
+# Same command, with PropertyValues parsed into columns as it is received
+def get_all_bgpv4_via_query_objects():
+    start_time = time.time()
+    table = stc.query_objects("BgpIpv4RouteConfig", ["Name", "ipv4networkblock.StartIpList"])
+    names = table["Name"]
+    end_time = time.time()
+    print(f"===>Time Taken via stc.query_objects:{end_time - start_time}")
+
+# Snapshot of the configuration, searched locally
+def get_all_bgpv4_via_snapshot():
+    start_time = time.time()
+    snap = stc.snapshot("project1", depth=6)
+    for port in snap.children("project1", "port"):
+        devices = snap.related(port, "affiliationport-Sources")
+        for bgproute in snap.find("BgpIpv4RouteConfig", under=devices):
+            name = snap[bgproute].get("Name")
+            block = snap.children(bgproute, "ipv4networkblock")
+            starting_ip = snap[block[0]].get("StartIpList") if block else None
+    end_time = time.time()
+    print(f"===>Time Taken via stc.snapshot:{end_time - start_time}")
+
 def get_specified_bgpv4_via_rootlist():
     result = stc.perform("GetObjectsCommand", ClassName="BgpIpv4RouteConfig", RootList="emulateddevice1 emulateddevice2", PropertyList="Name ipv4networkblock.StartIpList")
     print("===>", result['PropertyValues'])
@@ -81,6 +102,8 @@ try:
     print("===>Finished BGP Configurations....")
     get_all_bgpv4_via_loop()
     get_all_bgpv4_via_cmd()
+    get_all_bgpv4_via_query_objects()
+    get_all_bgpv4_via_snapshot()
     get_specified_bgpv4_via_rootlist()
     get_specified_bgpv4_via_condition()
     
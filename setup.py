@@ -31,7 +31,8 @@ def main():
         entry_points={
             'console_scripts': [
                 'tccsh = stcrestclient.tccsh:main',
-                'stcinfo = stcrestclient.systeminfo:main'],
+                'stcinfo = stcrestclient.systeminfo:main',
+                'stchelpcache = stcrestclient.helpcache:main'],
         },
         install_requires=['requests>=2.7'],
         zip_safe=True,
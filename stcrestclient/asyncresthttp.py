@@ -0,0 +1,653 @@
+"""
+Asynchronous client class for performing basic ReST API interactions.
+
+AsyncRestHttp is the asyncio counterpart of resthttp.RestHttp.  The request
+methods have the same names and arguments, but are coroutines.  Requests are
+sent over a pool of persistent HTTP/1.1 connections that is implemented
+directly on asyncio streams, so many requests may be in flight at once.
+
+Requires Python 3.7 or later.
+
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import asyncio
+import json
+import os
+import ssl
+import time
+import zlib
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    from . import multipart
+    from . import resthttp
+except ValueError:
+    import multipart
+    import resthttp
+
+# Size of chunks used to read and write file content.
+CHUNK_SIZE = 16384
+
+
+class AsyncResponse(object):
+
+    """
+    Response to a request sent by AsyncRestHttp.
+
+    Provides the subset of the requests.Response interface used by RestHttp.
+
+    """
+
+    def __init__(self, url, status_code, reason, headers, content=b''):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+# Errors writing a request to a connection that the server has closed.
+_RESET_ERRORS = (BrokenPipeError, ConnectionAbortedError, ConnectionResetError)
+
+
+class _ConnectFailed(Exception):
+
+    """Connection could not be opened, so the request was not sent."""
+
+
+class _AsyncConnPool(object):
+
+    """
+    Pool of persistent connections to one or more servers.
+
+    At most size connections are open at once.  Requests beyond that wait
+    for a connection to be returned to the pool.
+
+    """
+
+    def __init__(self, size, ssl_verify, counters):
+        self._size = size
+        self._ssl_verify = ssl_verify
+        self._counters = counters
+        self._idle = {}
+        self._sem = None
+
+    async def acquire(self, scheme, host, port, rec=None):
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self._size)
+        await self._sem.acquire()
+        idle = self._idle.get((scheme, host, port))
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                self._counters.add(requests=1)
+                return reader, writer, True
+            writer.close()
+        start = time.time()
+        try:
+            ssl_ctx = None
+            if scheme == 'https':
+                ssl_ctx = ssl.create_default_context()
+                if not self._ssl_verify:
+                    ssl_ctx.check_hostname = False
+                    ssl_ctx.verify_mode = ssl.CERT_NONE
+            reader, writer = await asyncio.open_connection(host, port,
+                                                           ssl=ssl_ctx)
+        except OSError as e:
+            self._sem.release()
+            raise _ConnectFailed(e)
+        except BaseException:
+            self._sem.release()
+            raise
+        self._counters.add(requests=1, opened=1)
+        if rec is not None:
+            rec.connect += time.time() - start
+        return reader, writer, False
+
+    def release(self, scheme, host, port, reader, writer, keep):
+        if keep:
+            self._idle.setdefault((scheme, host, port), []).append(
+                (reader, writer))
+        else:
+            writer.close()
+        self._sem.release()
+
+    def close(self):
+        for conns in self._idle.values():
+            for reader, writer in conns:
+                writer.close()
+        self._idle.clear()
+
+
+class AsyncRestHttp(resthttp.RestHttp):
+
+    """
+    Asynchronous ReST API HTTP client wrapper object base class.
+
+    """
+
+    def __init__(self, base_url, user=None, password=None, ssl_verify=True,
+                 debug_print=False, timeout=None,
+                 pool_size=resthttp.DEFAULT_POOL_SIZE, retry=None,
+                 circuit_breaker=None, compress=False,
+                 compress_threshold=resthttp.DEFAULT_COMPRESS_THRESHOLD):
+        """Initialize the asynchronous ReST API HTTP wrapper object.
+
+        Arguments:
+        base_url    -- Base URL for requests.  Ex: http://example.com/stuff/
+        user        -- Optional user name for basic auth.
+        password    -- Optional password for basic auth.
+        ssl_verify  -- Set to False to disable SSL verification (not secure).
+        debug_print -- Enable debug print statements.
+        timeout     -- Number of seconds to wait for a response.
+        pool_size   -- Maximum number of connections, and so the number of
+                       requests in flight, at once.
+        retry       -- Optional resthttp.RetryPolicy for retrying requests
+                       that fail.  None to not retry.
+        circuit_breaker -- Optional resthttp.CircuitBreaker to fail fast when
+                       the server is down.
+        compress    -- Gzip compress bulk request bodies, and accept gzip
+                       compressed responses.
+        compress_threshold -- Compress bodies of at least this many bytes.
+
+        """
+        super(AsyncRestHttp, self).__init__(
+            base_url, user, password, ssl_verify, debug_print, timeout,
+            retry=retry, circuit_breaker=circuit_breaker, compress=compress,
+            compress_threshold=compress_threshold)
+        self._pool = _AsyncConnPool(pool_size, ssl_verify, self._counters)
+
+    async def close(self):
+        """Close persistent connections."""
+        self._pool.close()
+
+    async def head_request(self, container, resource=None):
+        """Send a HEAD request."""
+        url = self.make_url(container, resource)
+        rsp = await self._send('HEAD', url, headers=self._base_headers,
+                               container=container or resource)
+        return rsp.status_code
+
+    async def get_request(self, container, resource=None, query_items=None,
+                          accept=None, to_lower=False):
+        """Send a GET request."""
+        url = self.make_url(container, resource)
+        headers = self._make_headers(accept)
+
+        if query_items and isinstance(query_items, (list, tuple, set)):
+            url += resthttp.RestHttp._list_query_str(query_items)
+            query_items = None
+
+        rsp = await self._send('GET', url, params=query_items,
+                               headers=headers,
+                               container=container or resource)
+        return self._handle_response(rsp, to_lower)
+
+    async def post_request(self, container, resource=None, params=None,
+                           accept=None):
+        """Send a POST request."""
+        url = self.make_url(container, resource)
+        headers = self._make_headers(accept)
+        rsp = await self._send('POST', url, data=params, headers=headers,
+                               container=container or resource)
+        return self._handle_response(rsp)
+
+    async def put_request(self, container, resource=None, params=None,
+                          accept=None):
+        """Send a PUT request."""
+        url = self.make_url(container, resource)
+        headers = self._make_headers(accept)
+        rsp = await self._send('PUT', url, data=params, headers=headers,
+                               container=container or resource)
+        return self._handle_response(rsp)
+
+    async def delete_request(self, container, resource=None,
+                             query_items=None, accept=None):
+        """Send a DELETE request."""
+        url = self.make_url(container, resource)
+        headers = self._make_headers(accept)
+
+        if query_items and isinstance(query_items, (list, tuple, set)):
+            url += resthttp.RestHttp._list_query_str(query_items)
+            query_items = None
+
+        rsp = await self._send('DELETE', url, params=query_items,
+                               headers=headers,
+                               container=container or resource)
+        return self._handle_response(rsp)
+
+    async def bulk_get_request(self, container, resource=None,
+                               query_items=None, depth=1, accept=None,
+                               to_lower=False):
+        """Send a GET request."""
+        url = self.make_url(container, resource)
+        headers = dict(self._make_headers(accept))
+        headers["X-STC-API-Children-Depth"] = str(depth)
+
+        if query_items and isinstance(query_items, (list, tuple, set)):
+            url += resthttp.RestHttp._list_query_str(query_items)
+            query_items = None
+
+        rsp = await self._send('GET', url, params=query_items,
+                               headers=headers,
+                               container=container or resource)
+        return self._handle_response(rsp, to_lower)
+
+    async def bulk_put_request(self, container, resource=None, params=None,
+                               accept=None):
+        """Send a PUT request."""
+        url = self.make_url(container, resource)
+        headers = dict(self._make_headers(accept))
+        headers["content-type"] = "application/json"
+        rsp = await self._send_bulk('PUT', url, container, params, headers)
+        return self._handle_response(rsp)
+
+    async def bulk_post_request(self, container, resource=None, params=None,
+                                accept=None):
+        """Send a POST request."""
+        url = self.make_url(container, resource)
+        headers = dict(self._make_headers(accept))
+        headers["content-type"] = "application/json"
+        rsp = await self._send_bulk('POST', url, container, params, headers)
+        return self._handle_response(rsp)
+
+    async def download_file(self, container, resource, save_path=None,
+                            accept=None, query_items=None):
+        """Download a file, writing it to save_path as it is received."""
+        resource = resource.replace("\\", "/")
+        url = self.make_url(container, resource)
+        if not save_path:
+            save_path = resource.split('/')[-1]
+
+        headers = self._make_headers(accept)
+
+        if query_items and isinstance(query_items, (list, tuple, set)):
+            url += resthttp.RestHttp._list_query_str(query_items)
+            query_items = None
+
+        try:
+            with open(save_path, 'wb') as f:
+                rsp = await self._send('GET', url, params=query_items,
+                                       headers=headers, sink=f,
+                                       container=container)
+        except (resthttp.RestHttpError, resthttp.ConnectionError):
+            raise
+        except Exception as e:
+            raise RuntimeError('could not download file: ' + str(e))
+
+        if rsp.status_code >= 300:
+            with open(save_path, 'rb') as f:
+                text = f.read().decode('utf-8', 'replace')
+            os.remove(save_path)
+            raise resthttp.RestHttpError(rsp.status_code, rsp.reason, text)
+
+        if self._dbg_print:
+            print('===> downloaded %d bytes to %s' % (
+                os.path.getsize(save_path), save_path))
+
+        return rsp.status_code, save_path, os.path.getsize(save_path)
+
+    async def upload_file(self, container, src_file_path, dst_name=None,
+                          put=True, content_type=None):
+        """Upload a single file, reading it in chunks as it is sent."""
+        if not os.path.exists(src_file_path):
+            raise RuntimeError('file not found: ' + src_file_path)
+        if not dst_name:
+            dst_name = os.path.basename(src_file_path)
+        headers = dict(self._base_headers)
+        headers["content-length"] = str(os.path.getsize(src_file_path))
+        headers['content-disposition'] = 'attachment; filename=' + dst_name
+        if put:
+            method = 'PUT'
+            url = self.make_url(container, dst_name, None)
+        else:
+            method = 'POST'
+            url = self.make_url(container, None, None)
+        with open(src_file_path, 'rb') as up_file:
+            rsp = await self._send(method, url, headers=headers, data=up_file,
+                                   container=container)
+
+        return self._handle_response(rsp)
+
+    async def upload_file_mp(self, container, src_file_path, dst_name=None,
+                             content_type=None, progress=None):
+        """Upload a file using multi-part encoding."""
+        if not os.path.exists(src_file_path):
+            raise RuntimeError('file not found: ' + src_file_path)
+        if not dst_name:
+            dst_name = os.path.basename(src_file_path)
+        if not content_type:
+            content_type = "application/octet.stream"
+        return await self._post_files(
+            container, [('file', (dst_name, src_file_path, content_type))],
+            progress)
+
+    async def upload_files(self, container, src_dst_map, content_type=None,
+                           progress=None):
+        """Upload multiple files, opening and reading one file at a time."""
+        if not content_type:
+            content_type = "application/octet.stream"
+        multi_files = []
+        for src_path in src_dst_map:
+            dst_name = src_dst_map[src_path]
+            if not dst_name:
+                dst_name = os.path.basename(src_path)
+            multi_files.append(('files', (dst_name, src_path, content_type)))
+        return await self._post_files(container, multi_files, progress)
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _new_session(self, pool_size, pool_idle_timeout, pool_max_requests,
+                     share_pool):
+        # Requests are sent over the connections of the asyncio pool.
+        return None
+
+    async def _post_files(self, container, files, progress=None):
+        url = self.make_url(container, None, None)
+        body = multipart.MultipartEncoder(files, progress)
+        headers = dict(self._base_headers)
+        headers['content-type'] = body.content_type
+        headers['content-length'] = str(len(body))
+        try:
+            rsp = await self._send('POST', url, headers=headers, data=body,
+                                   container=container)
+        finally:
+            body.close()
+        return self._handle_response(rsp)
+
+    async def _send_bulk(self, method, url, container, params, headers):
+        """Send bulk request, with body compressed if enabled."""
+        zipped = self._compress_body(params)
+        if zipped is None:
+            return await self._send(method, url, data=params, headers=headers,
+                                    container=container)
+        body, saved = zipped
+        zheaders = dict(headers)
+        zheaders['content-encoding'] = 'gzip'
+        rsp = await self._send(method, url, data=body, headers=zheaders,
+                               container=container)
+        if not resthttp.compression_rejected(rsp):
+            self._compress_counters.add(requests=1,
+                                        request_bytes_saved=saved)
+            return rsp
+        rsp = await self._send(method, url, data=params, headers=headers,
+                               container=container)
+        self._compression_rejected(rsp.status_code)
+        return rsp
+
+    async def _send(self, method, url, params=None, data=None, headers=None,
+                    sink=None, container=None):
+        """Send a request using a persistent connection from the pool.
+
+        If sink is given, the response body is written to it instead of being
+        kept in the returned response.  If there is a retry policy, then retry
+        the request as it allows.  The container names the kind of request in
+        the request metrics.
+
+        """
+        if params:
+            p = requests.PreparedRequest()
+            p.prepare_url(url, params)
+            url = p.url
+        retry = self._retry
+        start = time.time()
+        retry_num = 0
+        while True:
+            retry_num += 1
+            if sink is not None and retry_num > 1:
+                sink.seek(0)
+                sink.truncate()
+            try:
+                rsp = await self._send_once(method, url, data, headers or {},
+                                            sink, container)
+            except (asyncio.TimeoutError, _ConnectFailed, OSError, EOFError,
+                    asyncio.IncompleteReadError) as e:
+                delay = None
+                if retry is not None:
+                    delay = retry.retry_delay(
+                        method, retry_num, time.time() - start,
+                        sent=not isinstance(e, _ConnectFailed))
+                if delay is None:
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise resthttp.ConnectionError('request timed out',
+                                                       -1, url)
+                    if isinstance(e, _ConnectFailed):
+                        e = e.args[0]
+                    raise resthttp.ConnectionError(
+                        str(e) or e.__class__.__name__,
+                        getattr(e, 'errno', None) or -1)
+            else:
+                if retry is None or rsp.status_code < 300:
+                    return rsp
+                delay = retry.retry_delay(
+                    method, retry_num, time.time() - start, rsp.status_code,
+                    retry_after=resthttp.RetryPolicy.parse_retry_after(
+                        rsp.headers.get('retry-after')))
+                if delay is None:
+                    return rsp
+            self._counters.add(retries=1)
+            await asyncio.sleep(delay)
+
+    async def _send_once(self, method, url, data, headers, sink, container):
+        breaker = self._breaker
+        if breaker is not None and breaker.before_request():
+            if breaker.probe_path:
+                await self._probe_server(breaker)
+        rec = self._metrics.start(method, container)
+        try:
+            rsp = await self._exchange_timeout(method, url, data, headers,
+                                               sink, rec)
+        except (asyncio.TimeoutError, _ConnectFailed, OSError, EOFError,
+                asyncio.IncompleteReadError):
+            if breaker is not None:
+                breaker.record_failure()
+            self._metrics.finish(rec)
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            self._metrics.finish(rec)
+            raise
+        if breaker is not None:
+            breaker.record_status(rsp.status_code)
+        rec.status = rsp.status_code
+        self._metrics.finish(rec)
+        return rsp
+
+    async def _probe_server(self, breaker):
+        """Send probe request for half-open circuit breaker."""
+        url = self.make_url(breaker.probe_path)
+        try:
+            rsp = await self._exchange_timeout('GET', url, None,
+                                               self._base_headers, None)
+        except (asyncio.TimeoutError, _ConnectFailed, OSError, EOFError,
+                asyncio.IncompleteReadError):
+            breaker.record_failure()
+            raise resthttp.CircuitOpenError(breaker.name,
+                                            breaker.reset_timeout)
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_status(rsp.status_code)
+        if breaker.state() != resthttp.CircuitBreaker.CLOSED:
+            raise resthttp.CircuitOpenError(breaker.name,
+                                            breaker.reset_timeout)
+
+    async def _exchange_timeout(self, method, url, data, headers, sink,
+                                rec=None):
+        coro = self._exchange(method, url, data, headers, sink, rec)
+        if self._timeout:
+            return await asyncio.wait_for(coro, self._timeout)
+        return await coro
+
+    async def _exchange(self, method, url, data, headers, sink, rec):
+        parts = urlparse(url)
+        scheme = parts.scheme
+        host = parts.hostname
+        port = parts.port or (443 if scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        hdrs = CaseInsensitiveDict(headers)
+        if isinstance(data, dict):
+            data = urlencode(data, doseq=True)
+            hdrs.setdefault('content-type',
+                            'application/x-www-form-urlencoded')
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if isinstance(data, bytes):
+            hdrs['content-length'] = str(len(data))
+            if rec is not None:
+                rec.request_bytes = len(data)
+        elif data is None and method in ('POST', 'PUT'):
+            hdrs['content-length'] = '0'
+        hdrs['host'] = parts.netloc
+        hdrs.setdefault('user-agent', requests.utils.default_user_agent())
+        hdrs.setdefault('accept-encoding',
+                        'gzip' if self._compress else 'identity')
+        hdrs.setdefault('connection', 'keep-alive')
+
+        head = ['%s %s HTTP/1.1' % (method, path)]
+        head.extend('%s: %s' % (k, v) for k, v in hdrs.items())
+        head = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+
+        if self._dbg_print:
+            print('===> %s %s' % (method, url))
+
+        while True:
+            reader, writer, reused = await self._pool.acquire(scheme, host,
+                                                              port, rec)
+            keep = False
+            try:
+                try:
+                    await self._write_request(writer, head, data, rec)
+                except _RESET_ERRORS:
+                    if not reused:
+                        raise
+                    # Server closed idle connection.  Retry on a new one.
+                    continue
+
+                status_line = await reader.readline()
+                if not status_line and reused:
+                    # Server closed idle connection.  Retry on a new one.
+                    continue
+                if rec is not None:
+                    rec.ttfb = time.time() - rec.start - rec.connect
+                rsp, keep = await self._read_response(
+                    reader, url, method, status_line, sink, rec)
+                return rsp
+            finally:
+                self._pool.release(scheme, host, port, reader, writer, keep)
+
+    async def _write_request(self, writer, head, data, rec):
+        writer.write(head)
+        if isinstance(data, bytes):
+            writer.write(data)
+        elif data is not None:
+            data.seek(0)
+            sent = 0
+            while True:
+                chunk = data.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                sent += len(chunk)
+                await writer.drain()
+            if rec is not None:
+                rec.request_bytes = sent
+        await writer.drain()
+
+    async def _read_response(self, reader, url, method, status_line, sink,
+                             rec=None):
+        if not status_line:
+            raise EOFError('server closed connection without response')
+        parts = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        if (len(parts) < 2 or not parts[0].startswith('HTTP/') or
+                not parts[1].isdigit()):
+            raise resthttp.ConnectionError('malformed status line', -1,
+                                           repr(status_line))
+        version, status = parts[0], int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ''
+
+        headers = CaseInsensitiveDict()
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            k, v = line.decode('latin-1').split(':', 1)
+            headers[k.strip()] = v.strip()
+
+        keep = (version == 'HTTP/1.1' and
+                headers.get('connection', '').lower() != 'close')
+        chunks = []
+        received = [0]
+        write = sink.write if sink is not None else chunks.append
+        decoder = None
+        encoding = headers.get('content-encoding', '').lower()
+        if encoding in ('gzip', 'deflate'):
+            decoder = zlib.decompressobj(
+                16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS)
+            decoded = [0]
+
+        def out(chunk):
+            received[0] += len(chunk)
+            if decoder is not None:
+                chunk = decoder.decompress(chunk)
+                decoded[0] += len(chunk)
+            write(chunk)
+
+        if method == 'HEAD' or status in (204, 304) or status < 200:
+            pass
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if not size:
+                    # Read trailers up to the terminating empty line.
+                    while (await reader.readline()) not in (b'\r\n', b''):
+                        pass
+                    break
+                out(await reader.readexactly(size))
+                await reader.readexactly(2)
+        elif 'content-length' in headers:
+            remaining = int(headers['content-length'])
+            while remaining:
+                chunk = await reader.readexactly(min(remaining, CHUNK_SIZE))
+                out(chunk)
+                remaining -= len(chunk)
+        else:
+            keep = False
+            while True:
+                chunk = await reader.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                out(chunk)
+
+        if decoder is not None:
+            tail = decoder.flush()
+            decoded[0] += len(tail)
+            write(tail)
+            self._compress_counters.add(
+                responses=1,
+                response_bytes_saved=max(decoded[0] - received[0], 0))
+        if rec is not None:
+            rec.response_bytes = received[0]
+            rec.transfer = time.time() - rec.start - rec.connect - rec.ttfb
+        content = b''.join(chunks)
+        if sink is not None and status >= 300:
+            content = b''
+        return AsyncResponse(url, status, reason, headers, content), keep
@@ -0,0 +1,806 @@
+"""
+Asynchronous STC REST API wrapper module.
+
+This module provides AsyncStcHttp, the asyncio counterpart of stchttp.StcHttp.
+The methods have the same names and arguments as those of StcHttp, but are
+coroutines, so that many calls may be in flight at once against one session:
+
+    async with AsyncStcHttp('stcserver') as stc:
+        await stc.join_session('mysession - me')
+        names = await asyncio.gather(*(stc.get(p, 'name') for p in ports))
+
+Requires Python 3.7 or later.
+
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import asyncio
+import json
+import os
+import time
+from requests.utils import quote
+
+try:
+    from . import resthttp
+    from . import asyncresthttp
+    from . import uploads
+    from .stchttp import DEFAULT_PORT, UPLOAD_PARALLEL
+except ValueError:
+    import resthttp
+    import asyncresthttp
+    import uploads
+    from stchttp import DEFAULT_PORT, UPLOAD_PARALLEL
+
+
+class AsyncStcHttp(object):
+
+    """
+    Spirent TestCenter ReST API asyncio wrapper object.
+
+    """
+
+    def __init__(self, server=None, port=None, api_version=1,
+                 debug_print=False, timeout=None,
+                 pool_size=resthttp.DEFAULT_POOL_SIZE, retry=None,
+                 circuit_breaker=False, compress=False,
+                 compress_threshold=resthttp.DEFAULT_COMPRESS_THRESHOLD):
+        """Initialize the asynchronous REST API wrapper object.
+
+        Unlike StcHttp, the server is not contacted until the first request.
+        Use the object as an async context manager, or await check_server(),
+        to check that the server is reachable.
+
+        Arguments:
+        server      -- STC REST API server to connect to. None to use environ.
+        port        -- HTTP port to connect to server on.  Use environment
+                       variable STC_SERVER_PORT or DEFAULT_PORT if None.
+        api_version -- What API version to use.
+        debug_print -- Enable debug print statements.
+        timeout     -- Number of seconds to wait for a response.
+        pool_size   -- Maximum number of requests in flight at once.
+        retry       -- Optional resthttp.RetryPolicy for retrying requests
+                       that fail.  None to not retry.
+        circuit_breaker -- True to use the circuit breaker shared by all
+                       clients of the server, or a resthttp.CircuitBreaker.
+        compress    -- Gzip compress bulk request bodies, and accept gzip
+                       compressed responses.
+        compress_threshold -- Compress bodies of at least this many bytes.
+
+        """
+        if not server:
+            server = os.environ.get('STC_SERVER_ADDRESS')
+            if not server:
+                raise RuntimeError('STC_SERVER_ADDRESS not set')
+        if not port:
+            port = os.environ.get('STC_SERVER_PORT', DEFAULT_PORT)
+
+        self._dbg_print = bool(debug_print)
+        self._server = server
+        self._port = port
+
+        url = resthttp.RestHttp.url('http', server, port, 'stcapi')
+        if circuit_breaker is True:
+            circuit_breaker = resthttp.get_circuit_breaker(
+                url, probe_path='sessions')
+        rest = asyncresthttp.AsyncRestHttp(
+            url, debug_print=debug_print, timeout=timeout,
+            pool_size=pool_size, retry=retry,
+            circuit_breaker=circuit_breaker or None, compress=compress,
+            compress_threshold=compress_threshold)
+        rest.add_header('X-Spirent-API-Version', str(api_version))
+        self._rest = rest
+        self._sid = None
+        self._api_ver = None
+        self._upload_indexes = {}
+
+    async def __aenter__(self):
+        await self.check_server()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def check_server(self):
+        """Raise RuntimeError if the server cannot be reached."""
+        try:
+            await self._rest.get_request('sessions')
+        except (OSError, resthttp.ConnectionError, resthttp.RestHttpError):
+            raise RuntimeError('Cannot connect to STC server: %s:%s' %
+                               (self._server, self._port))
+
+    async def close(self):
+        """Close persistent connections to the server."""
+        await self._rest.close()
+
+    def session_id(self):
+        return self._sid
+
+    def timeout(self):
+        """Return the current timeout value."""
+        return self._rest.timeout()
+
+    def set_timeout(self, timeout):
+        """Seconds to wait for a response.  Any zero-value means no timeout."""
+        self._rest.set_timeout(timeout)
+
+    def set_retry_policy(self, retry):
+        """Set resthttp.RetryPolicy for failed requests.  None to not retry."""
+        self._rest.set_retry_policy(retry)
+
+    def set_compression(self, enabled, threshold=None):
+        """Turn gzip compression of bulk request bodies on or off.
+
+        Arguments:
+        enabled   -- True to compress bulkcreate and bulkconfig bodies.
+        threshold -- Optional minimum size, in bytes, of bodies to compress.
+
+        """
+        self._rest.set_compression(enabled, threshold)
+
+    def compression_stats(self):
+        """Return counts of compressed requests and responses, and of bytes
+        saved by compressing them.
+
+        Return:
+        {'requests': num_compressed_requests,
+         'request_bytes_saved': num_bytes,
+         'responses': num_compressed_responses,
+         'response_bytes_saved': num_bytes,
+         'rejected': True if the server rejected a compressed body}
+
+        """
+        return self._rest.compression_stats()
+
+    def circuit_breaker(self):
+        """Return the resthttp.CircuitBreaker, or None if not using one."""
+        return self._rest.circuit_breaker()
+
+    def conn_stats(self):
+        """Return counts of requests sent, connections opened and reused, and
+        of retries.
+
+        Return:
+        {'requests': num_requests, 'opened': num_opened, 'reused': num_reused,
+         'retries': num_retries}
+
+        """
+        return self._rest.conn_stats()
+
+    def stats(self):
+        """Return latency, size, and status metrics of requests.
+
+        See StcHttp.stats().
+
+        """
+        return self._rest.stats()
+
+    def reset_stats(self):
+        """Discard collected request metrics."""
+        self._rest.reset_stats()
+
+    def prometheus_metrics(self):
+        """Return request metrics in Prometheus text exposition format."""
+        return self._rest.prometheus_metrics()
+
+    async def new_session(self, user_name=None, session_name=None,
+                          kill_existing=False, analytics=None):
+        """Create a new test session.
+
+        See StcHttp.new_session().
+
+        """
+        if self.started():
+            return False
+        if not session_name or not session_name.strip():
+            session_name = ''
+        if not user_name or not user_name.strip():
+            user_name = ''
+        params = {'userid': user_name, 'sessionname': session_name}
+        if analytics not in (None, ''):
+            params['analytics'] = str(analytics).lower()
+        try:
+            status, data = await self._rest.post_request('sessions', None,
+                                                         params)
+        except resthttp.RestHttpError as e:
+            if kill_existing and str(e).find('already exists') >= 0:
+                await self.end_session('kill',
+                                       ' - '.join((session_name, user_name)))
+            else:
+                raise RuntimeError('failed to create session: ' + str(e))
+
+            # Starting session
+            if self._dbg_print:
+                print('===> starting session')
+            status, data = await self._rest.post_request('sessions', None,
+                                                         params)
+            if self._dbg_print:
+                print('===> OK, started')
+
+        sid = data['session_id']
+        if self._dbg_print:
+            print('===> session ID:', sid)
+            print('===> URL:', self._rest.make_url('sessions', sid))
+
+        self._rest.add_header('X-STC-API-Session', sid)
+        self._sid = sid
+        return sid
+
+    async def join_session(self, sid):
+        """Attach to an existing session."""
+        self._rest.add_header('X-STC-API-Session', sid)
+        self._sid = sid
+        try:
+            status, data = await self._rest.get_request(
+                'objects', 'system1', ['version', 'name'])
+        except resthttp.RestHttpError as e:
+            self._rest.del_header('X-STC-API-Session')
+            self._sid = None
+            raise RuntimeError('failed to join session "%s": %s' % (sid, e))
+
+        return data['version']
+
+    async def end_session(self, end_tcsession=True, sid=None, timeout=30):
+        """End this test session.
+
+        See StcHttp.end_session().
+
+        """
+        if not sid or sid == self._sid:
+            if not self.started():
+                return False
+
+            sid = self._sid
+            self._sid = None
+            self._rest.del_header('X-STC-API-Session')
+
+        if end_tcsession is None:
+            if self._dbg_print:
+                print('===> detached from session')
+            return True
+
+        self._upload_indexes.pop(sid, None)
+
+        try:
+            if end_tcsession:
+                if self._dbg_print:
+                    print('===> deleting session:', sid)
+                if end_tcsession == 'kill':
+                    await self._rest.delete_request('sessions', sid, 'kill')
+                else:
+                    await self._rest.delete_request('sessions', sid)
+
+                if not timeout:
+                    return True
+
+                deadline = None
+                if timeout > 0:
+                    deadline = time.time() + timeout
+                while 1:
+                    await asyncio.sleep(5)
+                    if self._dbg_print:
+                        print('===> checking if session ended')
+                    ses_list = await self.sessions()
+                    if not ses_list or sid not in ses_list:
+                        break
+                    if deadline and deadline - time.time() <= 0:
+                        raise RuntimeError(
+                            "timeout waiting for session to stop")
+                if self._dbg_print:
+                    print('===> ok - deleted test session')
+            else:
+                # Ending client session is supported on version >= 2.1.5
+                if (await self._get_api_version()) < (2, 1, 5):
+                    raise RuntimeError('option no available on server')
+
+                await self._rest.delete_request('sessions', sid, 'false')
+                if self._dbg_print:
+                    print('===> OK - detached REST API from test session')
+        except resthttp.RestHttpError as e:
+            raise RuntimeError('failed to end session: ' + str(e))
+
+        return True
+
+    def debug_print(self):
+        return self._dbg_print
+
+    def enable_debug_print(self):
+        """Enable debug messages."""
+        self._dbg_print = True
+        self._rest.enable_debug_print()
+
+    def disable_debug_print(self):
+        """Disable debug messages."""
+        self._dbg_print = False
+        self._rest.disable_debug_print()
+
+    def started(self):
+        """Return True is session is started.  Otherwise, return False."""
+        return bool(self._sid)
+
+    async def sessions(self):
+        """Get a list of active sessions on the server."""
+        status, data = await self._rest.get_request('sessions')
+        return data
+
+    async def session_urls(self):
+        """Get a list of URLs of active sessions on the server."""
+        return [self._rest.make_url('sessions', sid)
+                for sid in await self.sessions()]
+
+    async def session_info(self, session_id=None):
+        """Get dictionary of information on session."""
+        if not session_id:
+            if not self.started():
+                return []
+            session_id = self._sid
+        status, data = await self._rest.get_request('sessions', session_id)
+        return data
+
+    async def files(self):
+        """Get list of files, for this session, on server."""
+        self._check_session()
+        status, data = await self._rest.get_request('files')
+        return data
+
+    async def file_urls(self):
+        """Get list of URLs of files, for this session, on server."""
+        return [self._rest.make_url('files', f) for f in await self.files()]
+
+    async def bll_version(self):
+        """Get the BLL version this session is connected to."""
+        if not self.started():
+            return None
+        status, data = await self._rest.get_request('objects', 'system1',
+                                                    ['version', 'name'])
+        return data['version']
+
+    async def system_info(self):
+        """Return dictionary of STC and API information."""
+        status, data = await self._rest.get_request('system')
+        return data
+
+    async def server_info(self):
+        status, data = await self._rest.get_request('objects', 'system1')
+        return data
+
+    async def apply(self):
+        """Send test configuration to chassis."""
+        self._check_session()
+        await self._rest.put_request(None, 'apply')
+
+    async def get(self, handle, *args):
+        """Returns the value(s) of one or more object attributes.
+
+        See StcHttp.get().
+
+        """
+        self._check_session()
+        status, data = await self._rest.get_request('objects', str(handle),
+                                                    args)
+        return data
+
+    async def create(self, object_type, under=None, attributes=None,
+                     **kwattrs):
+        """Create a new automation object and return its handle."""
+        data = await self.createx(object_type, under, attributes, **kwattrs)
+        return data['handle']
+
+    async def createx(self, object_type, under=None, attributes=None,
+                      **kwattrs):
+        """Create a new automation object.
+
+        Return:
+        Dictionary containing handle of newly created object.
+
+        """
+        self._check_session()
+        params = {'object_type': object_type}
+        if under:
+            params['under'] = under
+        if attributes:
+            params.update(attributes)
+        if kwattrs:
+            params.update(kwattrs)
+
+        status, data = await self._rest.post_request('objects', None, params)
+        return data
+
+    async def delete(self, handle):
+        """Delete the specified object."""
+        self._check_session()
+        await self._rest.delete_request('objects', str(handle))
+
+    async def perform(self, command, params=None, **kwargs):
+        """Execute a command.
+
+        See StcHttp.perform().
+
+        """
+        self._check_session()
+        self._clear_uploads()
+        if not params:
+            params = {}
+        if kwargs:
+            params.update(kwargs)
+        params['command'] = command
+        status, data = await self._rest.post_request('perform', None, params)
+        return data
+
+    async def config(self, handle, attributes=None, **kwattrs):
+        """Sets or modifies one or more object attributes or relations.
+
+        See StcHttp.config().
+
+        """
+        self._check_session()
+        if kwattrs:
+            if attributes:
+                attributes.update(kwattrs)
+            else:
+                attributes = kwattrs
+        await self._rest.put_request('objects', str(handle), attributes)
+
+    async def chassis(self):
+        """Get list of chassis known to test session."""
+        self._check_session()
+        status, data = await self._rest.get_request('chassis')
+        return data
+
+    async def chassis_info(self, chassis):
+        """Get information about the specified chassis."""
+        if not chassis or not isinstance(chassis, str):
+            raise RuntimeError('missing chassis address')
+        self._check_session()
+        status, data = await self._rest.get_request('chassis', chassis)
+        return data
+
+    async def connections(self):
+        """Get list of connections."""
+        self._check_session()
+        status, data = await self._rest.get_request('connections')
+        return data
+
+    async def is_connected(self, chassis):
+        """Get Boolean connected status of the specified chassis."""
+        self._check_session()
+        try:
+            status, data = await self._rest.get_request('connections',
+                                                        chassis)
+        except resthttp.RestHttpError as e:
+            if int(e) == 404:
+                # 404 NOT FOUND means the chassis in unknown, so return false.
+                return False
+            raise
+        return bool(data and data.get('IsConnected'))
+
+    async def connect(self, chassis_list):
+        """Establish connection to one or more chassis.
+
+        Return:
+        List of chassis addresses.
+
+        """
+        self._check_session()
+        if not isinstance(chassis_list, (list, tuple, set, dict, frozenset)):
+            chassis_list = (chassis_list,)
+
+        if len(chassis_list) == 1:
+            status, data = await self._rest.put_request(
+                'connections', chassis_list[0])
+            data = [data]
+        else:
+            params = {chassis: True for chassis in chassis_list}
+            params['action'] = 'connect'
+            status, data = await self._rest.post_request('connections', None,
+                                                         params)
+        return data
+
+    async def disconnect(self, chassis_list):
+        """Remove connection with one or more chassis."""
+        self._check_session()
+        if not isinstance(chassis_list, (list, tuple, set, dict, frozenset)):
+            chassis_list = (chassis_list,)
+
+        if len(chassis_list) == 1:
+            await self._rest.delete_request('connections', chassis_list[0])
+        else:
+            params = {chassis: True for chassis in chassis_list}
+            params['action'] = 'disconnect'
+            await self._rest.post_request('connections', None, params)
+
+    async def connectall(self):
+        """Establish connections to all chassis (test ports) in this session.
+
+        """
+        self._check_session()
+        await self._rest.post_request('connections', None,
+                                      {'action': 'connectall'})
+
+    async def disconnectall(self):
+        """Remove connections to all chassis (test ports) in this session.
+
+        """
+        self._check_session()
+        await self._rest.post_request('connections', None,
+                                      {'action': 'disconnectall'})
+
+    async def help(self, subject=None, args=None):
+        """Get help information about Automation API.
+
+        See StcHttp.help().
+
+        """
+        if subject:
+            if subject not in (
+                'commands', 'create', 'config', 'get', 'delete', 'perform',
+                'connect', 'connectall', 'disconnect', 'disconnectall',
+                'apply', 'log', 'help'):
+                self._check_session()
+            status, data = await self._rest.get_request('help', subject, args)
+        else:
+            status, data = await self._rest.get_request('help')
+
+        if isinstance(data, (list, tuple, set)):
+            return ' '.join((str(i) for i in data))
+        return data['message']
+
+    async def log(self, level, msg):
+        """Write a diagnostic message to a log file or to standard output."""
+        self._check_session()
+        level = level.upper()
+        allowed_levels = ('INFO', 'WARN', 'ERROR', 'FATAL')
+        if level not in allowed_levels:
+            raise ValueError('level must be one of: ' +
+                             ', '.join(allowed_levels))
+        await self._rest.post_request(
+            'log', None, {'log_level': level.upper(), 'message': msg})
+
+    async def download(self, file_name, save_as=None):
+        """Download the specified file from the server.
+
+        Return: (save_path, bytes)
+
+        """
+        self._check_session()
+        try:
+            if save_as:
+                save_as = os.path.normpath(save_as)
+                save_dir = os.path.dirname(save_as)
+                if save_dir:
+                    if not os.path.exists(save_dir):
+                        os.makedirs(save_dir)
+                    elif not os.path.isdir(save_dir):
+                        raise RuntimeError(save_dir + " is not a directory")
+
+            status, save_path, bytes = await self._rest.download_file(
+                'files', file_name, save_as, 'application/octet-stream')
+        except resthttp.RestHttpError as e:
+            raise RuntimeError('failed to download "%s": %s' % (file_name, e))
+        return save_path, bytes
+
+    async def download_all(self, dst_dir=None):
+        """Download all available files, concurrently.
+
+        Return:
+        Dictionary of {file_name: file_size, ..}
+
+        """
+        save_as = None
+        downloads = []
+        for f in await self.files():
+            if dst_dir:
+                save_as = os.path.join(dst_dir, f.split('/')[-1])
+            downloads.append(self.download(f, save_as))
+        return dict(await asyncio.gather(*downloads))
+
+    async def upload(self, src_file_path, dst_file_name=None, dedup=False):
+        """Upload the specified file to the server.
+
+        See StcHttp.upload.
+
+        """
+        self._check_session()
+        index = self._upload_index()
+        digest = None
+        if dedup:
+            digest = await asyncio.get_running_loop().run_in_executor(
+                None, index.digest, src_file_path)
+            data = index.lookup(
+                digest, dst_file_name or os.path.basename(src_file_path),
+                os.path.getsize(src_file_path))
+            if data is not None:
+                return data
+        status, data = await self._rest.upload_file(
+            'files', src_file_path, dst_file_name)
+        if isinstance(data, dict):
+            index.add(digest, data)
+        return data
+
+    async def upload_files(self, src_files, parallel=UPLOAD_PARALLEL,
+                           dedup=True):
+        """Upload multiple files at once.
+
+        See StcHttp.upload_files.
+
+        """
+        self._check_session()
+        if not isinstance(src_files, dict):
+            src_files = dict.fromkeys(src_files)
+        sem = asyncio.Semaphore(parallel)
+
+        async def upload_one(src, dst):
+            async with sem:
+                try:
+                    return src, await self.upload(src, dst, dedup)
+                except Exception as e:
+                    raise RuntimeError('failed to upload "%s": %s' % (src, e))
+
+        return dict(await asyncio.gather(
+            *(upload_one(src, dst) for src, dst in src_files.items())))
+
+    def upload_stats(self):
+        """Return counts of files uploaded to this session, and of uploads
+        skipped.  See StcHttp.upload_stats.
+
+        """
+        return self._upload_index().stats()
+
+    async def wait_until_complete(self, timeout=None, poll_interval=2):
+        """Wait until sequencer is finished.
+
+        This coroutine may be cancelled at any time, which stops the wait
+        without affecting the sequencer.
+
+        Arguments:
+        timeout       -- Optional.  Seconds to wait for sequencer to finish.
+                         If this time is exceeded, then an exception is raised.
+        poll_interval -- Seconds between checks of the sequencer state.
+
+        Return:
+        Sequencer testState value.
+
+        """
+        timeout_at = None
+        if timeout:
+            timeout_at = time.time() + int(timeout)
+
+        sequencer = await self.get('system1', 'children-sequencer')
+        while True:
+            cur_test_state = await self.get(sequencer, 'state')
+            if 'PAUSE' in cur_test_state or 'IDLE' in cur_test_state:
+                break
+            await asyncio.sleep(poll_interval)
+            if timeout_at and time.time() >= timeout_at:
+                raise RuntimeError('wait_until_complete timed out after %s sec'
+                                   % timeout)
+
+        return await self.get(sequencer, 'testState')
+
+    async def has_bulk_ops(self):
+        status, data = await self._rest.get_request('system')
+        if 'features' in data:
+            features = data['features']
+            if str(features).find('bulk-api') != -1:
+                return True
+        return False
+
+    async def bulkconfig(self, locations, attributes=None, **kwattrs):
+        """Sets or modifies attributes of objects at the given locations.
+
+        See StcHttp.bulkconfig().
+
+        """
+        self._check_session()
+        if kwattrs:
+            if attributes:
+                if isinstance(attributes, dict):
+                    attributes.update(kwattrs)
+                elif isinstance(attributes, list):
+                    for attr in attributes:
+                        attr.update(kwattrs)
+            else:
+                attributes = kwattrs
+
+        attributes = json.dumps(attributes)
+        status, data = await self._rest.bulk_put_request(
+            'bulk/objects', quote(locations), attributes)
+        return data
+
+    async def bulkcreate(self, object_type, attributes=None, **kwattrs):
+        """Create new automation objects.  See StcHttp.bulkcreate()."""
+        return await self._bulkcreateex(object_type, None, attributes,
+                                        **kwattrs)
+
+    async def bulkcreateex(self, under, attributes=None, **kwattrs):
+        return await self._bulkcreateex(None, under, attributes, **kwattrs)
+
+    async def bulkget(self, locations, args=None, depth=1):
+        """Returns attributes of objects at the given locations.
+
+        See StcHttp.bulkget().
+
+        """
+        self._check_session()
+        status, data = await self._rest.bulk_get_request(
+            'bulk/objects', quote(locations), args, depth)
+        return data
+
+    async def bulkperform(self, command, params=None, **kwargs):
+        """Execute a bulk command.  See StcHttp.bulkperform()."""
+        self._check_session()
+        self._clear_uploads()
+        if not params:
+            params = {}
+        if kwargs:
+            params.update(kwargs)
+        params['command'] = command
+        status, data = await self._rest.post_request('bulk/perform', None,
+                                                     params)
+        return data
+
+    async def bulkdelete(self, handles):
+        """Delete the specified objects."""
+        self._check_session()
+        status, data = await self._rest.delete_request('bulk/objects',
+                                                       str(handles))
+        return data
+
+    async def _bulkcreateex(self, object_type, under=None, attributes=None,
+                            **kwattrs):
+        self._check_session()
+        params = {'object_type': object_type}
+        if under:
+            params['under'] = under
+        if attributes:
+            if isinstance(attributes, dict):
+                params.update(attributes)
+                if kwattrs:
+                    params.update(kwattrs)
+            elif isinstance(attributes, list):
+                if kwattrs:
+                    for attr in attributes:
+                        attr.update(kwattrs)
+                params['bulklist'] = attributes
+        else:
+            if kwattrs:
+                params.update(kwattrs)
+
+        status, data = await self._rest.bulk_post_request(
+            'bulk/objects', None, json.dumps(params))
+        return data
+
+    def _check_session(self):
+        if not self.started():
+            raise RuntimeError('must first join session')
+
+    def _upload_index(self):
+        index = self._upload_indexes.get(self._sid)
+        if index is None:
+            index = self._upload_indexes.setdefault(self._sid,
+                                                    uploads.UploadIndex())
+        return index
+
+    def _clear_uploads(self):
+        index = self._upload_indexes.get(self._sid)
+        if index is not None:
+            index.clear()
+
+    async def _get_api_version(self):
+        if not self._api_ver:
+            try:
+                status, data = await self._rest.get_request('system')
+                v = data.get('stcapi_version')
+                if v and v.count('.') == 2:
+                    # Normalize a version string for comparison.
+                    self._api_ver = tuple(map(int, v.split('.')))
+                    if self._dbg_print:
+                        print('===> stcapi version:', v)
+                else:
+                    raise RuntimeError('failed to get stcapi_version')
+            except Exception as e:
+                if self._dbg_print:
+                    print('===>', e)
+                return (0, 0, 0)
+
+        return self._api_ver
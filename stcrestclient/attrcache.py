@@ -0,0 +1,222 @@
+"""
+Cache of object attribute values read from the STC ReST API.
+
+AttributeCache is a bounded LRU cache of values keyed by (handle, attribute).
+How long a value stays valid is set per attribute, so that attributes whose
+values change on their own, such as states and results, are not cached or are
+cached only briefly.
+
+"""
+from __future__ import absolute_import
+
+import collections
+import fnmatch
+import re
+import threading
+import time
+
+# Entries kept, unless specified.
+DEFAULT_MAX_ENTRIES = 10000
+
+# Seconds values are valid, by 'objecttype.attribute' pattern.  The object type
+# of a handle is the handle without its number, ex: 'port' for 'port1'.  A
+# value of 0 means the attribute is never cached.
+DEFAULT_TTLS = {
+    '*.state': 0,
+    '*.teststate': 0,
+    '*.status': 0,
+    '*.progress*': 0,
+    '*results.*': 0,
+    'resultdataset.*': 0,
+}
+
+_RELATION_SUFFIXES = ('-targets', '-sources')
+_HANDLE_NUM = re.compile(r'\d+$')
+
+
+class AttributeCache(object):
+
+    """
+    Bounded LRU cache of attribute values, keyed by (handle, attribute).
+
+    Arguments:
+    max_entries -- Maximum number of values kept.  The least recently used
+                   value is discarded to make room for a new one.
+    ttls        -- Dictionary of seconds values are valid, by
+                   'objecttype.attribute' pattern, with * and ? wildcards.
+                   Used in place of DEFAULT_TTLS.  A TTL of 0 means values
+                   are not cached.  Patterns are matched in lowercase.
+    default_ttl -- Seconds values not matched by any pattern are valid.
+                   None for no limit, so values are only discarded when
+                   invalidated.
+
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttls=None,
+                 default_ttl=None):
+        self.max_entries = max_entries
+        if ttls is None:
+            ttls = DEFAULT_TTLS
+        self._ttls = [(p.lower(), t) for p, t in sorted(ttls.items())]
+        self._default_ttl = default_ttl
+        self._ttl_memo = {}
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._by_handle = {}
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def generation(self):
+        """Return a number that changes whenever values are invalidated.
+
+        Pass it to put, so that a value read before an invalidation is not
+        cached after it.
+
+        """
+        return self._generation
+
+    def get(self, handle, attr):
+        """Return (True, value) if attribute value is cached, or
+        (False, None) if it is not.
+
+        """
+        key = (str(handle).lower(), attr.lower())
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.time():
+                    self._entries[key] = entry
+                    self._hits += 1
+                    return True, value
+                self._remove_index(key)
+            self._misses += 1
+        return False, None
+
+    def put(self, handle, attr, value, generation=None):
+        """Cache attribute value, unless its TTL is 0, or values have been
+        invalidated since generation.
+
+        """
+        key = (str(handle).lower(), attr.lower())
+        ttl = self._ttl(key)
+        if ttl == 0:
+            return
+        expires = None if ttl is None else time.time() + ttl
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if self._entries.pop(key, None) is None:
+                self._by_handle.setdefault(key[0], set()).add(key[1])
+            self._entries[key] = (value, expires)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                self._remove_index(old)
+                self._evictions += 1
+
+    def invalidate(self, handle, attrs=None):
+        """Discard cached values of object, or of only the given attributes.
+
+        Values of relations, of all objects, are also discarded if any of the
+        attributes is a relation, since writing a relation of one object
+        changes the relations of the objects at its other end.
+
+        """
+        handle = str(handle).lower()
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            names = self._by_handle.get(handle, ())
+            if attrs is not None:
+                lower = set(a.lower() for a in attrs)
+                names = [n for n in names if n in lower]
+                if any(a.endswith(_RELATION_SUFFIXES) for a in lower):
+                    self._discard_relations()
+            for name in list(names):
+                key = (handle, name)
+                del self._entries[key]
+                self._remove_index(key)
+
+    def invalidate_children(self, handle):
+        """Discard cached children of object, of any type."""
+        handle = str(handle).lower()
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            for name in list(self._by_handle.get(handle, ())):
+                if name.startswith('children'):
+                    key = (handle, name)
+                    del self._entries[key]
+                    self._remove_index(key)
+
+    def invalidate_relations(self):
+        """Discard cached values of relations, including children and
+        parent, of all objects.
+
+        """
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            self._discard_relations()
+
+    def clear(self):
+        """Discard all cached values."""
+        with self._lock:
+            self._generation += 1
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self._by_handle.clear()
+
+    def stats(self):
+        """Return counts of hits, misses, values evicted to make room,
+        invalidations, and values cached.
+
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {'hits': self._hits, 'misses': self._misses,
+                    'hit_ratio': self._hits / float(total) if total else 0.0,
+                    'evictions': self._evictions,
+                    'invalidations': self._invalidations,
+                    'entries': len(self._entries)}
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _ttl(self, key):
+        handle, attr = key
+        name = '%s.%s' % (_HANDLE_NUM.sub('', handle.split('.')[0]), attr)
+        try:
+            return self._ttl_memo[name]
+        except KeyError:
+            pass
+        ttl = self._default_ttl
+        for pattern, t in self._ttls:
+            if fnmatch.fnmatchcase(name, pattern):
+                ttl = t
+                break
+        self._ttl_memo[name] = ttl
+        return ttl
+
+    def _remove_index(self, key):
+        names = self._by_handle.get(key[0])
+        if names is not None:
+            names.discard(key[1])
+            if not names:
+                del self._by_handle[key[0]]
+
+    def _discard_relations(self):
+        for key in list(self._entries):
+            attr = key[1]
+            if (attr.endswith(_RELATION_SUFFIXES) or attr == 'parent' or
+                    attr.startswith('children')):
+                del self._entries[key]
+                self._remove_index(key)
@@ -0,0 +1,142 @@
+"""
+Buffering of object configuration writes, to send them as bulk requests.
+
+WriteBuffer collects the attributes written to each object, merging repeated
+writes to the same object, and sends them together when the number of objects
+or the age of the oldest write reaches a limit, or when flushed.
+
+"""
+from __future__ import absolute_import
+
+import collections
+import threading
+
+# Objects written by one bulk request.
+DEFAULT_MAX_OBJECTS = 200
+
+# Seconds a write may wait in the buffer before it is sent.
+DEFAULT_MAX_DELAY = 0.1
+
+
+class WriteBuffer(object):
+
+    """
+    Buffer of attribute writes, keyed by object handle.
+
+    Arguments:
+    send_bulk   -- Callable, send_bulk(handles, attr_list), that writes the
+                   i-th dictionary of attributes to the i-th handle.
+    send_one    -- Callable, send_one(handle, attrs), that writes attributes
+                   to one object.  Used to find which writes failed, and to
+                   send the others, when a bulk request fails.
+    max_objects -- Send writes when this many objects have been written.
+    max_delay   -- Send writes when the oldest has waited this many seconds.
+                   None to only send writes when flushed or full.
+
+    """
+
+    def __init__(self, send_bulk, send_one, max_objects=DEFAULT_MAX_OBJECTS,
+                 max_delay=DEFAULT_MAX_DELAY):
+        self._send_bulk = send_bulk
+        self._send_one = send_one
+        self.max_objects = max_objects
+        self.max_delay = max_delay
+        self._lock = threading.RLock()
+        self._writes = collections.OrderedDict()
+        self._timer = None
+        self._error = None
+        self._counts = {'writes': 0, 'merged': 0, 'requests': 0,
+                        'objects': 0, 'fallbacks': 0}
+
+    def __len__(self):
+        return len(self._writes)
+
+    def add(self, handle, attrs):
+        """Buffer attributes written to object.
+
+        Attributes written earlier to the same object, and not yet sent, are
+        replaced by those with the same name, ignoring case.
+
+        """
+        handle = str(handle)
+        with self._lock:
+            self._counts['writes'] += 1
+            current = self._writes.get(handle)
+            if current is None:
+                self._writes[handle] = dict(attrs)
+            else:
+                self._counts['merged'] += 1
+                names = set(k.lower() for k in attrs)
+                for k in [k for k in current if k.lower() in names]:
+                    del current[k]
+                current.update(attrs)
+            if len(self._writes) >= self.max_objects:
+                self._flush()
+            elif self._timer is None and self.max_delay is not None:
+                self._timer = threading.Timer(self.max_delay,
+                                              self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Send buffered writes.
+
+        Raise RuntimeError if a write, including one sent when the delay
+        expired, failed.
+
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Send buffered writes, and stop the timer, so that no write is
+        sent later when a delay expires.  Writes added after close are only
+        sent when flushed.
+
+        """
+        with self._lock:
+            self.max_delay = None
+            self._flush()
+
+    def stats(self):
+        """Return counts of writes buffered, writes merged into an earlier
+        write to the same object, bulk requests sent, objects written by
+        them, and bulk requests that failed and were sent one object at a time.
+
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+            try:
+                self._flush()
+            except RuntimeError as e:
+                self._error = e
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        error, self._error = self._error, None
+        while self._writes:
+            batch = []
+            while self._writes and len(batch) < self.max_objects:
+                batch.append(self._writes.popitem(last=False))
+            handles = [h for h, _ in batch]
+            try:
+                self._send_bulk(handles, [a for _, a in batch])
+                self._counts['requests'] += 1
+                self._counts['objects'] += len(batch)
+            except Exception:
+                self._counts['fallbacks'] += 1
+                for handle, attrs in batch:
+                    try:
+                        self._send_one(handle, attrs)
+                    except Exception as e:
+                        if error is None:
+                            error = RuntimeError(
+                                'failed to config %s: %s' % (handle, e))
+        if error is not None:
+            raise error
@@ -0,0 +1,268 @@
+"""
+Column-oriented tables of object properties and results.
+
+A ColumnTable keeps one column for each property, plus a column of keys,
+such as object handles.  Columns whose values are all integers, or all
+floating point numbers, are kept in compact arrays that NumPy and pandas use
+without copying.  Other columns are kept as lists of strings.
+
+    table = stc.query_objects('BgpIpv4RouteConfig', ['Name', 'AsPath'])
+    for handle, name in zip(table.keys, table['Name']):
+        ...
+    df = table.to_pandas()
+
+"""
+from __future__ import absolute_import
+
+import array
+import math
+import numbers
+import re
+
+try:
+    _STR_TYPES = (str, unicode)
+except NameError:
+    _STR_TYPES = (str,)
+
+_INT = re.compile(r'^-?[1-9]\d*$|^0$')
+_FLOAT = re.compile(r'^-?((0|[1-9]\d*)(\.\d*)?|\.\d+)([eE][-+]?\d+)?$')
+# Largest integer that a double holds exactly.
+_MAX_EXACT = 2 ** 53
+_NAN = float('nan')
+
+
+class Column(object):
+
+    """
+    Values of one property, in the most compact form that holds them all.
+
+    A column starts as an array of 64-bit integers, and changes to an array
+    of doubles, or to a list, when a value is appended that the current form
+    cannot hold.  Numbers given as strings are kept as numbers, except that
+    integers with leading zeros, such as '0011', are kept as strings.  If a
+    numeric column changes to a list, its values become the strings that
+    they were given as, such as '1.50' or '1e5'.  Only strings that differ
+    from the formatting of their number are kept for this.
+
+    A missing value, None, is kept as NaN in a numeric column, so a column of
+    integers with missing values changes to doubles.  NaN changes back to
+    None if the column changes to a list.
+
+    """
+
+    __slots__ = ('name', 'kind', 'values', '_text', '_ints')
+
+    def __init__(self, name):
+        self.name = name
+        self.kind = 'int'
+        self.values = array.array('q')
+        # Text of doubles that repr does not format as given, by index, and
+        # number of values that were integers before changing to doubles.
+        self._text = {}
+        self._ints = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def append(self, value):
+        kind = self.kind
+        if value is None and kind != 'str':
+            if kind == 'int':
+                self._widen('float')
+            self.values.append(_NAN)
+            return
+        if kind == 'int':
+            n = _to_int(value)
+            if n is not None:
+                try:
+                    self.values.append(n)
+                    return
+                except OverflowError:
+                    pass
+            kind = self._widen('float' if _to_float(value) is not None
+                               else 'str')
+        if kind == 'float':
+            f = _to_float(value)
+            if f is not None:
+                if isinstance(value, _STR_TYPES):
+                    text = value
+                elif isinstance(value, numbers.Integral):
+                    text = str(value)
+                else:
+                    text = None
+                if text is not None and text != repr(f):
+                    self._text[len(self.values)] = text
+                self.values.append(f)
+                return
+            kind = self._widen('str')
+        self.values.append(value)
+
+    def to_numpy(self):
+        """Return column as NumPy array.  Numeric columns share memory with
+        the column, without copying.
+
+        """
+        import numpy
+        if self.kind == 'int':
+            return numpy.frombuffer(self.values, dtype=numpy.int64)
+        if self.kind == 'float':
+            return numpy.frombuffer(self.values, dtype=numpy.float64)
+        return numpy.array(self.values, dtype=object)
+
+    def _widen(self, kind):
+        if kind == 'float' and self.kind == 'int':
+            self._ints = len(self.values)
+            self.values = array.array('d', self.values)
+        elif kind == 'str':
+            values = self.values
+            if self.kind == 'float':
+                text = self._text
+                ints = self._ints
+                self.values = [
+                    None if math.isnan(v) else text[i] if i in text else
+                    str(int(v)) if i < ints else repr(v)
+                    for i, v in enumerate(values)]
+                self._text = {}
+                self._ints = 0
+            else:
+                self.values = [str(v) for v in values]
+        self.kind = kind
+        return kind
+
+
+class ColumnTable(object):
+
+    """
+    Table of rows, each a key and values of named columns.
+
+    Arguments:
+    names -- Names of columns.  Values of a row are matched to columns by
+             name, ignoring case.
+
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.keys = []
+        self._columns = [Column(n) for n in self.names]
+        self._index = dict((n.lower(), i) for i, n in enumerate(self.names))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, name):
+        """Return Column with name, ignoring case."""
+        return self._columns[self._index[name.lower()]]
+
+    def __contains__(self, name):
+        return name.lower() in self._index
+
+    def columns(self):
+        """Return list of Column objects, in order of names."""
+        return list(self._columns)
+
+    def add_column(self, name):
+        """Add column, with None for each existing row, and return it.  If
+        there is already a column with name, ignoring case, return it.
+
+        """
+        i = self._index.get(name.lower())
+        if i is not None:
+            return self._columns[i]
+        col = Column(name)
+        for _ in self.keys:
+            col.append(None)
+        self._index[name.lower()] = len(self._columns)
+        self.names.append(name)
+        self._columns.append(col)
+        return col
+
+    def append(self, key, values, extend=False):
+        """Add row of values, given as a dictionary keyed by column name.
+        Columns missing from values get None.
+
+        Arguments:
+        key    -- Key of row, such as an object handle.
+        values -- Dictionary of {name: value}.
+        extend -- If True, add a column for each name that has none.
+                  Otherwise, values with no column are ignored.
+
+        """
+        index = self._index
+        if extend:
+            for name in values:
+                if name.lower() not in index:
+                    self.add_column(name)
+        row = [None] * len(self._columns)
+        for name, value in values.items():
+            i = index.get(name.lower())
+            if i is not None:
+                row[i] = value
+        self.keys.append(key)
+        for col, value in zip(self._columns, row):
+            col.append(value)
+
+    def rows(self):
+        """Iterate over rows as (key, {name: value}) tuples."""
+        names = self.names
+        for i, key in enumerate(self.keys):
+            yield key, dict((n, c.values[i])
+                            for n, c in zip(names, self._columns))
+
+    def to_dict(self):
+        """Return dictionary of {key: {name: value}}."""
+        return dict(self.rows())
+
+    def to_numpy(self):
+        """Return dictionary of {name: numpy_array}, with the keys under
+        'handle', or under '_key' if there is a 'handle' column.
+
+        """
+        import numpy
+        arrays = {self._key_name(): numpy.array(self.keys, dtype=object)}
+        for col in self._columns:
+            arrays[col.name] = col.to_numpy()
+        return arrays
+
+    def to_pandas(self):
+        """Return pandas.DataFrame with a column for each property, indexed
+        by key.  Numeric columns are not copied.
+
+        """
+        import pandas
+        data = dict((c.name, c.to_numpy()) for c in self._columns)
+        index = pandas.Index(self.keys, name=self._key_name())
+        return pandas.DataFrame(data, index=index, columns=self.names,
+                                copy=False)
+
+    def _key_name(self):
+        return '_key' if 'handle' in self else 'handle'
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, numbers.Integral):
+        return value
+    if isinstance(value, _STR_TYPES) and _INT.match(value):
+        return int(value)
+    return None
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        return None
+    n = _to_int(value)
+    if n is not None:
+        return float(n) if abs(n) <= _MAX_EXACT else None
+    if isinstance(value, float):
+        return value
+    if isinstance(value, _STR_TYPES) and _FLOAT.match(value):
+        return float(value)
+    return None
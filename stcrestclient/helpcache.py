@@ -0,0 +1,357 @@
+"""
+Persistent cache of Automation API help, by TestCenter version.
+
+Help text, and the object and command type metadata parsed from it, depend
+only on the BLL version of the server.  HelpCache keeps help text in files
+under a directory for each version, shared by all processes of the user:
+
+    ~/.cache/stcrestclient/<version>/
+
+so that help, completion, and validation need no requests once the cache is
+warm.  The whole cache for a version is filled by warm(), or from the command
+line:
+
+    python -m stcrestclient.helpcache server_addr
+
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import collections
+import os
+import re
+import sys
+import tempfile
+import threading
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    from urllib import quote
+
+# Directory holding a cache directory for each version, unless specified by
+# the STC_HELP_CACHE_DIR environment variable or when creating HelpCache.
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or
+    os.path.join(os.path.expanduser('~'), '.cache'), 'stcrestclient')
+
+# Number of help requests sent at once by warm.
+WARM_PARALLEL = 8
+
+# Help lists that name the types to get help on when warming the cache.
+LIST_KINDS = ('configTypes', 'commands')
+
+_COMPLETE = '.complete'
+_SECTION = re.compile(
+    r'^\s*(description|parents|children|relations|'
+    r'(writable |read-only )?(?:attributes|properties))\s*:\s*(.*)$', re.I)
+_TITLE = re.compile(r'^\s*([A-Za-z][\w.]*)\s*:\s*$')
+_ATTRIBUTE = re.compile(r'^\s*([A-Za-z][\w.-]*)\s*(?:\(([^)]*)\))?')
+
+
+def parse_help(text):
+    """Parse help text of an object or command type.
+
+    The text is expected to have sections, each beginning with a title line
+    such as "Writable Attributes:", "Read-Only Attributes:", "Parents:",
+    "Children:", or "Relations:".  Each attribute is on its own line, as the
+    name followed by an optional type in parentheses.  Names of parents,
+    children, and relations follow the title, or are on the lines after it.
+
+    Return:
+    {'name': type_name, 'description': text,
+     'attributes': {lower_name: {'name': name, 'type': type_or_None,
+                                 'readonly': bool}},
+     'parents': [type, ..], 'children': [type, ..],
+     'relations': [relation_type, ..]}
+
+    """
+    meta = {'name': None, 'description': '', 'attributes': {},
+            'parents': [], 'children': [], 'relations': []}
+    section = None
+    readonly = False
+    desc = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        m = _SECTION.match(line)
+        if m is not None:
+            title = m.group(1).lower()
+            readonly = bool(m.group(2)) and m.group(2).lower() == 'read-only '
+            section = 'attributes' if title.endswith(
+                ('attributes', 'properties')) else title
+            line = m.group(3)
+            if not line.strip():
+                continue
+        elif section is None:
+            m = _TITLE.match(line)
+            if m is not None and meta['name'] is None:
+                meta['name'] = m.group(1)
+            continue
+        if section == 'description':
+            desc.append(line.strip())
+        elif section == 'attributes':
+            m = _ATTRIBUTE.match(line)
+            if m is not None:
+                meta['attributes'][m.group(1).lower()] = {
+                    'name': m.group(1), 'type': m.group(2) or None,
+                    'readonly': readonly}
+        else:
+            meta[section].extend(re.findall(r'[A-Za-z][\w.]*', line))
+    meta['description'] = ' '.join(desc)
+    return meta
+
+
+def parse_list(text):
+    """Return type names from the text of a help list."""
+    lines = [l for l in text.splitlines() if l.strip()]
+    if len(lines) > 1:
+        # One type per line, possibly followed by a description.
+        return [l.split()[0] for l in lines]
+    return text.split()
+
+
+class HelpCache(object):
+
+    """
+    Help text for one TestCenter version, kept in memory and in files.
+
+    Files are written to a temporary name and then renamed, so that other
+    processes reading the cache never see a partly written file.  Writing
+    files is best-effort: if the directory can not be written, help is only
+    kept in memory.
+
+    Arguments:
+    version   -- BLL version that help is for.
+    directory -- Directory holding a cache directory for each version.  If
+                 None, use environment variable STC_HELP_CACHE_DIR, or
+                 DEFAULT_CACHE_DIR.
+
+    """
+
+    def __init__(self, version, directory=None):
+        if not directory:
+            directory = os.environ.get('STC_HELP_CACHE_DIR',
+                                       DEFAULT_CACHE_DIR)
+        self.version = str(version)
+        self.path = os.path.join(directory, quote(self.version, safe='.-_'))
+        self._lock = threading.Lock()
+        self._text = {}
+        self._meta = {}
+
+    def get(self, subject, args=None):
+        """Return cached help text for subject, or None if not cached."""
+        key = _key(subject, args)
+        text = self._text.get(key)
+        if text is not None:
+            return text
+        try:
+            with open(self._file(key), 'rb') as f:
+                text = f.read().decode('utf-8')
+        except (IOError, OSError):
+            return None
+        self._text[key] = text
+        return text
+
+    def put(self, subject, text, args=None):
+        """Cache help text for subject.  The text is kept in memory even if
+        it can not be written to the cache file.
+
+        """
+        key = _key(subject, args)
+        self._text[key] = text
+        self._write(self._file(key), text)
+
+    def metadata(self, subject):
+        """Return parsed help of object or command type, or None if its help
+        is not cached.  See parse_help.
+
+        """
+        key = _key(subject, None)
+        meta = self._meta.get(key)
+        if meta is None:
+            text = self.get(subject)
+            if text is None:
+                return None
+            meta = self._meta.setdefault(key, parse_help(text))
+        return meta
+
+    def names(self, kind):
+        """Return names of types in cached help list of kind, one of
+        LIST_KINDS, or None if it is not cached.
+
+        """
+        text = self.get('list', (kind, '*'))
+        if text is None:
+            return None
+        return parse_list(text)
+
+    def is_complete(self):
+        """Return True if warm has fetched help for every type."""
+        return os.path.exists(os.path.join(self.path, _COMPLETE))
+
+    def warm(self, fetch, parallel=WARM_PARALLEL):
+        """Fetch and cache help for every type not already cached.
+
+        The help lists of LIST_KINDS are fetched first, to find the types,
+        then help on each type is fetched using parallel threads.  Once all
+        help has been fetched, the cache is marked complete, and later calls
+        return without fetching.
+
+        Arguments:
+        fetch    -- Callable, fetch(subject, args), that returns help text.
+        parallel -- Maximum number of help requests to send at once.
+
+        Return:
+        Number of help subjects fetched.
+
+        Raise RuntimeError, after fetching the others, if help on any subject
+        could not be fetched.
+
+        """
+        if self.is_complete():
+            return 0
+        fetched = 0
+        subjects = []
+        for kind in LIST_KINDS:
+            args = (kind, '*')
+            if self.get('list', args) is None:
+                self.put('list', fetch('list', list(args)), args)
+                fetched += 1
+            subjects.extend(self.names(kind))
+
+        pending = collections.deque(
+            s for s in subjects if self.get(s) is None)
+        fetched += len(pending)
+        errors = []
+
+        def worker():
+            while True:
+                try:
+                    subject = pending.popleft()
+                except IndexError:
+                    return
+                try:
+                    self.put(subject, fetch(subject, None))
+                except Exception as e:
+                    errors.append((subject, e))
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(min(parallel, len(pending)))]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise RuntimeError('failed to get help on %d of %d subjects, '
+                               'first: %s: %s' % (len(errors), len(subjects),
+                                                  errors[0][0], errors[0][1]))
+        self._write(os.path.join(self.path, _COMPLETE), self.version)
+        return fetched
+
+    def clear(self):
+        """Discard cached help, in memory and in files."""
+        with self._lock:
+            self._text.clear()
+            self._meta.clear()
+            if not os.path.isdir(self.path):
+                return
+            for name in os.listdir(self.path):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _file(self, key):
+        return os.path.join(self.path, quote(key, safe='') + '.txt')
+
+    def _write(self, path, text):
+        """Write text to file at path.  Return False if the file could not
+        be written, such as when the cache directory is read-only.
+
+        """
+        try:
+            if not os.path.isdir(self.path):
+                try:
+                    os.makedirs(self.path)
+                except OSError:
+                    if not os.path.isdir(self.path):
+                        raise
+            fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.tmp')
+        except (IOError, OSError):
+            return False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(text.encode('utf-8'))
+            _replace(tmp, path)
+        except (IOError, OSError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        return True
+
+
+def _key(subject, args):
+    key = str(subject).lower()
+    if args:
+        key += ' ' + ' '.join(str(a) for a in args)
+    return key
+
+
+def _replace(src, dst):
+    try:
+        os.replace(src, dst)
+    except AttributeError:
+        # Python 2 on Windows cannot rename over an existing file.
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def main():
+    try:
+        from . import stchttp
+    except ValueError:
+        import stchttp
+
+    ap = argparse.ArgumentParser(
+        prog='python -m stcrestclient.helpcache',
+        description='Fetch help on every object and command type from a '
+        'TestCenter server, and cache it for the server version.')
+    ap.add_argument('server', help='Address of TestCenter server.')
+    ap.add_argument('--port', '-p', help='Server TCP port to connect to.')
+    ap.add_argument('--parallel', type=int, default=WARM_PARALLEL,
+                    help='Help requests to send at once (default %d).' %
+                    WARM_PARALLEL)
+    ap.add_argument('--dir', help='Cache directory (default %s).' %
+                    DEFAULT_CACHE_DIR)
+    args = ap.parse_args()
+
+    try:
+        stc = stchttp.StcHttp(args.server, args.port, lazy=True,
+                              pool_size=args.parallel)
+        stc.new_session('anonymous', 'helpcache')
+        try:
+            stc.set_help_cache(True, args.dir)
+            fetched = stc.warm_help_cache(args.parallel)
+            print('cached help on %d subjects for version %s in %s' % (
+                fetched, stc.bll_version(), stc.help_cache().path))
+        finally:
+            stc.end_session()
+    except Exception as e:
+        print('ERROR', e, file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
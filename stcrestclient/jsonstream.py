@@ -0,0 +1,268 @@
+"""
+Incremental JSON parser for large ReST API responses.
+
+JsonStream reads a JSON document from an iterator of text chunks, such as the
+body of a streamed HTTP response, and yields the values at a selected location
+as soon as each one has been received.  Only the value being decoded, and the
+unread part of the current chunk, is held in memory.
+
+Locations are given as dotted prefixes, where 'item' stands for each element
+of an array.  For example, the prefix 'objects.item' selects each element of
+the array that is the value of the top-level 'objects' key.
+
+"""
+from __future__ import absolute_import
+
+import json
+import re
+
+_WS = re.compile(r'[ \t\n\r]*')
+
+# Matches the longest run of string content that does not contain the closing
+# quote or an incomplete escape sequence.
+_STR_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+
+# Matches a \u escape at the end of string content that may be incomplete, or
+# a high surrogate escape that must be decoded together with the low surrogate
+# escape that follows it.
+_STR_TAIL = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}(?:\\u[0-9a-fA-F]{0,3})?$'
+                       r'|\\u[0-9a-fA-F]{0,3}$')
+
+_decoder = json.JSONDecoder()
+
+
+class JsonStream(object):
+
+    """
+    Read JSON values from an iterator of text chunks as they are received.
+
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._found = False
+
+    def peek(self):
+        """Return next non-whitespace character, or '' at end of input."""
+        while True:
+            self._pos = _WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def value(self):
+        """Decode and return the complete value at the current position."""
+        self.peek()
+        while True:
+            try:
+                val, end = _decoder.raw_decode(self._buf, self._pos)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # A value that ends with the buffer may be a truncated number.
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return val
+
+    def skip(self):
+        """Skip the value at the current position."""
+        if self.peek() == '"':
+            for _ in self.iter_string():
+                pass
+        else:
+            self.value()
+
+    def items(self, prefix=None):
+        """Iterate over the values at the location given by prefix.
+
+        If prefix is None, then iterate over the elements of the first array
+        of objects in the document.
+
+        """
+        if prefix is None:
+            self._found = False
+            return self._find_records()
+        return self._walk(prefix.split('.') if prefix else [])
+
+    def kvitems(self, prefix=''):
+        """Iterate over (key, value) pairs of the object at prefix."""
+        return self._walk((prefix.split('.') if prefix else []) + [None])
+
+    def find(self, prefix):
+        """Move to the value at the location given by prefix.
+
+        Prefix must not contain 'item'.  Return True if the value was found,
+        or False if the document does not contain it.
+
+        """
+        for _ in self._walk(prefix.split('.'), True):
+            return True
+        return False
+
+    def iter_string(self):
+        """Iterate over the decoded text of the string at this position.
+
+        The string is yielded in pieces as it is received, so that a string
+        value holding a large embedded document can itself be parsed with
+        another JsonStream.
+
+        """
+        if self.peek() != '"':
+            raise ValueError('expected string at position %d' % self._pos)
+        self._pos += 1
+        while True:
+            end = _STR_BODY.match(self._buf, self._pos).end()
+            closed = end < len(self._buf) and self._buf[end] == '"'
+            if not closed:
+                start = max(self._pos, end - 11)
+                tail = _STR_TAIL.search(self._buf, start, end)
+                while tail and _escaped(self._buf, self._pos, tail.start()):
+                    # Its backslash is itself escaped, so it is not a \u.
+                    tail = _STR_TAIL.search(self._buf, tail.start() + 1, end)
+                if tail:
+                    end = tail.start()
+            if end > self._pos:
+                yield json.loads('"%s"' % self._buf[self._pos:end])
+                self._pos = end
+            if closed:
+                self._pos += 1
+                return
+            if not self._fill():
+                raise ValueError('unterminated string')
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _fill(self):
+        """Read the next chunk into the buffer.  Return False at end."""
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                self._buf = self._buf[self._pos:] + chunk
+                self._pos = 0
+                return True
+        self._eof = True
+        return False
+
+    def _expect(self, char):
+        if self.peek() != char:
+            raise ValueError('expected %r at position %d' % (char, self._pos))
+        self._pos += 1
+
+    def _members(self):
+        """Yield each key of the object at this position.
+
+        The caller must consume the member's value before resuming.
+
+        """
+        self._expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            c = self.peek()
+            self._pos += 1
+            if c == '}':
+                return
+            if c != ',':
+                raise ValueError('expected , or } at position %d' %
+                                 (self._pos - 1))
+
+    def _elements(self):
+        """Yield once for each element of the array at this position.
+
+        The caller must consume the element before resuming.
+
+        """
+        self._expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield
+            c = self.peek()
+            self._pos += 1
+            if c == ']':
+                return
+            if c != ',':
+                raise ValueError('expected , or ] at position %d' %
+                                 (self._pos - 1))
+
+    def _walk(self, path, position_only=False):
+        if not path:
+            if not position_only:
+                yield self.value()
+            else:
+                yield None
+            return
+        c = self.peek()
+        if path[0] is None:
+            # Yield key-value pairs of the object here.
+            if c != '{':
+                self.skip()
+                return
+            for key in self._members():
+                yield key, self.value()
+        elif c == '{':
+            for key in self._members():
+                if key == path[0]:
+                    for v in self._walk(path[1:], position_only):
+                        yield v
+                    if position_only:
+                        return
+                else:
+                    self.skip()
+        elif c == '[' and path[0] == 'item':
+            for _ in self._elements():
+                for v in self._walk(path[1:], position_only):
+                    yield v
+        else:
+            self.skip()
+
+    def _find_records(self):
+        c = self.peek()
+        if c == '{':
+            for key in self._members():
+                for v in self._find_records():
+                    yield v
+                if self._found:
+                    return
+        elif c == '[':
+            first = True
+            for _ in self._elements():
+                if first:
+                    first = False
+                    if self.peek() != '{':
+                        self.skip()
+                        continue
+                    self._found = True
+                if self._found:
+                    yield self.value()
+                else:
+                    self.skip()
+        else:
+            self.skip()
+
+
+def _escaped(buf, start, pos):
+    """Return True if the character at pos is escaped by a backslash.
+
+    Start must be at the start of string content, or after a complete
+    escape sequence.
+
+    """
+    n = 0
+    while pos - n > start and buf[pos - n - 1] == '\\':
+        n += 1
+    return n % 2 == 1
@@ -0,0 +1,258 @@
+"""
+Client-side evaluation of bulk API locations.
+
+Locations name objects by path, as accepted by bulkget, bulkconfig, and the
+other bulk calls.  A location is a path of steps separated by '/', relative
+to project1, or starting with '//' to match the first step anywhere.  A step
+is an object type, a handle, or '*', followed by any number of predicates:
+
+    [@name=Port1] or [@name="port1"]    Equal
+    [@name *= dev] or [@name ~= dev]    Contains
+    [@name ^= dev]                      Starts with
+    [@name != port1]                    Not equal
+    [1]                                 Index, from 0, among matched siblings
+
+The '@' may be left out, and values may be quoted.  Values are compared
+ignoring case.  Several locations may be given separated by spaces, and a
+leading 'xpath:' is ignored.
+
+A location is compiled once, and compiled locations are cached:
+
+    loc = locations.compile('/port[@name ^= port]/emulateddevice')
+    handles = loc.handles(snap)
+
+"""
+from __future__ import absolute_import
+
+import re
+
+# Compiled locations kept by compile.
+MAX_CACHED = 512
+
+_STEP = re.compile(r'^([\w.-]+|\*)((?:\[[^\]]*\])*)$')
+_BRACKETS = re.compile(r'\[[^\]]*\]')
+_PREDICATE = re.compile(
+    r'^\[\s*(?:(\d+)|@?([\w.-]+)\s*(\*=|~=|\^=|!=|=)\s*'
+    r'(?:"([^"]*)"|\'([^\']*)\'|(.*?)))\s*\]$')
+
+_cache = {}
+
+
+class Location(object):
+
+    """
+    Compiled location, which selects objects from a tree of objects.
+
+    The tree is any object with these methods, where obj is an object of the
+    tree:
+
+        lookup(handle)     -- Object with handle, or None.
+        top_level()        -- Objects that relative paths start from, the
+                              children of project1.
+        all_objects()      -- All objects, in tree order.
+        children(obj)      -- Children of object.
+        object_type(obj)   -- Lowercase type of object.
+        handle(obj)        -- Lowercase handle of object.
+        value(obj, attr)   -- Value of attribute, as a string, or None.
+
+    Arguments:
+    text -- Location text.  Raise ValueError if it is not valid.
+
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._paths = []
+        for loc in _split(text.strip()):
+            if loc.lower().startswith('xpath:'):
+                loc = loc[6:]
+            self._paths.append(_Path(loc))
+        if not self._paths:
+            raise ValueError('missing location')
+
+    def __repr__(self):
+        return '<Location %s>' % (self.text,)
+
+    def select(self, tree):
+        """Return objects of tree at location, in order, without
+        duplicates.
+
+        """
+        found = []
+        seen = set()
+        for path in self._paths:
+            for obj in path.select(tree):
+                h = tree.handle(obj)
+                if h not in seen:
+                    seen.add(h)
+                    found.append(obj)
+        return found
+
+    def handles(self, snap):
+        """Return handles of objects of snapshot.Snapshot at location."""
+        tree = SnapshotTree(snap)
+        return [o.handle for o in self.select(tree)]
+
+
+class SnapshotTree(object):
+
+    """
+    Tree of objects of a snapshot.Snapshot, for Location.select.
+
+    """
+
+    def __init__(self, snap):
+        self._snap = snap
+
+    def lookup(self, handle):
+        return self._snap.get(handle)
+
+    def top_level(self):
+        project = self._snap.get('project1')
+        if project is not None:
+            return self.children(project)
+        return [o for o in self._snap.roots if o.parent == 'project1']
+
+    def all_objects(self):
+        return list(self._snap)
+
+    def children(self, obj):
+        get = self._snap.get
+        return [c for c in (get(h) for h in obj.children) if c is not None]
+
+    def object_type(self, obj):
+        return obj.type
+
+    def handle(self, obj):
+        return obj.handle
+
+    def value(self, obj, attr):
+        attr = attr.lower()
+        value = obj.attrs.get(attr)
+        if value is None and attr in obj.relations:
+            value = ' '.join(obj.relations[attr])
+        return value
+
+
+def compile(text):
+    """Return compiled Location for text, from cache if compiled before.
+
+    Raise ValueError if location is not valid.
+
+    """
+    loc = _cache.get(text)
+    if loc is None:
+        loc = Location(text)
+        if len(_cache) >= MAX_CACHED:
+            _cache.clear()
+        _cache[text] = loc
+    return loc
+
+
+def expand(snap, location, batch_size=None):
+    """Return handles of objects of snapshot at location, as a list of
+    space-separated handle strings, each naming at most batch_size objects.
+
+    The strings can be passed as the location of bulk calls, so that a
+    location that matches many objects is handled in batches of a known
+    size, or so that the objects are known before the call.
+
+    """
+    handles = compile(location).handles(snap)
+    if not batch_size:
+        batch_size = len(handles) or 1
+    return [' '.join(handles[i:i + batch_size])
+            for i in range(0, len(handles), batch_size)]
+
+
+class _Path(object):
+
+    def __init__(self, text):
+        self.anywhere = text.startswith('//')
+        self.steps = []
+        for step in _split(text.strip('/'), '/'):
+            m = _STEP.match(step.strip())
+            if m is None:
+                raise ValueError('invalid location: %s' % (text,))
+            preds = [_predicate(p, text)
+                     for p in _BRACKETS.findall(m.group(2))]
+            self.steps.append((m.group(1).lower(), preds))
+
+    def select(self, tree):
+        context = None
+        for i, (name, preds) in enumerate(self.steps):
+            if i == 0:
+                if self.anywhere:
+                    groups = [tree.all_objects()]
+                else:
+                    obj = tree.lookup(name) if name != '*' else None
+                    groups = [[obj] if obj is not None else
+                              tree.top_level()]
+            else:
+                groups = [tree.children(o) for o in context]
+            context = []
+            for group in groups:
+                matched = [o for o in group if name == '*' or
+                           name == tree.object_type(o) or
+                           name == tree.handle(o)]
+                for pred in preds:
+                    matched = pred(matched, tree)
+                context.extend(matched)
+        return context
+
+
+def _predicate(text, location):
+    m = _PREDICATE.match(text)
+    if m is None:
+        raise ValueError('invalid predicate %s in location: %s' %
+                         (text, location))
+    index, attr, op = m.group(1), m.group(2), m.group(3)
+    if index is not None:
+        n = int(index)
+        return lambda objs, tree: objs[n:n + 1]
+
+    value = next(v for v in m.group(4, 5, 6) if v is not None).lower()
+    if op == '=':
+        test = lambda v: v == value
+    elif op == '!=':
+        test = lambda v: v != value
+    elif op == '^=':
+        test = lambda v: v.startswith(value)
+    else:
+        test = lambda v: value in v
+
+    def select(objs, tree):
+        matched = []
+        for o in objs:
+            v = tree.value(o, attr)
+            v = '' if v is None else str(v).lower()
+            if test(v):
+                matched.append(o)
+        return matched
+
+    return select
+
+
+def _split(text, sep=None):
+    """Split text on sep, or whitespace, outside of predicates."""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, c in enumerate(text):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in '"\'' and depth:
+            quote = c
+        elif c == '[':
+            depth += 1
+        elif c == ']':
+            depth -= 1
+        elif not depth and (c == sep if sep else c.isspace()):
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    if sep:
+        return parts
+    return [p for p in parts if p]
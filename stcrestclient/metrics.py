@@ -0,0 +1,259 @@
+"""
+Request latency and size metrics for ReST API clients.
+
+RequestMetrics aggregates the timing, byte counts, and status of each request
+into histograms keyed by HTTP method and container (objects, perform,
+bulk/objects, files, ...).  Metrics can be read as a dictionary, or written in
+the Prometheus text exposition format.
+
+"""
+from __future__ import absolute_import
+from __future__ import division
+
+import bisect
+import threading
+import time
+
+# Upper bounds, in seconds, of latency histogram buckets.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Phases of a request that are timed.
+PHASES = ('total', 'connect', 'ttfb', 'transfer')
+
+_PROM_HELP = {
+    'total': 'Total time of ReST API requests.',
+    'connect': 'Time spent opening connections for ReST API requests.',
+    'ttfb': 'Time from sending ReST API request to first response byte.',
+    'transfer': 'Time spent receiving ReST API response bodies.',
+}
+
+
+class Histogram(object):
+
+    """
+    Histogram of observed values with fixed bucket upper bounds.
+
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Estimate the q-th percentile (0 to 100) from the buckets.
+
+        The value is interpolated within the bucket that holds it, and is
+        never more than the largest value observed.
+
+        """
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                if i == len(self.buckets):
+                    return self.max
+                est = lower + (self.buckets[i] - lower) * (rank - seen) / n
+                return min(est, self.max)
+            seen += n
+        return self.max
+
+    def cumulative(self):
+        """Return list of (upper_bound, cumulative_count), ending with inf."""
+        total = 0
+        result = []
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            total += n
+            result.append((bound, total))
+        return result
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {'count': self.count,
+                'mean': self.sum / self.count,
+                'max': self.max,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99)}
+
+
+class RequestRecord(object):
+
+    """
+    Timing and size of one request, while it is in progress.
+
+    """
+
+    __slots__ = ('method', 'container', 'start', 'connect', 'ttfb',
+                 'transfer', 'request_bytes', 'response_bytes', 'status')
+
+    def __init__(self, method, container):
+        self.method = method
+        self.container = container
+        self.start = time.time()
+        self.connect = 0.0
+        self.ttfb = 0.0
+        self.transfer = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.status = None
+
+
+class _Series(object):
+
+    def __init__(self, buckets):
+        self.hists = dict((phase, Histogram(buckets)) for phase in PHASES)
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.statuses = {}
+        self.errors = 0
+
+
+class RequestMetrics(object):
+
+    """
+    Aggregates request records into histograms by method and container.
+
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def start(self, method, container):
+        """Return a new RequestRecord for a request that is starting."""
+        return RequestRecord(method, container or '')
+
+    def finish(self, rec):
+        """Add a completed request record to the metrics.
+
+        A record with no status is counted as an error, such as a connection
+        failure or timeout.
+
+        """
+        total = time.time() - rec.start
+        key = (rec.method, rec.container)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = _Series(self._buckets)
+                self._series[key] = series
+            hists = series.hists
+            hists['total'].observe(total)
+            hists['connect'].observe(rec.connect)
+            hists['ttfb'].observe(rec.ttfb)
+            hists['transfer'].observe(rec.transfer)
+            series.request_bytes += rec.request_bytes
+            series.response_bytes += rec.response_bytes
+            if rec.status is None:
+                series.errors += 1
+            else:
+                series.statuses[rec.status] = (
+                    series.statuses.get(rec.status, 0) + 1)
+
+    def reset(self):
+        """Discard all collected metrics."""
+        with self._lock:
+            self._series = {}
+
+    def stats(self):
+        """Return dictionary of metrics keyed by 'METHOD container'.
+
+        Each value is a dictionary with the request count, errors, bytes sent
+        and received, counts by status, and a summary (count, mean, max, p50,
+        p90, p99 seconds) of each timed phase: total, connect, ttfb, and
+        transfer.
+
+        """
+        result = {}
+        with self._lock:
+            for (method, container), series in self._series.items():
+                entry = {
+                    'requests': series.hists['total'].count,
+                    'errors': series.errors,
+                    'request_bytes': series.request_bytes,
+                    'response_bytes': series.response_bytes,
+                    'statuses': dict(series.statuses)}
+                for phase in PHASES:
+                    entry[phase] = series.hists[phase].summary()
+                result['%s %s' % (method, container)] = entry
+        return result
+
+    def prometheus(self, prefix='stcrestclient', counters=None):
+        """Return metrics in the Prometheus text exposition format.
+
+        Arguments:
+        prefix   -- Prefix of metric names.
+        counters -- Optional dictionary of additional counter values, such
+                    as connections opened, to include as <prefix>_<name>_total.
+
+        """
+        lines = []
+        with self._lock:
+            series = sorted(self._series.items())
+            for phase in PHASES:
+                name = '%s_%s_seconds' % (
+                    prefix, 'request_duration' if phase == 'total' else phase)
+                lines.append('# HELP %s %s' % (name, _PROM_HELP[phase]))
+                lines.append('# TYPE %s histogram' % name)
+                for (method, container), s in series:
+                    labels = 'method="%s",container="%s"' % (
+                        _escape(method), _escape(container))
+                    h = s.hists[phase]
+                    for bound, n in h.cumulative():
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append('%s_bucket{%s,le="%s"} %d' %
+                                     (name, labels, le, n))
+                    lines.append('%s_sum{%s} %r' % (name, labels, h.sum))
+                    lines.append('%s_count{%s} %d' % (name, labels, h.count))
+
+            for attr, help_text in (
+                    ('request_bytes', 'Bytes sent in ReST API requests.'),
+                    ('response_bytes',
+                     'Bytes received in ReST API responses.')):
+                name = '%s_%s_total' % (prefix, attr)
+                lines.append('# HELP %s %s' % (name, help_text))
+                lines.append('# TYPE %s counter' % name)
+                for (method, container), s in series:
+                    lines.append('%s{method="%s",container="%s"} %d' % (
+                        name, _escape(method), _escape(container),
+                        getattr(s, attr)))
+
+            name = '%s_responses_total' % prefix
+            lines.append('# HELP %s ReST API responses by status code.' % name)
+            lines.append('# TYPE %s counter' % name)
+            for (method, container), s in series:
+                statuses = sorted(s.statuses.items())
+                if s.errors:
+                    statuses.append(('error', s.errors))
+                for status, n in statuses:
+                    lines.append(
+                        '%s{method="%s",container="%s",status="%s"} %d' % (
+                            name, _escape(method), _escape(container), status,
+                            n))
+
+        for key, value in sorted((counters or {}).items()):
+            name = '%s_%s_total' % (prefix, key)
+            lines.append('# TYPE %s counter' % name)
+            lines.append('%s %s' % (name, value))
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,224 @@
+"""
+Streaming multipart/form-data encoder for file uploads.
+
+MultipartEncoder is a read-only file-like object that produces a multipart
+request body as it is read.  File contents are read in chunks while the body
+is being sent, so memory use does not depend on the size or number of files.
+Each file is opened only while it is being read, and the number of files open
+at once, by all encoders, is limited.
+
+"""
+from __future__ import absolute_import
+from __future__ import division
+
+import binascii
+import os
+import threading
+import time
+
+# Maximum number of upload source files open at once, by all encoders that use
+# the default limit.
+DEFAULT_MAX_OPEN_FILES = 8
+
+# Bytes read from a file at a time.
+CHUNK_SIZE = 65536
+
+_open_files = threading.BoundedSemaphore(DEFAULT_MAX_OPEN_FILES)
+
+
+def set_max_open_files(num):
+    """Set limit on upload source files open at once by default encoders."""
+    global _open_files
+    _open_files = threading.BoundedSemaphore(num)
+
+
+class MultipartEncoder(object):
+
+    """
+    File-like multipart/form-data body that reads files lazily.
+
+    Arguments:
+    files      -- List of (field_name, (file_name, source, content_type))
+                  tuples, where source is a path or an open binary file.
+                  Files given as paths are opened when they are reached, and
+                  closed when read.  Files given as open files are read from
+                  their current position, and are not closed.
+    progress   -- Optional callable, called as progress(file_name, sent,
+                  size, bytes_per_sec) as each file is read.
+    open_files -- Optional semaphore that limits the number of files open at
+                  once.  Defaults to one shared by all encoders.
+    boundary   -- Optional multipart boundary string.
+
+    A double quote in a field or file name is sent as %22, as browsers do.
+    Raise ValueError if a name contains a carriage return or line feed.
+
+    """
+
+    def __init__(self, files, progress=None, open_files=None, boundary=None):
+        if isinstance(files, dict):
+            files = list(files.items())
+        self.boundary = boundary or binascii.hexlify(os.urandom(16)).decode()
+        self.content_type = 'multipart/form-data; boundary=' + self.boundary
+        self._progress = progress
+        self._limit = open_files if open_files is not None else _open_files
+        self._parts = []
+        for field, info in files:
+            file_name, source, ctype = info
+            if hasattr(source, 'read'):
+                start = source.tell()
+                size = os.fstat(source.fileno()).st_size - start
+            else:
+                start = 0
+                size = os.path.getsize(source)
+            head = ('--%s\r\nContent-Disposition: form-data; name="%s"; '
+                    'filename="%s"\r\nContent-Type: %s\r\n\r\n' % (
+                        self.boundary, _quote(field), _quote(file_name),
+                        ctype or 'application/octet-stream'))
+            self._parts.append((head.encode('utf-8'), file_name, source,
+                                start, size))
+        self._tail = ('--%s--\r\n' % self.boundary).encode('utf-8')
+        self._len = len(self._tail) + sum(
+            len(head) + size + 2 for head, _, _, _, size in self._parts)
+        self._reset()
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def len(self):
+        return self._len
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=0):
+        """Rewind to start of body.  Only seeking to the start is supported."""
+        if offset != 0 or whence != 0:
+            raise IOError('MultipartEncoder can only seek to start')
+        self._close_file()
+        self._reset()
+        return 0
+
+    def read(self, size=-1):
+        """Read up to size bytes of the body, or the rest if size < 0."""
+        if size is None or size < 0:
+            size = self._len
+        out = []
+        want = size
+        while want > 0:
+            if self._buf:
+                piece = self._buf[:want]
+                self._buf = self._buf[want:]
+            else:
+                piece = self._next_piece(want)
+                if piece is None:
+                    break
+                if len(piece) > want:
+                    self._buf = piece[want:] + self._buf
+                    piece = piece[:want]
+            out.append(piece)
+            want -= len(piece)
+        data = b''.join(out)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        self._close_file()
+
+    def file_stats(self):
+        """Return list of {'name', 'bytes', 'seconds', 'bytes_per_sec'} of
+        each file that has been read completely.
+
+        """
+        return list(self._stats)
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _reset(self):
+        self._pos = 0
+        self._index = -1
+        self._buf = b''
+        self._file = None
+        self._owned = False
+        self._remaining = 0
+        self._sent = 0
+        self._started = None
+        self._stats = []
+        self._done = False
+
+    def _next_piece(self, want):
+        """Return the next piece of the body, of at most want bytes."""
+        if self._file is not None:
+            data = self._file.read(min(want, CHUNK_SIZE, self._remaining))
+            if not data:
+                raise IOError('file changed size during upload: %s' %
+                              (self._parts[self._index][1],))
+            self._remaining -= len(data)
+            self._sent += len(data)
+            if self._remaining:
+                self._report(False)
+                return data
+            self._report(True)
+            self._close_file()
+            return data + b'\r\n'
+        if self._done:
+            return None
+        self._index += 1
+        if self._index == len(self._parts):
+            self._done = True
+            return self._tail
+        head, file_name, source, start, size = self._parts[self._index]
+        if hasattr(source, 'read'):
+            source.seek(start)
+            self._file = source
+            self._owned = False
+        else:
+            self._limit.acquire()
+            try:
+                self._file = open(source, 'rb')
+            except Exception:
+                self._limit.release()
+                raise
+            self._owned = True
+        self._remaining = size
+        self._sent = 0
+        self._started = time.time()
+        if not size:
+            self._buf = b'\r\n'
+            self._report(True)
+            self._close_file()
+        return head
+
+    def _close_file(self):
+        if self._file is not None and self._owned:
+            self._file.close()
+            self._limit.release()
+        self._file = None
+        self._owned = False
+
+    def _report(self, finished):
+        file_name = self._parts[self._index][1]
+        size = self._parts[self._index][4]
+        elapsed = time.time() - self._started
+        rate = self._sent / elapsed if elapsed > 0 else 0.0
+        if finished:
+            self._stats.append({'name': file_name, 'bytes': self._sent,
+                                'seconds': elapsed, 'bytes_per_sec': rate})
+        if self._progress is not None:
+            self._progress(file_name, self._sent, size, rate)
+
+
+def _quote(name):
+    """Return name to put in a quoted Content-Disposition parameter."""
+    if '\r' in name or '\n' in name:
+        raise ValueError('line break in multipart name: %r' % (name,))
+    return name.replace('"', '%22')
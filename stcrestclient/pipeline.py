@@ -0,0 +1,376 @@
+"""
+Pipelined calls to the STC ReST API.
+
+A Pipeline sends many StcHttp calls at once, over the connection pool, so that
+independent calls do not each wait for the response to the one before it.
+Each call returns a Future right away, and errors are collected and raised
+together when the pipeline is flushed:
+
+    with stc.pipeline(max_inflight=32) as p:
+        for i, port in enumerate(ports):
+            p.config(port, name='port %d' % i)
+        dev = p.create('emulateddevice', 'project1')
+        p.config(dev, name='mydev')
+
+Calls on the same handle are sent in the order they were made, except that
+creates under the same parent may be sent together.  A Future may
+be passed in place of a handle or attribute value, and the call is sent once
+that Future has its result.  A perform call waits for all calls made before
+it, and calls made after it wait for it to finish.
+
+"""
+from __future__ import absolute_import
+
+import collections
+import threading
+
+# Calls sent at once by a pipeline, unless specified.
+DEFAULT_MAX_INFLIGHT = 8
+
+
+class PipelineError(RuntimeError):
+
+    """
+    One or more pipelined calls failed.
+
+    The errors attribute is a list of (call_description, exception) tuples,
+    in the order the calls failed.
+
+    """
+
+    def __init__(self, errors, calls):
+        self.errors = errors
+        desc, e = errors[0]
+        RuntimeError.__init__(self, '%d of %d pipelined calls failed, '
+                              'first: %s: %s' % (len(errors), calls, desc, e))
+
+
+class Future(object):
+
+    """
+    Result of a pipelined call, available once the call has completed.
+
+    """
+
+    def __init__(self, description):
+        self.description = description
+        self._event = threading.Event()
+        self._result = None
+        self._exc = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._call = None
+
+    def __repr__(self):
+        return '<Future %s %s>' % (
+            self.description, 'done' if self.done() else 'pending')
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """Return result of call, waiting for it to complete.
+
+        Raise the exception of the call if it failed, or RuntimeError if it
+        does not complete within timeout seconds.
+
+        """
+        if not self._event.wait(timeout):
+            raise RuntimeError('timed out waiting for ' + self.description)
+        if self._exc is not None:
+            raise self._exc
+        return self._result
+
+    def exception(self, timeout=None):
+        """Return exception raised by call, or None if it succeeded."""
+        if not self._event.wait(timeout):
+            raise RuntimeError('timed out waiting for ' + self.description)
+        return self._exc
+
+    def add_done_callback(self, fn):
+        """Call fn(future) when call completes, or now if it has."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _set(self, result, exc):
+        with self._lock:
+            self._result = result
+            self._exc = exc
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+
+class _Call(object):
+
+    __slots__ = ('fn', 'args', 'key', 'future', 'shared', 'waiting',
+                 'dependents', 'finished')
+
+    def __init__(self, fn, args, key, future, shared):
+        self.fn = fn
+        self.args = args
+        self.key = key
+        self.future = future
+        self.shared = shared
+        self.waiting = 0
+        self.dependents = []
+        self.finished = False
+
+
+class Pipeline(object):
+
+    """
+    Sends StcHttp calls concurrently, keeping the order of calls per handle.
+
+    Calls beyond the pool_size of the StcHttp object use connections that are
+    closed after each request, so create it with a pool_size of at least
+    max_inflight.
+
+    Arguments:
+    stc          -- StcHttp object to make calls with.
+    max_inflight -- Maximum number of calls sent at once.
+
+    """
+
+    def __init__(self, stc, max_inflight=DEFAULT_MAX_INFLIGHT):
+        if max_inflight < 1:
+            raise ValueError('max_inflight must be at least 1')
+        self._stc = stc
+        self._cond = threading.Condition(threading.Lock())
+        self._ready = collections.deque()
+        self._last = {}
+        self._shared = {}
+        self._barrier = None
+        self._pending = set()
+        self._errors = []
+        self._calls = 0
+        self._closed = False
+        self._threads = []
+        for _ in range(max_inflight):
+            t = threading.Thread(target=self._worker)
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+            return
+        # Do not hide the exception that ended the block.
+        try:
+            self.close()
+        except PipelineError:
+            pass
+
+    def get(self, handle, *args):
+        """Get attributes of object.  See StcHttp.get."""
+        return self._submit(handle, 'get %s' % _name(handle), self._stc.get,
+                            (handle,) + args)
+
+    def config(self, handle, attributes=None, **kwattrs):
+        """Set attributes of object.  See StcHttp.config.
+
+        The write is sent by this call, even if the StcHttp object coalesces
+        writes, so that its error is reported against this call.
+
+        """
+        attrs = dict(attributes or {})
+        attrs.update(kwattrs)
+        return self._submit(handle, 'config %s' % _name(handle),
+                            self._stc.config_now, (handle, attrs))
+
+    def create(self, object_type, under=None, attributes=None, **kwattrs):
+        """Create object.  The Future's result is the handle of the new
+        object.  See StcHttp.create.
+
+        The create waits for calls on the parent made before it, but not for
+        other creates under the parent, and calls on the parent made after it
+        wait for it.
+
+        """
+        attrs = dict(attributes or {})
+        attrs.update(kwattrs)
+        return self._submit(under, 'create %s' % (object_type,),
+                            self._stc.create, (object_type, under, attrs),
+                            shared=True)
+
+    def delete(self, handle):
+        """Delete object.  See StcHttp.delete."""
+        return self._submit(handle, 'delete %s' % _name(handle),
+                            self._stc.delete, (handle,))
+
+    def perform(self, command, params=None, **kwargs):
+        """Perform command, after all calls made before it have completed.
+        Calls made after it are sent once it has completed.  See
+        StcHttp.perform.
+
+        """
+        p = dict(params or {})
+        p.update(kwargs)
+        return self._submit(None, 'perform %s' % (command,),
+                            self._stc.perform, (command, p), barrier=True)
+
+    def flush(self):
+        """Wait for all calls made so far to complete.
+
+        Raise PipelineError, listing the calls that failed, if any did.
+
+        """
+        with self._cond:
+            while self._pending:
+                self._cond.wait()
+            errors, self._errors = self._errors, []
+            calls, self._calls = self._calls, 0
+        if errors:
+            raise PipelineError(errors, calls)
+
+    def close(self):
+        """Flush calls, and stop the threads that send them."""
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            for t in self._threads:
+                t.join()
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _submit(self, key, description, fn, args, barrier=False,
+                shared=False):
+        """Queue call of fn with args, to be sent after the calls it depends
+        on have completed.
+
+        A call depends on the calls of Futures in its args, and on the last
+        call with the same key.  Shared calls do not become the last call of
+        their key, so they do not wait for each other, but the next call with
+        the key that is not shared waits for all of them.  A barrier call
+        depends on all pending calls, and all calls made after it depend on
+        it.
+
+        """
+        future = Future(description)
+        call = _Call(fn, args, key, future, shared)
+        future._call = call
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('pipeline is closed')
+            deps = set()
+            for f in _futures(args):
+                c = f._call
+                if c is not None and c in self._pending:
+                    deps.add(c)
+            if barrier:
+                deps.update(self._pending)
+                self._barrier = call
+            else:
+                last = self._last.get(key)
+                if last is not None and not last.finished:
+                    deps.add(last)
+                if self._barrier is not None and not self._barrier.finished:
+                    deps.add(self._barrier)
+                if shared:
+                    self._shared.setdefault(key, set()).add(call)
+                else:
+                    deps.update(self._shared.pop(key, ()))
+                    self._last[key] = call
+            call.waiting = len(deps)
+            for d in deps:
+                d.dependents.append(call)
+            self._pending.add(call)
+            self._calls += 1
+            if not call.waiting:
+                self._ready.append(call)
+                self._cond.notify()
+        return future
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._closed:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                call = self._ready.popleft()
+
+            result = None
+            exc = None
+            try:
+                args = _resolve(call.args)
+                result = call.fn(*args)
+            except Exception as e:
+                exc = e
+            call.future._set(result, exc)
+
+            with self._cond:
+                call.finished = True
+                self._pending.discard(call)
+                if exc is not None:
+                    self._errors.append((call.future.description, exc))
+                if self._last.get(call.key) is call:
+                    del self._last[call.key]
+                if call.shared:
+                    shared = self._shared.get(call.key)
+                    if shared is not None:
+                        shared.discard(call)
+                        if not shared:
+                            del self._shared[call.key]
+                if self._barrier is call:
+                    self._barrier = None
+                for d in call.dependents:
+                    d.waiting -= 1
+                    if not d.waiting:
+                        self._ready.append(d)
+                call.dependents = []
+                self._cond.notify_all()
+
+
+def _name(handle):
+    if isinstance(handle, Future):
+        return 'result of ' + handle.description
+    return handle
+
+
+def _futures(value):
+    """Yield Futures in value, and in the lists and dictionaries in it."""
+    if isinstance(value, Future):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            for f in _futures(v):
+                yield f
+    elif isinstance(value, dict):
+        for v in value.values():
+            for f in _futures(v):
+                yield f
+
+
+def _resolve(value):
+    """Return value with each Future replaced by its result.
+
+    Raise RuntimeError if a Future's call failed.
+
+    """
+    if isinstance(value, Future):
+        exc = value.exception()
+        if exc is not None:
+            raise RuntimeError('depends on failed call: %s: %s' %
+                               (value.description, exc))
+        return value.result()
+    if isinstance(value, tuple):
+        return tuple(_resolve(v) for v in value)
+    if isinstance(value, list):
+        return [_resolve(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, _resolve(v)) for k, v in value.items())
+    return value
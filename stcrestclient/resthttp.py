@@ -5,11 +5,54 @@ Client class and exception for performing basic ReST API interactions.
 from __future__ import print_function
 
 import base64
+import codecs
+import collections
+import email.utils
+import json
 import os
+import random
 import sys
 import copy
+import threading
+import time
+import zlib
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3 import connectionpool as _connectionpool
+from requests.packages.urllib3 import exceptions as _urllib3_exceptions
+
+try:
+    from . import metrics
+    from . import multipart
+except ValueError:
+    import metrics
+    import multipart
+
+# Number of connections kept alive, per server, by each connection pool.
+DEFAULT_POOL_SIZE = 10
+
+# Bytes read at a time from streamed response bodies.
+STREAM_CHUNK_SIZE = 65536
+
+# Bulk request bodies at least this many bytes long are gzip compressed, if
+# compression is enabled.
+DEFAULT_COMPRESS_THRESHOLD = 16384
+
+# Status codes with which a server rejects a compressed request body.  A
+# 400 response rejects it only if its message names the Content-Encoding
+# header, since a request that is not idempotent must not be sent again after any
+# other error.
+COMPRESS_REJECT_STATUSES = (415,)
+
+# Maximum number of connections used at once to download one file.
+DOWNLOAD_PARALLEL = 4
+
+# Bytes fetched by each ranged request of a parallel download.
+DOWNLOAD_SEGMENT_SIZE = 8 * 1024 * 1024
+
+# Times to try reading a download, or one segment of it, before giving up.
+DOWNLOAD_ATTEMPTS = 3
 
 
 class RestHttpError(Exception):
@@ -67,6 +110,498 @@ class ConnectionError(Exception):
         return 'ConnectionError(message=%s, code=%d)' % (self.msg, self.code)
 
 
+class RetryPolicy(object):
+
+    """
+    Decides whether, and after how long, to retry a failed request.
+
+    Retries wait for an exponentially increasing backoff time, with random
+    jitter so that many clients do not retry in lock-step.  A Retry-After
+    header sent by the server is honored instead of the backoff time.
+
+    Requests using an idempotent method (GET, PUT, DELETE, ...) are retried
+    after any connection error, timeout, or retryable status.  Other requests,
+    such as POST to objects or perform, might already have been carried out
+    by the server, so they are only retried when that is known not to be the
+    case: when the connection could not be established, or when the server
+    refused the request with one of the unsafe_statuses.
+
+    """
+
+    IDEMPOTENT_METHODS = frozenset(
+        ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'))
+
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=30.0,
+                 jitter=True, max_elapsed=120.0,
+                 retry_statuses=(429, 502, 503, 504),
+                 unsafe_statuses=(429, 503),
+                 idempotent_methods=IDEMPOTENT_METHODS):
+        """Initialize the retry policy.
+
+        Arguments:
+        max_retries        -- Maximum number of retries of one request.
+        backoff            -- Seconds to wait before the first retry.  The
+                              wait doubles with each following retry.
+        max_backoff        -- Maximum seconds to wait between retries.
+        jitter             -- Wait a random time up to the backoff time,
+                              instead of the full backoff time.
+        max_elapsed        -- Do not retry if doing so would take the total
+                              time spent on the request past this many
+                              seconds.  None for no limit.
+        retry_statuses     -- HTTP status codes that may be retried.
+        unsafe_statuses    -- Subset of retry_statuses that indicate the
+                              server did not process the request, so that
+                              non-idempotent requests may be retried.
+        idempotent_methods -- HTTP methods that are always safe to retry.
+
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+        self.retry_statuses = frozenset(retry_statuses)
+        self.unsafe_statuses = frozenset(unsafe_statuses)
+        self.idempotent_methods = frozenset(
+            m.upper() for m in idempotent_methods)
+
+    def backoff_time(self, retry_num):
+        """Return seconds to wait before the given retry (1 for first)."""
+        delay = min(self.max_backoff, self.backoff * (2 ** (retry_num - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def retry_delay(self, method, retry_num, elapsed, status=None,
+                    sent=True, retry_after=None):
+        """Return seconds to wait before retrying, or None to not retry.
+
+        Arguments:
+        method      -- HTTP method of the request.
+        retry_num   -- Number of the retry being considered (1 for first).
+        elapsed     -- Seconds spent on the request so far.
+        status      -- HTTP status of the response, or None if there was a
+                       connection error or timeout.
+        sent        -- False if the request is known not to have reached the
+                       server.
+        retry_after -- Seconds given by the response Retry-After header.
+
+        """
+        if retry_num > self.max_retries:
+            return None
+        idempotent = method.upper() in self.idempotent_methods
+        if status is None:
+            if sent and not idempotent:
+                return None
+        elif status not in self.retry_statuses:
+            return None
+        elif status not in self.unsafe_statuses and not idempotent:
+            return None
+
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            delay = self.backoff_time(retry_num)
+        if self.max_elapsed is not None and (
+                elapsed + delay > self.max_elapsed):
+            return None
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Return seconds given by a Retry-After header value, or None."""
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            when = email.utils.mktime_tz(email.utils.parsedate_tz(value))
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return max(when - time.time(), 0.0)
+
+
+class CircuitOpenError(ConnectionError):
+
+    """
+    Request rejected, without being sent, because the circuit is open.
+
+    """
+
+    def __init__(self, server, retry_in):
+        ConnectionError.__init__(
+            self, 'circuit open for server %s' % (server,), -1,
+            'failing fast for %.1f more seconds' % (retry_in,))
+
+
+class CircuitBreaker(object):
+
+    """
+    Fails requests to a server fast while the server is down or overloaded.
+
+    The circuit starts closed, and requests are sent normally.  After
+    failure_threshold consecutive failures (connection errors, timeouts, or
+    failure_statuses) the circuit opens, and requests are rejected with
+    CircuitOpenError without contacting the server.  After reset_timeout
+    seconds the circuit is half-open: a single request is allowed through to
+    probe the server, while others are still rejected.  If probe_path is set,
+    then a GET of that path is the probe, otherwise the next request is.  If
+    the probe succeeds the circuit closes, otherwise it opens again.
+
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0,
+                 failure_statuses=(502, 503, 504), probe_path=None,
+                 name=None):
+        """Initialize the circuit breaker.
+
+        Arguments:
+        failure_threshold -- Consecutive failures that open the circuit.
+        reset_timeout     -- Seconds to fail fast before probing the server.
+        failure_statuses  -- HTTP status codes counted as failures.
+        probe_path        -- Optional path, relative to the base URL, to GET
+                             to probe the server when half-open.
+        name              -- Name of server, used in error messages.
+
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_statuses = frozenset(failure_statuses)
+        self.probe_path = probe_path
+        self.name = name
+        self._lock = threading.Lock()
+        self._state = CircuitBreaker.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trips = 0
+        self._rejected = 0
+
+    def state(self):
+        """Return 'closed', 'open', or 'half-open'."""
+        with self._lock:
+            return self._state
+
+    def stats(self):
+        """Return dictionary describing state of circuit breaker."""
+        with self._lock:
+            retry_in = 0.0
+            if self._state == CircuitBreaker.OPEN:
+                retry_in = max(
+                    self._opened_at + self.reset_timeout - time.time(), 0.0)
+            return {'state': self._state,
+                    'failures': self._failures,
+                    'trips': self._trips,
+                    'rejected': self._rejected,
+                    'retry_in': retry_in}
+
+    def reset(self):
+        """Close the circuit."""
+        with self._lock:
+            self._state = CircuitBreaker.CLOSED
+            self._failures = 0
+
+    def before_request(self):
+        """Check that a request may be sent.
+
+        Raise CircuitOpenError if not.  Return True if the caller is allowed
+        through to probe the server, in which case it must record the result
+        of the probe.
+
+        """
+        with self._lock:
+            if self._state == CircuitBreaker.CLOSED:
+                return False
+            now = time.time()
+            retry_in = self._opened_at + self.reset_timeout - now
+            if self._state == CircuitBreaker.OPEN and retry_in <= 0:
+                self._state = CircuitBreaker.HALF_OPEN
+                return True
+            self._rejected += 1
+            raise CircuitOpenError(self.name, max(retry_in, 0.0))
+
+    def record_success(self):
+        """Record a successful request, closing the circuit."""
+        with self._lock:
+            self._failures = 0
+            self._state = CircuitBreaker.CLOSED
+
+    def record_failure(self):
+        """Record a failed request, opening the circuit if necessary."""
+        with self._lock:
+            self._failures += 1
+            if (self._state == CircuitBreaker.HALF_OPEN or
+                    self._failures >= self.failure_threshold):
+                if self._state != CircuitBreaker.OPEN:
+                    self._trips += 1
+                self._state = CircuitBreaker.OPEN
+                self._opened_at = time.time()
+
+    def record_status(self, status):
+        """Record a request that got a response with the given status."""
+        if status in self.failure_statuses:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def release(self):
+        """Record a request that ended without showing the server's health.
+
+        If the request was the half-open probe, then another request may
+        probe the server.
+
+        """
+        with self._lock:
+            if self._state == CircuitBreaker.HALF_OPEN:
+                self._state = CircuitBreaker.OPEN
+                self._opened_at = time.time() - self.reset_timeout
+
+
+# Per-thread reference to the counters, and metrics record, of the RestHttp
+# object that is currently sending a request.  Connection pools may be shared
+# by several RestHttp objects, so pool activity is attributed to the caller
+# this way.
+_local = threading.local()
+
+
+class ConnCounters(object):
+
+    """
+    Counts requests sent, connections opened, and retries by one RestHttp.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.opened = 0
+        self.retries = 0
+
+    def add(self, requests=0, opened=0, retries=0):
+        with self._lock:
+            self.requests += requests
+            self.opened += opened
+            self.retries += retries
+
+    def as_dict(self):
+        """Return dictionary of requests, opened, reused and retries counts."""
+        with self._lock:
+            return {'requests': self.requests,
+                    'opened': self.opened,
+                    'reused': max(self.requests - self.opened, 0),
+                    'retries': self.retries}
+
+
+class CompressionCounters(object):
+
+    """
+    Counts compressed request bodies and bytes saved by compression.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.request_bytes_saved = 0
+        self.responses = 0
+        self.response_bytes_saved = 0
+        self.rejected = False
+
+    def add(self, requests=0, request_bytes_saved=0, responses=0,
+            response_bytes_saved=0):
+        with self._lock:
+            self.requests += requests
+            self.request_bytes_saved += request_bytes_saved
+            self.responses += responses
+            self.response_bytes_saved += response_bytes_saved
+
+    def as_dict(self):
+        with self._lock:
+            return {'requests': self.requests,
+                    'request_bytes_saved': self.request_bytes_saved,
+                    'responses': self.responses,
+                    'response_bytes_saved': self.response_bytes_saved,
+                    'rejected': self.rejected}
+
+
+def gzip_compress(data, level=6):
+    """Return data compressed in gzip format."""
+    co = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return co.compress(data) + co.flush()
+
+
+def compression_rejected(rsp):
+    """Return True if response rejects the encoding of a compressed body,
+    so that it may be sent again uncompressed.
+
+    A 400 response only rejects the encoding if its message names the
+    Content-Encoding header.  Other messages that mention an encoding, such
+    as of a value in the request, are errors in the request itself.
+
+    """
+    if rsp.status_code in COMPRESS_REJECT_STATUSES:
+        return True
+    if rsp.status_code != 400:
+        return False
+    return 'content-encoding' in rsp.text.lower()
+
+
+def _count(requests=0, opened=0):
+    counters = getattr(_local, 'counters', None)
+    if counters is not None:
+        counters.add(requests, opened)
+
+
+def _add_connect_time(seconds):
+    rec = getattr(_local, 'record', None)
+    if rec is not None:
+        rec.connect += seconds
+
+
+class _CountingHTTPConnection(
+        _connectionpool.HTTPConnectionPool.ConnectionCls):
+
+    def connect(self):
+        _count(opened=1)
+        start = time.time()
+        try:
+            return super(_CountingHTTPConnection, self).connect()
+        finally:
+            _add_connect_time(time.time() - start)
+
+
+class _CountingHTTPSConnection(
+        _connectionpool.HTTPSConnectionPool.ConnectionCls):
+
+    def connect(self):
+        _count(opened=1)
+        start = time.time()
+        try:
+            return super(_CountingHTTPSConnection, self).connect()
+        finally:
+            _add_connect_time(time.time() - start)
+
+
+class _KeepAlivePoolMixin(object):
+
+    """
+    Retire pooled connections that are idle too long or have been used too
+    many times, before handing them out for another request.
+
+    """
+
+    idle_timeout = None
+    max_requests = None
+
+    def _get_conn(self, timeout=None):
+        conn = super(_KeepAlivePoolMixin, self)._get_conn(timeout)
+        last_used = getattr(conn, '_stc_last_used', None)
+        used = getattr(conn, '_stc_requests', 0)
+        if ((self.idle_timeout and last_used and
+             time.time() - last_used > self.idle_timeout) or
+                (self.max_requests and used >= self.max_requests)):
+            conn.close()
+            used = 0
+        conn._stc_requests = used + 1
+        _count(requests=1)
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._stc_last_used = time.time()
+        super(_KeepAlivePoolMixin, self)._put_conn(conn)
+
+
+class _KeepAliveHTTPPool(_KeepAlivePoolMixin,
+                         _connectionpool.HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _KeepAliveHTTPSPool(_KeepAlivePoolMixin,
+                          _connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class KeepAliveAdapter(HTTPAdapter):
+
+    """
+    Transport adapter that keeps a pool of persistent connections per server.
+
+    Arguments:
+    pool_size    -- Maximum number of connections kept alive per server.
+    idle_timeout -- Close connections that are idle longer than this many
+                    seconds, instead of reusing them.  None for no limit.
+    max_requests -- Reopen a connection after it has been used for this many
+                    requests.  None for no limit.
+
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, idle_timeout=None,
+                 max_requests=None):
+        attrs = {'idle_timeout': idle_timeout, 'max_requests': max_requests}
+        self._pool_classes = {
+            'http': type('KeepAliveHTTPPool', (_KeepAliveHTTPPool,), attrs),
+            'https': type('KeepAliveHTTPSPool', (_KeepAliveHTTPSPool,), attrs)}
+        super(KeepAliveAdapter, self).__init__(
+            pool_connections=pool_size, pool_maxsize=pool_size)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(KeepAliveAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+
+# Adapters shared by RestHttp objects created with share_pool=True, keyed by
+# the scheme and network location of the server.
+_shared_adapters = {}
+_shared_adapters_lock = threading.Lock()
+
+
+def _shared_adapter(base_url, pool_size, idle_timeout, max_requests):
+    key = requests.utils.urlparse(base_url)[:2]
+    with _shared_adapters_lock:
+        adapter = _shared_adapters.get(key)
+        if adapter is None:
+            adapter = KeepAliveAdapter(pool_size, idle_timeout, max_requests)
+            _shared_adapters[key] = adapter
+        return adapter
+
+
+# Circuit breakers, keyed by server URL (scheme://host:port).
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url, **kwargs):
+    """Return the circuit breaker for the server of the given URL.
+
+    A new CircuitBreaker, created with the given keyword arguments, is
+    returned if the server does not have one yet.  Otherwise the existing one
+    is returned, and the keyword arguments are ignored.
+
+    """
+    parts = requests.utils.urlparse(url)
+    key = '%s://%s' % (parts.scheme, parts.netloc)
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(key)
+        if breaker is None:
+            kwargs.setdefault('name', key)
+            breaker = CircuitBreaker(**kwargs)
+            _circuit_breakers[key] = breaker
+        return breaker
+
+
+def circuit_breakers():
+    """Return dictionary of {server_url: stats} for all circuit breakers."""
+    with _circuit_breakers_lock:
+        breakers = list(_circuit_breakers.items())
+    return {key: breaker.stats() for key, breaker in breakers}
+
+
 class RestHttp(object):
 
     """
@@ -77,16 +612,40 @@ class RestHttp(object):
     """
 
     def __init__(self, base_url, user=None, password=None, ssl_verify=True,
-                 debug_print=False, timeout=None):
+                 debug_print=False, timeout=None, pool_size=DEFAULT_POOL_SIZE,
+                 pool_idle_timeout=None, pool_max_requests=None,
+                 share_pool=False, retry=None, circuit_breaker=None,
+                 compress=False,
+                 compress_threshold=DEFAULT_COMPRESS_THRESHOLD):
         """Initialize the ReST API HTTP wrapper object.
 
         Arguments:
-        base_url    -- Base URL for requests.  Ex: http://example.com/stuff/
-        user        -- Optional user name for basic auth.
-        password    -- Optional password for basic auth.
-        ssl_verify  -- Set to False to disable SSL verification (not secure).
-        debug_print -- Enable debug print statements.
-        timeout     -- Number of seconds to wait for a response.
+        base_url          -- Base URL for requests.  Ex: http://example.com/stuff/
+        user              -- Optional user name for basic auth.
+        password          -- Optional password for basic auth.
+        ssl_verify        -- Set to False to disable SSL verification (not
+                             secure).
+        debug_print       -- Enable debug print statements.
+        timeout           -- Number of seconds to wait for a response.
+        pool_size         -- Number of persistent connections to keep open.
+        pool_idle_timeout -- Seconds a connection may be idle before it is
+                             closed instead of reused.  None for no limit.
+        pool_max_requests -- Requests sent on a connection before it is
+                             reopened.  None for no limit.
+        share_pool        -- Share the connection pool with other RestHttp
+                             objects, in this process, that use the same
+                             server.  The first object to create the shared
+                             pool determines its settings.
+        retry             -- Optional RetryPolicy for retrying requests that
+                             fail with connection errors, timeouts, or
+                             retryable status codes.  None to not retry.
+        circuit_breaker   -- Optional CircuitBreaker, usually shared by all
+                             clients of the server (see get_circuit_breaker),
+                             to fail fast when the server is down.
+        compress          -- Gzip compress bulk request bodies.  If the
+                             server rejects a compressed body, then it is sent
+                             again uncompressed, and compression is turned off.
+        compress_threshold -- Compress bodies of at least this many bytes.
 
         """
         self._base_url = base_url.strip('/')
@@ -105,6 +664,17 @@ class RestHttp(object):
             b64string = base64.encodestring('%s:%s' % (user, password))[:-1]
             self._base_headers["Authorization"] = "Basic %s" % b64string
 
+        self._shared_pool = bool(share_pool)
+        self._session = self._new_session(pool_size, pool_idle_timeout,
+                                          pool_max_requests, share_pool)
+        self._counters = ConnCounters()
+        self._metrics = metrics.RequestMetrics()
+        self._retry = retry
+        self._breaker = circuit_breaker
+        self._compress = bool(compress)
+        self._compress_threshold = compress_threshold
+        self._compress_counters = CompressionCounters()
+
     @staticmethod
     def url(proto, server, port=None, uri=None):
         """Construct a URL from the given components."""
@@ -160,6 +730,89 @@ class RestHttp(object):
         """Return the base URL used for each request."""
         return self._base_url
 
+    def retry_policy(self):
+        """Return the RetryPolicy, or None if requests are not retried."""
+        return self._retry
+
+    def set_retry_policy(self, retry):
+        """Set RetryPolicy for retrying failed requests.  None to not retry."""
+        self._retry = retry
+
+    def circuit_breaker(self):
+        """Return the CircuitBreaker, or None if not using one."""
+        return self._breaker
+
+    def conn_stats(self):
+        """Return counts of requests sent, connections opened and reused, and
+        of retries.
+
+        Return:
+        {'requests': num_requests, 'opened': num_opened, 'reused': num_reused,
+         'retries': num_retries}
+
+        """
+        return self._counters.as_dict()
+
+    def compression(self):
+        """Return (enabled, threshold) of bulk request body compression."""
+        return self._compress, self._compress_threshold
+
+    def set_compression(self, enabled, threshold=None):
+        """Turn gzip compression of bulk request bodies on or off.
+
+        Arguments:
+        enabled   -- True to compress bulk request bodies.
+        threshold -- Optional minimum size, in bytes, of bodies to compress.
+
+        """
+        self._compress = bool(enabled)
+        if threshold is not None:
+            self._compress_threshold = threshold
+        if enabled:
+            self._compress_counters.rejected = False
+
+    def compression_stats(self):
+        """Return counts of compressed requests and responses, and of bytes
+        saved by compressing them.
+
+        Return:
+        {'requests': num_compressed_requests,
+         'request_bytes_saved': num_bytes,
+         'responses': num_compressed_responses,
+         'response_bytes_saved': num_bytes,
+         'rejected': True if the server rejected a compressed body}
+
+        """
+        return self._compress_counters.as_dict()
+
+    def stats(self):
+        """Return request metrics keyed by 'METHOD container'.
+
+        Each entry has the number of requests and errors, bytes sent and
+        received, counts by status, and the count, mean, max, p50, p90, and p99
+        seconds of each part of the requests: total, connect, ttfb (time to
+        first byte of the response), and transfer (of the response body).
+
+        """
+        return self._metrics.stats()
+
+    def reset_stats(self):
+        """Discard collected request metrics."""
+        self._metrics.reset()
+
+    def prometheus_metrics(self, prefix='stcrestclient'):
+        """Return request metrics in Prometheus text exposition format."""
+        counters = self._counters.as_dict()
+        counters = {'connections_opened': counters['opened'],
+                    'connections_reused': counters['reused'],
+                    'retries': counters['retries']}
+        return self._metrics.prometheus(prefix, counters)
+
+    def close(self):
+        """Close persistent connections, unless the pool is shared."""
+        if not self._shared_pool and self._session is not None:
+            self._session.close()
+
     def make_url(self, container=None, resource=None, query_items=None):
         """Create a URL from the specified parts."""
         pth = [self._base_url]
@@ -183,8 +836,8 @@ class RestHttp(object):
         headers = self._make_headers(None)
 
         try:
-            rsp = requests.head(url, headers=self._base_headers,
-                                verify=self._verify, timeout=self._timeout)
+            rsp = self._send('HEAD', url, headers=self._base_headers,
+                             container=container or resource)
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
 
@@ -204,8 +857,8 @@ class RestHttp(object):
             query_items = None
 
         try:
-            rsp = requests.get(url, query_items, headers=headers,
-                               verify=self._verify, timeout=self._timeout)
+            rsp = self._send('GET', url, params=query_items, headers=headers,
+                             container=container or resource)
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
 
@@ -220,8 +873,8 @@ class RestHttp(object):
         headers = self._make_headers(accept)
 
         try:
-            rsp = requests.post(url, data=params, headers=headers,
-                                verify=self._verify, timeout=self._timeout)
+            rsp = self._send('POST', url, data=params, headers=headers,
+                             container=container or resource)
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
 
@@ -236,8 +889,8 @@ class RestHttp(object):
         headers = self._make_headers(accept)
 
         try:
-            rsp = requests.put(url, params, headers=headers,
-                               verify=self._verify, timeout=self._timeout)
+            rsp = self._send('PUT', url, data=params, headers=headers,
+                             container=container or resource)
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
 
@@ -257,8 +910,8 @@ class RestHttp(object):
             query_items = None
 
         try:
-            rsp = requests.delete(url, params=query_items, headers=headers,
-                                  verify=self._verify, timeout=self._timeout)
+            rsp = self._send('DELETE', url, params=query_items,
+                             headers=headers, container=container or resource)
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
 
@@ -267,16 +920,103 @@ class RestHttp(object):
 
         return self._handle_response(rsp)
 
+    def stream_request(self, method, container, resource=None,
+                       query_items=None, params=None, accept=None,
+                       headers=None, chunk_size=STREAM_CHUNK_SIZE):
+        """Send a request and return an iterator over the response body.
+
+        The body is read from the connection and decoded as UTF-8 text as it
+        is iterated, without holding the whole body in memory.  An error
+        response raises RestHttpError before the iterator is returned.
+
+        Arguments:
+        method      -- HTTP method, such as 'GET' or 'POST'.
+        container   -- Container part of URL.
+        resource    -- Optional resource part of URL.
+        query_items -- Optional query parameters (dictionary or list).
+        params      -- Optional request body parameters.
+        accept      -- Optional value for Accept header.
+        headers     -- Optional dictionary of additional headers.
+        chunk_size  -- Bytes to read from the connection at a time.
+
+        Return:
+        Iterator over text chunks of the response body.
+
+        """
+        url = self.make_url(container, resource)
+        hdrs = self._make_headers(accept)
+        if headers:
+            hdrs = dict(hdrs)
+            hdrs.update(headers)
+
+        if query_items and isinstance(query_items, (list, tuple, set)):
+            url += RestHttp._list_query_str(query_items)
+            query_items = None
+
+        try:
+            rsp = self._send(method, url, params=query_items, data=params,
+                             headers=hdrs, stream=True,
+                             container=container or resource)
+        except requests.exceptions.ConnectionError as e:
+            RestHttp._raise_conn_error(e)
+
+        if self._dbg_print:
+            self.__print_req(method, rsp.url, hdrs, params)
+
+        if rsp.status_code >= 300:
+            self._finish_record(rsp)
+            self._handle_response(rsp)
+
+        def text_chunks():
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            try:
+                for buff in rsp.iter_content(chunk_size=chunk_size):
+                    text = decoder.decode(buff)
+                    if text:
+                        yield text
+                text = decoder.decode(b'', True)
+                if text:
+                    yield text
+            finally:
+                rsp.close()
+                self._finish_record(rsp)
+
+        return text_chunks()
+
     def download_file(self, container, resource, save_path=None, accept=None,
-                      query_items=None):
+                      query_items=None, parallel=DOWNLOAD_PARALLEL,
+                      segment_size=DOWNLOAD_SEGMENT_SIZE, resume=True):
         """Download a file.
 
+        The file is written to save_path + '.part', which is renamed to
+        save_path when the download is complete.  If the server reports the
+        size of the file, and the file is larger than segment_size, then it is
+        downloaded in byte ranges over up to parallel connections at once.  If
+        the server ignores byte ranges, the file is downloaded as one stream.
+
+        If resume is True, and an earlier download of the same file to the
+        same path was interrupted, then only the missing parts are fetched.
+        Interrupted reads are also resumed, up to DOWNLOAD_ATTEMPTS times.
+        A download is only resumed if the server identifies the version of
+        the file with an ETag or Last-Modified header, so that parts of a
+        changed file are not mixed; otherwise it is started over.
+
         If a timeout defined, it is not a time limit on the entire download;
         rather, an exception is raised if the server has not issued a response
         for timeout seconds (more precisely, if no bytes have been received on
         the underlying socket for timeout seconds). If no timeout is specified
         explicitly, requests do not time out.
 
+        Arguments:
+        container    -- Container part of URL.
+        resource     -- Path of file resource.
+        save_path    -- Optional path to write file to.
+        accept       -- Optional value for Accept header.
+        query_items  -- Optional query parameters (dictionary or list).
+        parallel     -- Maximum number of connections to download with.
+        segment_size -- Bytes to fetch in each ranged request.
+        resume       -- Resume an interrupted download of the file.
+
         """
         resource = resource.replace("\\", "/")
         url = self.make_url(container, resource)
@@ -289,32 +1029,52 @@ class RestHttp(object):
             url += RestHttp._list_query_str(query_items)
             query_items = None
 
+        part_path = save_path + '.part'
+        state_path = part_path + '.json'
+        state = None
+        if resume:
+            state = RestHttp._load_download_state(state_path, part_path)
+
         try:
-            rsp = requests.get(url, query_items, headers=headers, stream=True,
-                               verify=self._verify, timeout=self._timeout)
+            size = validator = None
+            if parallel > 1 or state:
+                size, validator = self._probe_download(url, query_items,
+                                                       headers, container)
+            if state and (not validator or state.get('size') != size or
+                          state.get('validator') != validator):
+                state = None
+
+            done = False
+            if size and parallel > 1 and size > segment_size:
+                if state and state.get('segment_size') != segment_size:
+                    state = None
+                done = self._download_ranges(
+                    url, query_items, headers, container, part_path,
+                    state_path, state, size, validator, parallel,
+                    segment_size)
+                state = None
+            if not done:
+                self._download_stream(url, query_items, headers, container,
+                                      part_path, state_path, state, size,
+                                      validator)
+        except (RestHttpError, ConnectionError):
+            raise
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
-
-        if self._dbg_print:
-            self.__print_req('GET', rsp.url, headers, None)
-
-        if rsp.status_code >= 300:
-            raise RestHttpError(rsp.status_code, rsp.reason, rsp.text)
-
-        file_size_dl = 0
-        try:
-            with open(save_path, 'wb') as f:
-                for buff in rsp.iter_content(chunk_size=16384):
-                    f.write(buff)
         except Exception as e:
             raise RuntimeError('could not download file: ' + str(e))
-        finally:
-            rsp.close()
 
+        if os.path.exists(save_path):
+            os.remove(save_path)
+        os.rename(part_path, save_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+        file_size_dl = os.path.getsize(save_path)
         if self._dbg_print:
             print('===> downloaded %d bytes to %s' % (file_size_dl, save_path))
 
-        return rsp.status_code, save_path, os.path.getsize(save_path)
+        return 200, save_path, file_size_dl
 
     def upload_file(self, container, src_file_path, dst_name=None, put=True,
                     content_type=None):
@@ -340,63 +1100,505 @@ class RestHttp(object):
             url = self.make_url(container, None, None)
         with open(src_file_path, 'rb') as up_file:
             try:
-                rsp = requests.request(method, url, headers=headers,
-                                       data=up_file, timeout=self._timeout)
+                rsp = self._send(method, url, headers=headers, data=up_file,
+                                 container=container)
             except requests.exceptions.ConnectionError as e:
                 RestHttp._raise_conn_error(e)
 
         return self._handle_response(rsp)
 
     def upload_file_mp(self, container, src_file_path, dst_name=None,
-                       content_type=None):
-        """Upload a file using multi-part encoding."""
+                       content_type=None, progress=None):
+        """Upload a file using multi-part encoding.
+
+        The file is read in chunks as the request body is sent.  If progress
+        is given, it is called as progress(dst_name, bytes_sent, file_size,
+        bytes_per_sec) as the file is sent.
+
+        """
         if not os.path.exists(src_file_path):
             raise RuntimeError('file not found: ' + src_file_path)
         if not dst_name:
             dst_name = os.path.basename(src_file_path)
         if not content_type:
             content_type = "application/octet.stream"
-        url = self.make_url(container, None, None)
-        headers = self._base_headers
-        with open(src_file_path, 'rb') as up_file:
-            files = {'file': (dst_name, up_file, content_type)}
-            try:
-                rsp = requests.post(url, headers=headers, files=files,
-                                    timeout=self._timeout)
-            except requests.exceptions.ConnectionError as e:
-                RestHttp._raise_conn_error(e)
+        return self._post_multipart(
+            container, [('file', (dst_name, src_file_path, content_type))],
+            progress)
 
-        return self._handle_response(rsp)
+    def upload_files(self, container, src_dst_map, content_type=None,
+                     progress=None):
+        """Upload multiple files.
 
-    def upload_files(self, container, src_dst_map, content_type=None):
-        """Upload multiple files."""
+        Files are opened one at a time, and read in chunks, as the request
+        body is sent.  If progress is given, it is called as
+        progress(dst_name, bytes_sent, file_size, bytes_per_sec) as each file
+        is sent.
+
+        """
         if not content_type:
             content_type = "application/octet.stream"
-        url = self.make_url(container, None, None)
-        headers = self._base_headers
         multi_files = []
+        for src_path in src_dst_map:
+            dst_name = src_dst_map[src_path]
+            if not dst_name:
+                dst_name = os.path.basename(src_path)
+            multi_files.append(('files', (dst_name, src_path, content_type)))
+        return self._post_multipart(container, multi_files, progress)
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _new_session(self, pool_size, pool_idle_timeout, pool_max_requests,
+                     share_pool):
+        """Return requests.Session that sends requests over the pool."""
+        if share_pool:
+            adapter = _shared_adapter(self._base_url, pool_size,
+                                      pool_idle_timeout, pool_max_requests)
+        else:
+            adapter = KeepAliveAdapter(pool_size, pool_idle_timeout,
+                                       pool_max_requests)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _send(self, method, url, container=None, **kwargs):
+        """Send a request using a persistent connection from the pool.
+
+        If there is a retry policy, then retry the request as it allows.  The
+        container names the kind of request in the request metrics.
+
+        """
+        kwargs.setdefault('verify', self._verify)
+        kwargs.setdefault('timeout', self._timeout)
+        retry = self._retry
+        if retry is None:
+            return self._send_once(method, url, container, kwargs)
+
+        body_pos = RestHttp._body_positions(kwargs)
+        start = time.time()
+        retry_num = 0
+        while True:
+            retry_num += 1
+            try:
+                rsp = self._send_once(method, url, container, kwargs)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                delay = retry.retry_delay(
+                    method, retry_num, time.time() - start,
+                    sent=not RestHttp._conn_not_sent(e))
+                if delay is None:
+                    raise
+                if self._dbg_print:
+                    print('===> retry %d in %.2fs after error: %s' %
+                          (retry_num, delay, e))
+            else:
+                if rsp.status_code < 300:
+                    return rsp
+                delay = retry.retry_delay(
+                    method, retry_num, time.time() - start, rsp.status_code,
+                    retry_after=RetryPolicy.parse_retry_after(
+                        rsp.headers.get('retry-after')))
+                if delay is None:
+                    return rsp
+                rsp.close()
+                self._finish_record(rsp)
+                if self._dbg_print:
+                    print('===> retry %d in %.2fs after status %s' %
+                          (retry_num, delay, rsp.status_code))
+            self._counters.add(retries=1)
+            time.sleep(delay)
+            RestHttp._rewind_body(body_pos)
+
+    def _send_once(self, method, url, container, kwargs):
+        breaker = self._breaker
+        if breaker is not None and breaker.before_request():
+            if breaker.probe_path:
+                self._probe_server(breaker)
+        rec = self._metrics.start(method, container)
+        _local.counters = self._counters
+        _local.record = rec
         try:
-            for src_path in src_dst_map:
-                dst_name = src_dst_map[src_path]
-                if not dst_name:
-                    dst_name = os.path.basename(src_path)
-                multi_files.append(
-                    ('files', (dst_name, open(src_path, 'rb'), content_type)))
-
-            rsp = requests.post(url, headers=headers, files=multi_files,
-                                timeout=self._timeout)
+            rsp = self._session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout):
+            if breaker is not None:
+                breaker.record_failure()
+            self._metrics.finish(rec)
+            raise
+        except Exception:
+            if breaker is not None:
+                breaker.release()
+            self._metrics.finish(rec)
+            raise
+        finally:
+            _local.counters = None
+            _local.record = None
+        if breaker is not None:
+            breaker.record_status(rsp.status_code)
+
+        rec.status = rsp.status_code
+        rec.ttfb = max(rsp.elapsed.total_seconds() - rec.connect, 0.0)
+        length = rsp.request.headers.get('Content-Length')
+        if length and length.isdigit():
+            rec.request_bytes = int(length)
+        rsp._stc_record = rec
+        if not kwargs.get('stream'):
+            self._finish_record(rsp)
+        return rsp
+
+    def _probe_download(self, url, query_items, headers, container):
+        """Return (size, validator) of a file to download.
+
+        Size is None if the server does not report the size of the file, or
+        does not accept byte ranges.  Validator is the ETag or Last-Modified
+        value that identifies the version of the file, if the server gives one.
+
+        """
+        hdrs = dict(headers)
+        hdrs['Accept-Encoding'] = 'identity'
+        rsp = self._send('HEAD', url, params=query_items, headers=hdrs,
+                         container=container)
+        if (rsp.status_code >= 300 or
+                rsp.headers.get('accept-ranges', '').lower() == 'none'):
+            return None, None
+        length = rsp.headers.get('content-length', '')
+        if not length.isdigit() or rsp.headers.get('content-encoding'):
+            return None, None
+        return int(length), (rsp.headers.get('etag') or
+                             rsp.headers.get('last-modified'))
+
+    def _download_ranges(self, url, query_items, headers, container,
+                         part_path, state_path, state, size, validator,
+                         parallel, segment_size):
+        """Download file in segments over parallel connections.
+
+        Segments are written into a file, preallocated to the full size, as
+        they are received.  The segments that are complete are recorded in the
+        state file, so that an interrupted download can be resumed.
+
+        Return False, without downloading the file, if the server ignores the
+        byte ranges of the requests.
+
+        """
+        done = set()
+        if state:
+            done.update(state.get('done', ()))
+        else:
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+        state = {'mode': 'ranges', 'size': size, 'validator': validator,
+                 'segment_size': segment_size, 'done': sorted(done)}
+        RestHttp._save_download_state(state_path, state)
+
+        num_segs = (size + segment_size - 1) // segment_size
+        pending = collections.deque(
+            i for i in range(num_segs) if i not in done)
+        hdrs = dict(headers)
+        hdrs['Accept-Encoding'] = 'identity'
+        if validator:
+            hdrs['If-Range'] = validator
+        lock = threading.Lock()
+        errors = []
+        ignored = []
+
+        def worker():
+            with open(part_path, 'r+b') as f:
+                while not errors and not ignored:
+                    try:
+                        seg = pending.popleft()
+                    except IndexError:
+                        return
+                    start = seg * segment_size
+                    end = min(start + segment_size, size) - 1
+                    try:
+                        if not self._fetch_range(url, query_items, hdrs,
+                                                 container, f, start, end):
+                            ignored.append(seg)
+                            return
+                    except Exception as e:
+                        errors.append(e)
+                        return
+                    with lock:
+                        done.add(seg)
+                        state['done'] = sorted(done)
+                        RestHttp._save_download_state(state_path, state)
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(min(parallel, len(pending)))]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+
+        if errors:
+            raise errors[0]
+        if ignored:
+            if self._dbg_print:
+                print('===> server ignored byte range, downloading stream')
+            return False
+        return True
+
+    def _fetch_range(self, url, query_items, headers, container, f, start,
+                     end):
+        """Download bytes start to end, inclusive, into file at start.
+
+        If reading the response is interrupted, then request the rest of the
+        range again.  Return False if the server ignores the byte range.
+
+        """
+        hdrs = dict(headers)
+        pos = start
+        attempt = 0
+        while True:
+            attempt += 1
+            hdrs['Range'] = 'bytes=%d-%d' % (pos, end)
+            rsp = self._send('GET', url, params=query_items, headers=hdrs,
+                             stream=True, container=container)
+            try:
+                if rsp.status_code == 200:
+                    return False
+                if rsp.status_code != 206:
+                    raise RestHttpError(rsp.status_code, rsp.reason,
+                                        rsp.text)
+                f.seek(pos)
+                for buff in rsp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    f.write(buff)
+                    pos += len(buff)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout):
+                if attempt >= DOWNLOAD_ATTEMPTS:
+                    raise
+                continue
+            finally:
+                rsp.close()
+                self._finish_record(rsp)
+            if pos > end:
+                return True
+            if attempt >= DOWNLOAD_ATTEMPTS:
+                raise RuntimeError('incomplete response for range %d-%d' %
+                                   (start, end))
+
+    def _download_stream(self, url, query_items, headers, container,
+                         part_path, state_path, state, size, validator):
+        """Download file as a single stream.
+
+        If the partial file of an earlier download is present, or reading the
+        response is interrupted, then request the rest of the file with a
+        byte range.  If the server ignores the range, the file has changed, or
+        there is no validator to tell whether it has, then start over.
+
+        """
+        offset = 0
+        if (state and state.get('mode') == 'stream' and
+                os.path.exists(part_path)):
+            offset = os.path.getsize(part_path)
+        attempt = 0
+        while True:
+            attempt += 1
+            hdrs = headers
+            if offset:
+                hdrs = dict(headers)
+                hdrs['Accept-Encoding'] = 'identity'
+                hdrs['Range'] = 'bytes=%d-' % offset
+                if validator:
+                    hdrs['If-Range'] = validator
+            rsp = self._send('GET', url, params=query_items, headers=hdrs,
+                             stream=True, container=container)
+            try:
+                if self._dbg_print:
+                    self.__print_req('GET', rsp.url, hdrs, None)
+                if rsp.status_code == 416 and offset:
+                    if offset == size:
+                        return
+                    # Partial file is not a prefix of this file.
+                    offset = 0
+                    continue
+                if rsp.status_code >= 300:
+                    raise RestHttpError(rsp.status_code, rsp.reason,
+                                        rsp.text)
+                if rsp.status_code != 206:
+                    offset = 0
+                    validator = (rsp.headers.get('etag') or
+                                 rsp.headers.get('last-modified'))
+                if not rsp.headers.get('content-encoding'):
+                    RestHttp._save_download_state(state_path, {
+                        'mode': 'stream', 'size': size,
+                        'validator': validator})
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    for buff in rsp.iter_content(chunk_size=16384):
+                        f.write(buff)
+                return
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout):
+                if (attempt >= DOWNLOAD_ATTEMPTS or
+                        rsp.headers.get('content-encoding')):
+                    raise
+                offset = os.path.getsize(part_path) if validator else 0
+            finally:
+                rsp.close()
+                self._finish_record(rsp)
+
+    @staticmethod
+    def _load_download_state(state_path, part_path):
+        """Return the saved state of an interrupted download, or None."""
+        if not (os.path.exists(state_path) and os.path.exists(part_path)):
+            return None
+        try:
+            with open(state_path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save_download_state(state_path, state):
+        with open(state_path, 'w') as f:
+            json.dump(state, f)
+
+    def _post_multipart(self, container, files, progress):
+        """POST files with a streaming multipart encoded body."""
+        url = self.make_url(container, None, None)
+        body = multipart.MultipartEncoder(files, progress)
+        headers = dict(self._base_headers)
+        headers['Content-Type'] = body.content_type
+        try:
+            rsp = self._send('POST', url, headers=headers, data=body,
+                             container=container)
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
         finally:
-            for n, info in multi_files:
-                dst, f, ctype = info
-                f.close()
+            body.close()
 
         return self._handle_response(rsp)
 
-    ###########################################################################
-    # private methods
-    #
+    def _send_bulk(self, method, url, container, params, headers):
+        """Send bulk request, with body compressed if enabled.
+
+        If the server rejects the encoding of the compressed body, then send
+        it again uncompressed.  If that succeeds, do not compress any more
+        bodies.
+
+        """
+        zipped = self._compress_body(params)
+        if zipped is None:
+            return self._send(method, url, data=params, headers=headers,
+                              container=container)
+        body, saved = zipped
+        zheaders = dict(headers)
+        zheaders['content-encoding'] = 'gzip'
+        zheaders['content-length'] = str(len(body))
+        rsp = self._send(method, url, data=body, headers=zheaders,
+                         container=container)
+        if not compression_rejected(rsp):
+            self._compress_counters.add(requests=1,
+                                        request_bytes_saved=saved)
+            return rsp
+        rsp.close()
+        rsp = self._send(method, url, data=params, headers=headers,
+                         container=container)
+        self._compression_rejected(rsp.status_code)
+        return rsp
+
+    def _compress_body(self, params):
+        """Return (gzipped_body, bytes_saved) if the body is to be compressed,
+        or None if it is not.
+
+        """
+        if (not self._compress or self._compress_counters.rejected or
+                not params or len(params) < self._compress_threshold):
+            return None
+        data = params
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        body = gzip_compress(data)
+        if len(body) >= len(data):
+            return None
+        return body, len(data) - len(body)
+
+    def _compression_rejected(self, status):
+        """Stop compressing if uncompressed retry of rejected body worked."""
+        if status < 300:
+            self._compress_counters.rejected = True
+            self._compress = False
+            if self._dbg_print:
+                print('===> server rejected compressed body, compression off')
+
+    def _finish_record(self, rsp):
+        """Add the metrics of a response, after its body has been read."""
+        rec = rsp.__dict__.pop('_stc_record', None)
+        if rec is None:
+            return
+        rec.transfer = max(
+            time.time() - rec.start - rec.connect - rec.ttfb, 0.0)
+        content = rsp.__dict__.get('_content')
+        try:
+            rec.response_bytes = rsp.raw.tell()
+        except Exception:
+            rec.response_bytes = len(content) if content else 0
+        if (content and rsp.headers.get('content-encoding', '').lower() in
+                ('gzip', 'deflate')):
+            self._compress_counters.add(
+                responses=1,
+                response_bytes_saved=max(len(content) - rec.response_bytes,
+                                         0))
+        self._metrics.finish(rec)
+
+    def _probe_server(self, breaker):
+        """Send probe request for half-open circuit breaker."""
+        url = self.make_url(breaker.probe_path)
+        try:
+            rsp = self._session.request('GET', url, headers=self._base_headers,
+                                        verify=self._verify,
+                                        timeout=self._timeout)
+            rsp.close()
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout):
+            breaker.record_failure()
+            raise CircuitOpenError(breaker.name, breaker.reset_timeout)
+        except Exception:
+            breaker.release()
+            raise
+        breaker.record_status(rsp.status_code)
+        if breaker.state() != CircuitBreaker.CLOSED:
+            raise CircuitOpenError(breaker.name, breaker.reset_timeout)
+
+    @staticmethod
+    def _conn_not_sent(e):
+        """Return True if error shows the request never reached the server."""
+        if isinstance(e, requests.exceptions.ConnectTimeout):
+            return True
+        reason = e.args[0] if e.args else None
+        reason = getattr(reason, 'reason', reason)
+        new_conn_error = getattr(_urllib3_exceptions, 'NewConnectionError',
+                                 None)
+        return bool(new_conn_error and isinstance(reason, new_conn_error))
+
+    @staticmethod
+    def _body_positions(kwargs):
+        """Get positions of file objects in the request body, to rewind."""
+        files = []
+        data = kwargs.get('data')
+        if hasattr(data, 'seek') and hasattr(data, 'tell'):
+            files.append(data)
+        multi_files = kwargs.get('files') or ()
+        if isinstance(multi_files, dict):
+            multi_files = multi_files.items()
+        for item in multi_files:
+            # Item is (field, (name, file_obj, content_type)).
+            f = item[1][1]
+            if hasattr(f, 'seek') and hasattr(f, 'tell'):
+                files.append(f)
+        return [(f, f.tell()) for f in files]
+
+    @staticmethod
+    def _rewind_body(positions):
+        for f, pos in positions:
+            f.seek(pos)
 
     def _make_headers(self, accept):
         if accept:
@@ -414,7 +1616,7 @@ class RestHttp(object):
         if rsp.status_code != 204:
             if rsp.headers.get('content-type', app_json).startswith(app_json):
                 try:
-                    data = rsp.json()
+                    data = self._decode_json(rsp, to_lower)
                 except Exception:
                     data = None
 
@@ -423,7 +1625,7 @@ class RestHttp(object):
 
             if sys.hexversion < 0x03000000:
                 data = self._conv_to_str2(data, to_lower)
-            else:
+            elif isinstance(data, bytes):
                 data = self._conv_to_str3(data, to_lower)
 
             if self._dbg_print:
@@ -451,6 +1653,22 @@ class RestHttp(object):
 
         return rsp.status_code, data
 
+    def _decode_json(self, rsp, to_lower):
+        """Parse a JSON response body.
+
+        On Python 3 the parsed data is returned as is, without walking it.  If
+        to_lower is set, then the body is lowercased before it is parsed.
+        Characters written as escape sequences are not changed by that, so if
+        there are any the parsed data is walked to lowercase them.
+
+        """
+        if not to_lower or sys.hexversion < 0x03000000:
+            return rsp.json()
+        text = rsp.content.decode('utf-8')
+        if '\\u' in text:
+            return self._conv_to_str3(json.loads(text), True)
+        return json.loads(text.lower())
+
     @staticmethod
     def _list_query_str(items):
         return '?' + '&'.join(items)
@@ -518,8 +1736,8 @@ class RestHttp(object):
             query_items = None
 
         try:
-            rsp = requests.get(url, query_items, headers=myheaders,
-                               verify=self._verify, timeout=self._timeout)
+            rsp = self._send('GET', url, params=query_items, headers=myheaders,
+                             container=container)
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
 
@@ -536,8 +1754,7 @@ class RestHttp(object):
         myheaders["content-length"] = str(len(params))
         myheaders["content-type"] = "application/json"
         try:
-            rsp = requests.put(url, params, headers=myheaders,
-                               verify=self._verify, timeout=self._timeout)
+            rsp = self._send_bulk('PUT', url, container, params, myheaders)
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
 
@@ -555,8 +1772,7 @@ class RestHttp(object):
         myheaders["content-type"] = "application/json"
 
         try:
-            rsp = requests.post(url, data=params, headers=myheaders,
-                                verify=self._verify, timeout=self._timeout)
+            rsp = self._send_bulk('POST', url, container, params, myheaders)
         except requests.exceptions.ConnectionError as e:
             RestHttp._raise_conn_error(e)
 
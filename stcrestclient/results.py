@@ -0,0 +1,142 @@
+"""
+Paged reading of subscribed results.
+
+ResultsSubscribeCommand returns a ResultDataSet, whose result objects are
+read one page at a time: set PageNumber of the data set, get its
+ResultHandleList, then get the counters of each result object on the page.
+ResultReader gets the counters of all the result objects on a page with one
+bulkget, parsed as it is received, and returns them as typed columns:
+
+    rds = stc.perform('ResultsSubscribeCommand', Parent='project1',
+                      ConfigType='Analyzer',
+                      ResultType='AnalyzerPortResults')['ReturnedDataSet']
+    reader = stc.result_reader(rds, ['TotalFrameCount', 'L1BitRate'])
+    for page in reader:
+        rates = page['L1BitRate'].to_numpy()
+
+Each page takes three requests, however many result objects are on it.
+
+"""
+from __future__ import absolute_import
+
+try:
+    from . import columns
+except ValueError:
+    import columns
+
+# Keys of objects returned by bulkget that are not counters, besides
+# relations, which end with _RELATION_SIDES.
+_NOT_COUNTERS = ('handle', 'object_type', 'children', 'parent')
+_RELATION_SIDES = ('-targets', '-sources')
+
+
+class ResultReader(object):
+
+    """
+    Reads the result objects of a ResultDataSet, a page at a time.
+
+    Arguments:
+    stc              -- StcHttp object with the session of the data set.
+    dataset          -- Handle of ResultDataSet.
+    properties       -- Counters to read, as list or space-separated string.
+                        If None, read all attributes of the result objects,
+                        except parent and relations, with a column for
+                        each, added as they are seen.
+    records_per_page -- If given, set RecordsPerPage of the data set.
+    bulk             -- True to get each page with one bulkget, False to
+                        get each result object separately, or None to use
+                        bulkget if the server has the bulk API.
+
+    """
+
+    def __init__(self, stc, dataset, properties=None, records_per_page=None,
+                 bulk=None):
+        if properties is not None and not isinstance(properties,
+                                                     (list, tuple)):
+            properties = properties.split()
+        self.stc = stc
+        self.dataset = dataset
+        self.properties = list(properties) if properties else None
+        self._bulk = bulk
+        if records_per_page:
+            stc.config(dataset, RecordsPerPage=records_per_page)
+
+    def __iter__(self):
+        return self.pages()
+
+    def page_count(self):
+        """Return number of pages in data set."""
+        return int(self.stc.get(self.dataset, 'TotalPageCount') or 0)
+
+    def page_handles(self, page):
+        """Return handles of result objects on page, numbered from 1."""
+        self.stc.config(self.dataset, PageNumber=page)
+        return self.stc.get(self.dataset, 'ResultHandleList').split()
+
+    def read_page(self, page):
+        """Return counters of result objects on page, numbered from 1.
+
+        Return:
+        columns.ColumnTable with result handles as keys and a column for
+        each counter.
+
+        """
+        return self._read(self.page_handles(page), self._new_table())
+
+    def pages(self, start=1):
+        """Iterate over pages from start to the last page, returning a
+        columns.ColumnTable for each.  The number of pages is read once,
+        before the first page.
+
+        """
+        for page in range(start, self.page_count() + 1):
+            yield self.read_page(page)
+
+    def read_all(self):
+        """Return counters of all result objects, from all pages, in one
+        columns.ColumnTable.
+
+        """
+        table = self._new_table()
+        for page in range(1, self.page_count() + 1):
+            self._read(self.page_handles(page), table)
+        return table
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _new_table(self):
+        return columns.ColumnTable(self.properties or ())
+
+    def _read(self, handles, table):
+        if not handles:
+            return table
+        if self._bulk is None:
+            self._bulk = self.stc.has_bulk_ops()
+        if self._bulk:
+            objs = self.stc.iter_bulkget(' '.join(handles), self.properties)
+        else:
+            objs = (self._get(h) for h in handles)
+        extend = self.properties is None
+        for obj in objs:
+            if extend:
+                values = dict((k, v) for k, v in obj.items()
+                              if not _not_counter(k.lower()))
+            else:
+                # Only columns of properties are kept.
+                values = obj
+            table.append(obj.get('handle'), values, extend)
+        return table
+
+    def _get(self, handle):
+        props = self.properties or ()
+        values = self.stc.get(handle, *props)
+        if len(props) == 1:
+            values = {props[0]: values}
+        values['handle'] = handle
+        return values
+
+
+def _not_counter(key):
+    return key in _NOT_COUNTERS or key.endswith(_RELATION_SIDES)
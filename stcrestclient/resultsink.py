@@ -0,0 +1,478 @@
+"""
+Streaming of result counters to Parquet, CSV, or JSON Lines files.
+
+A ResultSink takes batches of counters, as columns.ColumnTable objects such
+as the pages of a results.ResultReader or the table returned by
+query_objects, and writes them to a file in row groups of a fixed number of
+rows, so memory use does not grow with the length of a test:
+
+    reader = stc.result_reader(rds, ['TotalFrameCount', 'L1BitRate'])
+    with resultsink.open_sink('soak.parquet') as sink:
+        sink.sample(reader, interval=10, duration=3600)
+
+Each row holds the handle of a result object, the time of the sample, and
+the counters.  When counters appear that earlier rows do not have, or, for
+Parquet, when a column of integers gets a value that is not an integer, the
+file can not hold the new rows, so the rows are written to a new part of the
+file, named with a part number before the extension, such as
+soak.1.parquet.  JSON Lines files hold any rows, and never need new parts.
+
+Parquet files are written with pyarrow, which must be installed to use them.
+
+"""
+from __future__ import absolute_import
+
+import collections
+import csv
+import json
+import os
+import sys
+import time
+
+try:
+    from . import columns
+except ValueError:
+    import columns
+
+# Rows buffered by ResultSink before they are written as a row group.
+DEFAULT_ROW_GROUP_ROWS = 10000
+
+# Names of the columns holding the key of each row, and the sample time.
+KEY_COLUMN = 'handle'
+TIME_COLUMN = 'timestamp'
+
+# Writer class for each file name extension.
+EXTENSIONS = {'.csv': 'CsvWriter', '.jsonl': 'JsonlWriter',
+              '.ndjson': 'JsonlWriter', '.parquet': 'ParquetWriter',
+              '.pq': 'ParquetWriter'}
+
+# Order in which column kinds widen, for typed writers.
+_WIDER = {'int': 0, 'float': 1, 'str': 2}
+
+_KEY = object()
+
+
+class ResultSink(object):
+
+    """
+    Buffers rows of counters, and writes them in row groups.
+
+    Columns are added as new counters are seen, and keep their order, so
+    each row group has the columns of all the row groups before it.
+
+    Arguments:
+    writer         -- Writer of files, such as CsvWriter, JsonlWriter, or
+                      ParquetWriter.
+    row_group_rows -- Rows to buffer before writing them.
+
+    """
+
+    def __init__(self, writer, row_group_rows=DEFAULT_ROW_GROUP_ROWS):
+        self.writer = writer
+        self.row_group_rows = max(1, row_group_rows)
+        self.rows = 0
+        self.samples = 0
+        self._names = []
+        self._buffer = columns.ColumnTable(self._names)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, table, timestamp=None):
+        """Add rows of table, a columns.ColumnTable keyed by handle.
+
+        Arguments:
+        table     -- Rows to add.
+        timestamp -- Optional time of the rows, as seconds since the epoch,
+                     written in a column named TIME_COLUMN.
+
+        """
+        buf = self._buffer
+        if timestamp is not None:
+            buf.add_column(TIME_COLUMN)
+        for key, values in table.rows():
+            if timestamp is not None:
+                values[TIME_COLUMN] = timestamp
+            buf.append(key, values, True)
+            if len(buf) >= self.row_group_rows:
+                self.flush()
+                buf = self._buffer
+                if timestamp is not None:
+                    buf.add_column(TIME_COLUMN)
+        self.rows += len(table)
+
+    def sample(self, source, interval, count=None, duration=None):
+        """Write rows from source at each sampling interval.
+
+        Samples are taken every interval seconds, from the start of the
+        first sample.  If a sample takes longer than the interval, the next
+        one starts when it ends.  Rows of each sample have the time that the
+        sample started.
+
+        Arguments:
+        source   -- Iterable of columns.ColumnTable objects, such as a
+                    results.ResultReader, iterated again for each sample, or
+                    a callable that returns a table or an iterable of tables.
+        interval -- Seconds between the start of each sample.
+        count    -- Number of samples to take, or None for no limit.
+        duration -- Seconds to take samples for, or None for no limit.
+
+        Return:
+        Number of samples taken.
+
+        """
+        start = time.time()
+        taken = 0
+        next_time = start
+        while count is None or taken < count:
+            now = time.time()
+            if duration is not None and now - start >= duration:
+                break
+            if next_time > now:
+                time.sleep(next_time - now)
+                now = time.time()
+            tables = source() if callable(source) else source
+            if isinstance(tables, columns.ColumnTable):
+                tables = (tables,)
+            for table in tables:
+                self.write(table, now)
+            taken += 1
+            self.samples += 1
+            next_time = max(next_time + interval, time.time())
+        return taken
+
+    def flush(self):
+        """Write buffered rows."""
+        if len(self._buffer):
+            self.writer.write(self._buffer)
+            self._names = self._buffer.names
+        self._buffer = columns.ColumnTable(self._names)
+
+    def close(self):
+        """Write buffered rows and close the writer."""
+        self.flush()
+        self.writer.close()
+
+
+class _FileWriter(object):
+
+    """
+    Writes tables to a file, and to new parts of the file when a table has
+    columns that the current part can not hold.
+
+    Arguments:
+    path   -- Path of file to write.
+    append -- If True, add to the existing file, or to its last part.
+              Otherwise, overwrite the file.  Parts left from earlier runs
+              are not removed.
+
+    """
+
+    # Whether kinds of columns are part of the schema of a file.
+    typed = False
+    # Whether new columns are written without starting a new part.
+    extensible = False
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.append = append
+        self.paths = []
+        self._part = None
+        self._names = None
+        self._kinds = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def part_path(self, part):
+        """Return path of part of file, numbered from 0."""
+        if not part:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        return '%s.%d%s' % (root, part, ext)
+
+    def write(self, table):
+        """Write rows of table, a columns.ColumnTable keyed by handle."""
+        if self._part is None:
+            part, names, kinds, existing = self._start()
+        else:
+            part, names, kinds = self._part, self._names, self._kinds
+            existing = True
+        new_names, new_kinds = _merge(names, kinds, table, self.typed)
+        changed = new_names is not names or new_kinds is not kinds
+        if changed and self.extensible:
+            self._names, self._kinds = new_names, new_kinds
+        elif changed and existing:
+            if self._part is not None:
+                self._close_file()
+            self._open_part(part + 1, new_names, new_kinds, False)
+        if self._part is None:
+            self._open_part(part, new_names, new_kinds, existing)
+        self._write(table)
+
+    def close(self):
+        """Close the file."""
+        if self._part is not None:
+            self._close_file()
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _start(self):
+        """Return part to write first, and names and kinds of columns of
+        rows in it, with existing True if appending to rows already in it.
+
+        """
+        return (self._last_part(), [KEY_COLUMN], {KEY_COLUMN: 'str'},
+                self.append)
+
+    def _last_part(self):
+        if not self.append:
+            return 0
+        part = 0
+        while os.path.exists(self.part_path(part + 1)):
+            part += 1
+        return part
+
+    def _open_part(self, part, names, kinds, existing):
+        self._part = part
+        self._names = names
+        self._kinds = kinds
+        path = self.part_path(part)
+        self._open(path, existing)
+        self.paths.append(path)
+
+    def _rows(self, table):
+        """Iterate over rows of table as lists of values, in the order of
+        the columns of the file, with None for missing values.
+
+        """
+        cols = [_KEY if n.lower() == KEY_COLUMN else
+                (table[n] if n in table else None) for n in self._names]
+        for i, key in enumerate(table.keys):
+            row = []
+            for col in cols:
+                if col is None:
+                    row.append(None)
+                elif col is _KEY:
+                    row.append(key)
+                else:
+                    v = col.values[i]
+                    row.append(None if v != v else v)
+            yield row
+
+
+class CsvWriter(_FileWriter):
+
+    """
+    Writes rows to a CSV file, with a header of column names.
+
+    When appending, rows are added to the last part of the file if they
+    have no columns that its header does not list.
+
+    """
+
+    def _start(self):
+        part, names, kinds, existing = _FileWriter._start(self)
+        header = None
+        if existing:
+            try:
+                with _open_csv(self.part_path(part), 'r') as f:
+                    header = next(csv.reader(f), None)
+            except (IOError, OSError):
+                pass
+        if not header:
+            return part, names, kinds, False
+        return part, header, dict((n.lower(), 'str') for n in header), True
+
+    def _open(self, path, existing):
+        self._file = _open_csv(path, 'a' if existing else 'w')
+        self._csv = csv.writer(self._file)
+        if not existing:
+            self._csv.writerow(self._names)
+
+    def _write(self, table):
+        writerow = self._csv.writerow
+        for row in self._rows(table):
+            writerow(['' if v is None else
+                      repr(v) if isinstance(v, float) else v for v in row])
+
+    def _close_file(self):
+        self._file.close()
+
+
+class JsonlWriter(_FileWriter):
+
+    """
+    Writes rows to a JSON Lines file, one JSON object for each row.
+
+    Missing values are written as null.  New columns are added to later
+    rows, so the file never needs new parts.
+
+    """
+
+    extensible = True
+
+    def _open(self, path, existing):
+        self._file = open(path, 'a' if existing else 'w')
+
+    def _write(self, table):
+        names = self._names
+        write = self._file.write
+        for row in self._rows(table):
+            write(json.dumps(collections.OrderedDict(zip(names, row))))
+            write('\n')
+
+    def _close_file(self):
+        self._file.close()
+
+
+class ParquetWriter(_FileWriter):
+
+    """
+    Writes rows to a Parquet file, a row group for each table written.
+
+    Columns of integers are int64, columns of numbers are float64, and other
+    columns are strings.  Missing values are null.  A Parquet file can not
+    be appended to, so when appending, rows are written to a new part.
+
+    Arguments:
+    path        -- Path of file to write.
+    append      -- If True, write to a new part after the last part of the
+                   file.  Otherwise, overwrite the file.
+    compression -- Compression codec, such as 'snappy', 'zstd', or None.
+
+    """
+
+    typed = True
+
+    def __init__(self, path, append=False, compression='snappy'):
+        import pyarrow
+        import pyarrow.parquet
+        _FileWriter.__init__(self, path, append)
+        self.compression = compression
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._writer = None
+
+    def _start(self):
+        part, names, kinds, existing = _FileWriter._start(self)
+        if existing and os.path.exists(self.part_path(part)):
+            part += 1
+        return part, names, kinds, False
+
+    def _open(self, path, existing):
+        pa = self._pa
+        kinds = self._kinds
+        self._schema = pa.schema([(n, self._arrow_type(kinds[n.lower()]))
+                                  for n in self._names])
+        self._writer = self._pq.ParquetWriter(
+            path, self._schema, compression=self.compression)
+
+    def _write(self, table):
+        pa = self._pa
+        n = len(table)
+        arrays = []
+        for name, field in zip(self._names, self._schema):
+            if name == KEY_COLUMN:
+                arrays.append(pa.array(table.keys, pa.string()))
+            elif name in table:
+                arrays.append(self._arrow_array(table[name], field.type, n))
+            else:
+                arrays.append(pa.nulls(n, field.type))
+        batch = pa.Table.from_arrays(arrays, schema=self._schema)
+        self._writer.write_table(batch, row_group_size=max(n, 1))
+
+    def _close_file(self):
+        self._writer.close()
+        self._writer = None
+
+    def _arrow_type(self, kind):
+        pa = self._pa
+        if kind == 'int':
+            return pa.int64()
+        if kind == 'float':
+            return pa.float64()
+        return pa.string()
+
+    def _arrow_array(self, col, arrow_type, n):
+        pa = self._pa
+        if pa.types.is_string(arrow_type):
+            return pa.array([_text(v) for v in col.values], pa.string())
+        if col.kind == 'float' and pa.types.is_integer(arrow_type):
+            # Only a column with no values is kept in an integer column.
+            return pa.nulls(n, arrow_type)
+        if col.kind == 'int':
+            # Share the memory of the column, without copying.
+            arr = pa.Array.from_buffers(pa.int64(), n,
+                                        [None, pa.py_buffer(col.values)])
+            return arr.cast(arrow_type) if arrow_type != pa.int64() else arr
+        return pa.array(list(col.values), arrow_type, from_pandas=True)
+
+
+def open_sink(path, append=False, row_group_rows=DEFAULT_ROW_GROUP_ROWS,
+              **kwargs):
+    """Return ResultSink writing to path, with the writer for the extension
+    of path, listed in EXTENSIONS.  Other keyword arguments are passed to
+    the writer.
+
+    Raise ValueError if the extension is not known.
+
+    """
+    ext = os.path.splitext(path)[1].lower()
+    name = EXTENSIONS.get(ext)
+    if name is None:
+        raise ValueError('unknown result file type: %s' % (path,))
+    writer = globals()[name](path, append, **kwargs)
+    return ResultSink(writer, row_group_rows)
+
+
+def _merge(names, kinds, table, typed):
+    """Return names and kinds of columns that hold rows of table, as well
+    as the rows of a file with names and kinds.
+
+    """
+    new_names = None
+    new_kinds = None
+    for col in table.columns():
+        key = col.name.lower()
+        kind = col.kind if typed else 'str'
+        old = kinds.get(key)
+        if old is None:
+            if new_names is None:
+                new_names, new_kinds = list(names), dict(kinds)
+            new_names.append(col.name)
+            new_kinds[key] = kind
+        elif _WIDER[kind] > _WIDER[old] and not _missing(col):
+            if new_kinds is None:
+                new_names, new_kinds = list(names), dict(kinds)
+            new_kinds[key] = kind
+    if new_names is None:
+        return names, kinds
+    return new_names, new_kinds
+
+
+def _missing(col):
+    """Return True if all values of column are None or NaN."""
+    return all(v is None or v != v for v in col.values)
+
+
+def _text(v):
+    if v is None or v != v:
+        return None
+    if isinstance(v, float):
+        return repr(v)
+    return str(v)
+
+
+def _open_csv(path, mode):
+    if sys.version_info[0] < 3:
+        return open(path, mode + 'b')
+    return open(path, mode, newline='')
@@ -0,0 +1,263 @@
+"""
+In-memory snapshot of a subtree of automation objects.
+
+A Snapshot is built from the objects returned by a bulkget of a subtree, so
+that walking the configuration, and finding objects by type, name, parent,
+or relation, is done locally instead of with a get request for each step:
+
+    snap = stc.snapshot('project1', depth=6)
+    devices = snap.related('port2', 'AffiliationPort-sources')
+    routes = snap.find('BgpIpv4RouteConfig', under=devices)
+    names = [snap[h].get('Name') for h in routes]
+
+A snapshot is not updated when objects change on the server.  Take a new one
+to see the changes.
+
+"""
+from __future__ import absolute_import
+
+import collections
+
+try:
+    from . import locations
+except ValueError:
+    import locations
+
+# Levels of children included in a snapshot, unless specified.
+DEFAULT_DEPTH = 10
+
+_RELATION_SIDES = {'-targets': '-sources', '-sources': '-targets'}
+
+try:
+    _STR_TYPES = (str, unicode)
+except NameError:
+    _STR_TYPES = (str,)
+
+
+class SnapshotObject(object):
+
+    """
+    Object in a snapshot.
+
+    Attributes are kept with lowercase names, and children, parent, and
+    relations as handles.
+
+    """
+
+    __slots__ = ('handle', 'type', 'attrs', 'parent', 'children',
+                 'relations')
+
+    def __init__(self, handle, obj_type, attrs, parent):
+        self.handle = handle
+        self.type = obj_type
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+        self.relations = {}
+
+    def __repr__(self):
+        return '<SnapshotObject %s>' % (self.handle,)
+
+    def get(self, name, default=None):
+        """Return value of attribute, ignoring case of name."""
+        return self.attrs.get(name.lower(), default)
+
+
+class Snapshot(object):
+
+    """
+    Graph of objects, indexed by handle, type, and name.
+
+    Arguments:
+    objects -- Iterable of object dictionaries, as returned by bulkget, with
+               children as nested lists of dictionaries.
+
+    """
+
+    def __init__(self, objects=()):
+        self.roots = []
+        self._objects = collections.OrderedDict()
+        self._by_type = {}
+        self._by_name = {}
+        for obj in objects:
+            self.roots.append(self._add(obj, None))
+        # Once all objects are added, so both ends of relations are known.
+        for obj in self:
+            self._add_relations(obj, obj.attrs)
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, handle):
+        return str(handle).lower() in self._objects
+
+    def __iter__(self):
+        return iter(self._objects.values())
+
+    def __getitem__(self, handle):
+        """Return SnapshotObject with handle.  Raise KeyError if it is not
+        in the snapshot.
+
+        """
+        return self._objects[str(handle).lower()]
+
+    def get(self, handle, default=None):
+        return self._objects.get(str(handle).lower(), default)
+
+    def by_type(self, object_type):
+        """Return handles of objects of type, in tree order."""
+        return list(self._by_type.get(object_type.lower(), ()))
+
+    def by_name(self, name):
+        """Return handles of objects with Name, ignoring case."""
+        return list(self._by_name.get(name.lower(), ()))
+
+    def parent(self, handle):
+        """Return handle of parent of object, or None for a root."""
+        return self[handle].parent
+
+    def children(self, handle, object_type=None):
+        """Return handles of children of object, optionally of one type."""
+        children = self[handle].children
+        if object_type is None:
+            return list(children)
+        object_type = object_type.lower()
+        return [c for c in children if _type_of(self.get(c)) == object_type]
+
+    def descendants(self, handle, object_type=None):
+        """Return handles of objects below object, in tree order,
+        optionally of one type.
+
+        """
+        if object_type is not None:
+            object_type = object_type.lower()
+        found = []
+        stack = list(reversed(self[handle].children))
+        while stack:
+            h = stack.pop()
+            obj = self.get(h)
+            if obj is None:
+                continue
+            if object_type is None or obj.type == object_type:
+                found.append(h)
+            stack.extend(reversed(obj.children))
+        return found
+
+    def related(self, handle, relation):
+        """Return handles related to object, by relation name such as
+        'AffiliationPort-targets' or 'AffiliationPort-sources'.
+
+        """
+        return list(self[handle].relations.get(relation.lower(), ()))
+
+    def find(self, object_type=None, under=None, name=None):
+        """Return handles of objects matching all the given criteria.
+
+        Arguments:
+        object_type -- Type of objects.
+        under       -- Handle, or list of handles, of objects to search
+                       below.  None to search the whole snapshot.
+        name        -- Name of objects, ignoring case.
+
+        """
+        if under is None:
+            if object_type is not None:
+                found = self.by_type(object_type)
+            else:
+                found = [o.handle for o in self]
+        else:
+            if isinstance(under, _STR_TYPES):
+                under = under.split()
+            found = []
+            for h in under:
+                found.extend(self.descendants(h, object_type))
+        if name is not None:
+            names = set(self.by_name(name))
+            found = [h for h in found if h in names]
+        return found
+
+    def locate(self, location):
+        """Return handles of objects at bulk API location, such as
+        '/port[@name ^= port]/emulateddevice', evaluated locally.  See
+        locations.Location.
+
+        """
+        return locations.compile(location).handles(self)
+
+    def add_relations(self, objects):
+        """Add relation edges from object dictionaries, such as returned by
+        bulkget of relation names, with children as nested lists.
+
+        """
+        stack = list(objects)
+        while stack:
+            data = stack.pop()
+            obj = self.get(data.get('handle'))
+            if obj is not None:
+                self._add_relations(obj, data)
+            children = data.get('children')
+            if isinstance(children, list):
+                stack.extend(children)
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _add(self, data, parent):
+        root = None
+        stack = [(data, parent)]
+        while stack:
+            data, parent = stack.pop()
+            handle = str(data['handle']).lower()
+            obj_type = data.get('object_type') or _type_of_handle(handle)
+            attrs = {}
+            children = None
+            for k, v in data.items():
+                key = k.lower()
+                if key == 'children':
+                    children = v
+                elif key not in ('handle', 'object_type', 'parent'):
+                    attrs[key] = v
+            if parent is None and data.get('parent'):
+                parent = str(data['parent']).lower()
+            obj = SnapshotObject(handle, obj_type.lower(), attrs, parent)
+            self._objects[handle] = obj
+            self._by_type.setdefault(obj.type, []).append(handle)
+            name = attrs.get('name')
+            if name is not None:
+                self._by_name.setdefault(str(name).lower(), []).append(handle)
+            if isinstance(children, list):
+                obj.children = [str(c['handle']).lower() for c in children]
+                stack.extend((c, handle) for c in reversed(children))
+            elif children:
+                # Below the depth of the snapshot; handles only.
+                obj.children = children.lower().split()
+            if root is None:
+                root = obj
+        return root
+
+    def _add_relations(self, obj, attrs):
+        for key, value in attrs.items():
+            key = key.lower()
+            side = key[-8:]
+            if side not in _RELATION_SIDES or not isinstance(value,
+                                                             _STR_TYPES):
+                continue
+            other_side = key[:-8] + _RELATION_SIDES[side]
+            handles = value.lower().split()
+            obj.relations[key] = handles
+            for h in handles:
+                other = self.get(h)
+                if other is None:
+                    continue
+                edges = other.relations.setdefault(other_side, [])
+                if obj.handle not in edges:
+                    edges.append(obj.handle)
+
+
+def _type_of(obj):
+    return obj.type if obj is not None else None
+
+
+def _type_of_handle(handle):
+    return handle.rstrip('0123456789')
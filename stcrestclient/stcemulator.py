@@ -0,0 +1,1349 @@
+"""
+In-process emulator of the STC ReST API server.
+
+StcEmulator serves the /stcapi endpoints used by the clients in this package
+from a threaded HTTP server, and keeps the objects, files, and chassis
+connections of each test session in memory.  It is for exercising and
+benchmarking clients without a TestCenter server:
+
+    from stcrestclient import stcemulator, stchttp
+    with stcemulator.StcEmulator() as emu:
+        stc = stchttp.StcHttp(emu.host, emu.port)
+        stc.new_session('user', 'bench')
+        port = stc.create('port', 'project1', location='//10.1.1.1/1/1')
+
+The time taken to answer requests, and the size of responses, are set for
+each endpoint by an EndpointModel.  Random variation is drawn from generators
+seeded by the emulator, so results are the same from run to run.
+
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import fnmatch
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import unquote, parse_qsl, urlsplit
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import parse_qsl, urlsplit
+
+try:
+    from . import locations
+except ValueError:
+    import locations
+
+# ReST API version reported by the emulator.
+DEFAULT_API_VERSION = '3.0.0'
+
+# TestCenter version reported by the emulator.
+DEFAULT_STC_VERSION = '5.16.0'
+
+# Commands listed by help for 'commands'.
+HELP_COMMANDS = ('apply', 'config', 'connect', 'connectall', 'create',
+                 'delete', 'disconnect', 'disconnectall', 'get', 'help',
+                 'log', 'perform')
+
+# Object and command types described by help, as {type: (description,
+# parents, attributes, relations)}.  Each attribute is (name, type) or, if it
+# is read-only, (name, type, False).  Config types also have Name and Active.
+HELP_TYPES = {
+    'System': ('Root of the object tree.', (),
+               (('Version', 'string', False),), ()),
+    'Project': ('Test configuration.', ('System',), (), ()),
+    'Sequencer': ('Runs the command sequence.', ('System',),
+                  (('State', 'enum', False), ('TestState', 'enum', False)),
+                  ()),
+    'Port': ('Test port.', ('Project',),
+             (('Location', 'string'), ('UseDefaultHost', 'bool')),
+             ('AffiliationPort',)),
+    'EmulatedDevice': ('Emulated host or router.', ('Project',),
+                       (('DeviceCount', 'u32'), ('RouterId', 'ip'),
+                        ('EnablePingResponse', 'bool')),
+                       ('AffiliationPort', 'TopLevelIf', 'PrimaryIf')),
+    'EthIIIf': ('Ethernet II interface.', ('EmulatedDevice',),
+                (('SourceMac', 'mac'),), ('StackedOnEndpoint',)),
+    'Ipv4If': ('IPv4 interface.', ('EmulatedDevice',),
+               (('Address', 'ip'), ('Gateway', 'ip'),
+                ('PrefixLength', 'u8')), ('StackedOnEndpoint',)),
+    'BgpRouterConfig': ('BGP router.', ('EmulatedDevice',),
+                        (('AsNum', 'u16'), ('DutAsNum', 'u16'),
+                         ('IpVersion', 'enum')), ()),
+    'BgpIpv4RouteConfig': ('BGP IPv4 route block.', ('BgpRouterConfig',),
+                           (('AsPath', 'string'), ('NextHop', 'ip')), ()),
+    'Ipv4NetworkBlock': ('Block of IPv4 networks.', ('BgpIpv4RouteConfig',),
+                         (('StartIpList', 'ip'), ('PrefixLength', 'u8'),
+                          ('NetworkCount', 'u32')), ()),
+    'ResultDataSet': ('Subscribed results.', ('Project',),
+                      (('PageNumber', 'u32'), ('RecordsPerPage', 'u32'),
+                       ('ResultType', 'string'), ('ConfigType', 'string'),
+                       ('TotalPageCount', 'u32', False),
+                       ('ResultHandleList', 'handle', False)), ()),
+    'GetObjectsCommand': ('Get properties of objects.', (),
+                          (('ClassName', 'string'),
+                           ('PropertyList', 'string'),
+                           ('Condition', 'string'), ('RootList', 'handle'),
+                           ('PropertyValues', 'string', False)), ()),
+    'DeviceCreateCommand': ('Create emulated devices.', (),
+                            (('DeviceType', 'string'),
+                             ('ParentList', 'handle'),
+                             ('CreateCount', 'u32'), ('Port', 'handle'),
+                             ('IfStack', 'string'), ('IfCount', 'string'),
+                             ('ReturnList', 'handle', False)), ()),
+    'DeleteCommand': ('Delete objects.', (),
+                      (('ConfigList', 'handle'),), ()),
+    'LoadFromXmlCommand': ('Load configuration from XML file.', (),
+                           (('FileName', 'inputFilePath'),), ()),
+    'SaveAsXmlCommand': ('Save configuration as XML file.', (),
+                         (('FileName', 'outputFilePath'),), ()),
+    'SequencerStartCommand': ('Start the sequencer.', (), (), ()),
+    'ResultsSubscribeCommand': ('Subscribe to results.', (),
+                                (('Parent', 'handle'),
+                                 ('ConfigType', 'string'),
+                                 ('ResultType', 'string'),
+                                 ('RecordsPerPage', 'u32'),
+                                 ('ReturnedDataSet', 'handle', False)), ()),
+    'ResultDataSetUnsubscribeCommand': ('Unsubscribe from results.', (),
+                                        (('ResultDataSet', 'handle'),), ()),
+}
+
+# Counters of the result objects created by ResultsSubscribeCommand, by
+# result type, as (name, scale).  Each result object has its own rate, and
+# counters named ...Rate are the rate times scale, while the other counters
+# count up at that rate from the time of the subscription.
+RESULT_COUNTERS = {
+    'analyzerportresults': (('TotalFrameCount', 1), ('TotalOctetCount', 128),
+                            ('SigFrameCount', 1), ('FcsErrorFrameCount', 0),
+                            ('TotalFrameRate', 1), ('L1BitRate', 1216)),
+    'generatorportresults': (('GeneratorFrameCount', 1),
+                             ('GeneratorOctetCount', 128),
+                             ('GeneratorSigFrameCount', 1),
+                             ('GeneratorFrameRate', 1),
+                             ('GeneratorBitRate', 1024)),
+}
+DEFAULT_RESULT_COUNTERS = (('FrameCount', 1), ('OctetCount', 128),
+                           ('FrameRate', 1))
+# Records per page of a result data set, unless specified.
+DEFAULT_RECORDS_PER_PAGE = 100
+
+_JSON = 'application/json'
+
+
+class EndpointModel(object):
+
+    """
+    Latency and payload-size model of an endpoint.
+
+    Arguments:
+    latency        -- Seconds to wait before sending each response.
+    per_kb         -- Additional seconds to wait per KiB of request and
+                      response body, to emulate a link of limited bandwidth.
+    jitter         -- Maximum random variation of the wait, as a fraction of
+                      it.  Ex: 0.1 varies the wait by up to 10% either way.
+    pad            -- Bytes of whitespace added to each JSON response body.
+    pad_per_object -- Bytes of whitespace added to a JSON response body for
+                      each object it contains.
+
+    """
+
+    def __init__(self, latency=0.0, per_kb=0.0, jitter=0.0, pad=0,
+                 pad_per_object=0):
+        self.latency = latency
+        self.per_kb = per_kb
+        self.jitter = jitter
+        self.pad = pad
+        self.pad_per_object = pad_per_object
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def seed(self, value):
+        with self._lock:
+            self._rng.seed(value)
+
+    def delay(self, request_bytes, response_bytes):
+        """Return seconds to wait before sending a response."""
+        wait = self.latency + (
+            self.per_kb * (request_bytes + response_bytes) / 1024.0)
+        if self.jitter and wait:
+            with self._lock:
+                wait *= 1.0 + self._rng.uniform(-self.jitter, self.jitter)
+        return max(wait, 0.0)
+
+    def padding(self, objects=0):
+        """Return bytes to add to a JSON response body."""
+        return b' ' * (self.pad + self.pad_per_object * objects)
+
+
+class EmulatorError(Exception):
+
+    """Error returned to the client as a JSON response."""
+
+    def __init__(self, status, message):
+        super(EmulatorError, self).__init__(message)
+        self.status = status
+        self.message = message
+
+
+class _Object(object):
+
+    __slots__ = ('handle', 'type', 'parent', 'children', 'attrs', 'names')
+
+    def __init__(self, handle, obj_type, parent):
+        self.handle = handle
+        self.type = obj_type
+        self.parent = parent
+        self.children = []
+        self.attrs = {}
+        self.names = {}
+
+    def set(self, name, value):
+        key = name.lower()
+        self.attrs[key] = value
+        self.names.setdefault(key, name)
+
+
+class _Session(object):
+
+    """
+    Objects, files, and chassis connections of one test session.
+
+    """
+
+    def __init__(self, sid, user, name, emulator):
+        self.sid = sid
+        self.user = user
+        self.name = name
+        self.created = time.time()
+        self.lock = threading.RLock()
+        self.objects = {}
+        self.counters = {}
+        self.relations = {}
+        self.datasets = {}
+        self.results = {}
+        self.files = {}
+        self.chassis = {}
+        self.log = []
+        self._emu = emulator
+        system = self.create('system', None, {
+            'Version': emulator.stc_version, 'Name': 'StcSystem 1'})
+        self.create('project', system, {'Name': 'Project 1'})
+        self.create('sequencer', system, {
+            'State': 'IDLE', 'TestState': 'NONE'})
+
+    def create(self, obj_type, parent, attrs=None):
+        """Create object of type under parent object, and return it."""
+        type_key = obj_type.lower()
+        num = self.counters.get(type_key, 0) + 1
+        self.counters[type_key] = num
+        obj = _Object('%s%d' % (type_key, num), type_key, parent)
+        obj.set('Name', '%s %d' % (obj_type, num))
+        obj.set('Active', 'true')
+        for i in range(self._emu.object_attrs):
+            obj.set('Attr%d' % (i + 1,), 'v' * self._emu.attr_size)
+        self.objects[obj.handle] = obj
+        if parent is not None:
+            parent.children.append(obj)
+        if attrs:
+            self.config(obj, attrs)
+        return obj
+
+    def delete(self, obj):
+        """Delete object and all its descendants."""
+        for child in list(obj.children):
+            self.delete(child)
+        if obj.parent is not None:
+            obj.parent.children.remove(obj)
+        self.objects.pop(obj.handle, None)
+        self.datasets.pop(obj.handle, None)
+        self.results.pop(obj.handle, None)
+        for key in [k for k in self.relations if k[1] == obj.handle]:
+            del self.relations[key]
+        for targets in self.relations.values():
+            while obj.handle in targets:
+                targets.remove(obj.handle)
+
+    def lookup(self, handle):
+        """Return object with handle, or handle.childtype path."""
+        path = str(handle).strip().lower().split('.')
+        obj = self.objects.get(path[0])
+        for child_type in path[1:]:
+            if obj is None:
+                break
+            obj = self._first_child(obj, child_type)
+        if obj is None:
+            raise EmulatorError(404, 'object not found: %s' % (handle,))
+        return obj
+
+    def config(self, obj, attrs):
+        """Set attributes and relations of object."""
+        for name, value in attrs.items():
+            key = name.lower()
+            if key.endswith('-targets'):
+                self.relations[(key[:-8], obj.handle)] = _handles(value)
+            elif key in ('children', 'parent', 'handle', 'object_type'):
+                raise EmulatorError(400, 'attribute is read-only: %s' % name)
+            else:
+                if isinstance(value, bool):
+                    value = str(value).lower()
+                obj.set(name, value if isinstance(value, str) else
+                        str(value))
+
+    def get_attr(self, obj, name):
+        """Return value of one attribute or relation of object."""
+        key = name.lower()
+        if key == 'children':
+            return ' '.join(c.handle for c in obj.children)
+        if key.startswith('children-'):
+            child_type = key[9:]
+            return ' '.join(c.handle for c in obj.children
+                            if c.type == child_type)
+        if key == 'parent':
+            return obj.parent.handle if obj.parent is not None else ''
+        if key == 'handle':
+            return obj.handle
+        if key == 'object_type':
+            return obj.type
+        if key.endswith('-targets'):
+            return ' '.join(self.relations.get((key[:-8], obj.handle), ()))
+        if key.endswith('-sources'):
+            rel = key[:-8]
+            return ' '.join(src for (r, src), targets in
+                            sorted(self.relations.items())
+                            if r == rel and obj.handle in targets)
+        if obj.handle in self.datasets:
+            if key == 'resulthandlelist':
+                return ' '.join(r.handle for r in self.result_page(obj))
+            if key == 'totalpagecount':
+                return str(self._page_count(obj))
+        elif obj.handle in self.results:
+            self._update_counters(obj)
+        if '.' in key:
+            path = key.split('.')
+            for child_type in path[:-1]:
+                obj = self._first_child(obj, child_type)
+                if obj is None:
+                    return ''
+            return self.get_attr(obj, path[-1])
+        return obj.attrs.get(key, '')
+
+    def _first_child(self, obj, child_type):
+        for child in obj.children:
+            if child.type == child_type:
+                return child
+        return None
+
+    def attributes(self, obj, names=None):
+        """Return dictionary of the named, or all, attributes of object."""
+        if names:
+            return dict((n, self.get_attr(obj, n)) for n in names)
+        if obj.handle in self.results:
+            self._update_counters(obj)
+        result = dict((obj.names[k], v) for k, v in obj.attrs.items())
+        result['children'] = self.get_attr(obj, 'children')
+        result['parent'] = self.get_attr(obj, 'parent')
+        for rel, src in self.relations:
+            if src == obj.handle:
+                name = rel + '-targets'
+                result[name] = self.get_attr(obj, name)
+        if obj.handle in self.datasets:
+            for name in ('TotalPageCount', 'ResultHandleList'):
+                result[name] = self.get_attr(obj, name)
+        return result
+
+    def subscribe(self, parent, config_type, result_type,
+                  records_per_page=None):
+        """Create result data set, with a result object of result_type
+        under each object of config_type below parent, and return it.
+
+        """
+        rds = self.create('ResultDataSet', self.objects['project1'], {
+            'ResultType': result_type, 'ConfigType': config_type,
+            'RecordsPerPage': records_per_page or DEFAULT_RECORDS_PER_PAGE,
+            'PageNumber': 1})
+        config_type = config_type.lower()
+        counters = RESULT_COUNTERS.get(result_type.lower(),
+                                       DEFAULT_RESULT_COUNTERS)
+        now = time.time()
+        results = []
+        for obj in self.descendants(parent):
+            if obj.type != config_type:
+                continue
+            res = self.create(result_type, obj)
+            rate = 100 + zlib.crc32(res.handle.encode()) % 900
+            self.results[res.handle] = (counters, rate, now)
+            self._update_counters(res)
+            results.append(res)
+        self.datasets[rds.handle] = results
+        return rds
+
+    def result_page(self, rds):
+        """Return result objects on the current page of data set."""
+        per_page = _to_int(rds.attrs.get('recordsperpage'),
+                           DEFAULT_RECORDS_PER_PAGE) or 1
+        page = max(_to_int(rds.attrs.get('pagenumber'), 1), 1)
+        start = (page - 1) * per_page
+        return self.datasets[rds.handle][start:start + per_page]
+
+    def _page_count(self, rds):
+        per_page = _to_int(rds.attrs.get('recordsperpage'),
+                           DEFAULT_RECORDS_PER_PAGE) or 1
+        return -(-len(self.datasets[rds.handle]) // per_page)
+
+    def _update_counters(self, obj):
+        counters, rate, start = self.results[obj.handle]
+        elapsed = time.time() - start
+        for name, scale in counters:
+            if name.endswith('Rate'):
+                obj.set(name, '%.1f' % (rate * scale,))
+            else:
+                obj.set(name, str(int(rate * scale * elapsed)))
+
+    def descendants(self, obj):
+        stack = list(reversed(obj.children))
+        while stack:
+            o = stack.pop()
+            yield o
+            stack.extend(reversed(o.children))
+
+    def locate(self, location):
+        """Return objects at a location path.
+
+        Locations are evaluated as described in the locations module.
+
+        """
+        try:
+            return locations.compile(location).select(_SessionTree(self))
+        except ValueError as e:
+            raise EmulatorError(400, str(e))
+
+    def to_dict(self, obj, names=None, depth=1):
+        """Return object as a dictionary, with children to depth."""
+        result = {'handle': obj.handle, 'object_type': obj.type}
+        result.update(self.attributes(obj, names))
+        if depth > 1:
+            result['children'] = [self.to_dict(c, names, depth - 1)
+                                  for c in obj.children]
+        return result
+
+
+class _SessionTree(object):
+
+    """Objects of session, as a tree for locations.Location.select."""
+
+    def __init__(self, session):
+        self._ses = session
+
+    def lookup(self, handle):
+        return self._ses.objects.get(handle)
+
+    def top_level(self):
+        return self._ses.objects['project1'].children
+
+    def all_objects(self):
+        return list(self._ses.descendants(self._ses.objects['system1']))
+
+    def children(self, obj):
+        return obj.children
+
+    def object_type(self, obj):
+        return obj.type
+
+    def handle(self, obj):
+        return obj.handle
+
+    def value(self, obj, attr):
+        return self._ses.get_attr(obj, attr)
+
+
+_COND_RE = re.compile(
+    r'^\s*([\w.-]+)\s*(!=|=)\s*(?:\'([^\']*)\'|"([^"]*)"|(\S+))\s*$')
+_HANDLE_RE = re.compile(r'[A-Za-z_][\w.]*\d')
+
+
+def _help_type(name):
+    """Return name of help type, ignoring case, or None if not known."""
+    name = name.lower()
+    for t in HELP_TYPES:
+        if t.lower() == name:
+            return t
+    return None
+
+
+def _help_text(name):
+    """Return help text describing an object or command type."""
+    desc, parents, attrs, relations = HELP_TYPES[name]
+    if not name.endswith('Command'):
+        attrs = (('Name', 'string'), ('Active', 'bool')) + attrs
+    children = sorted(t for t, info in HELP_TYPES.items() if name in info[1])
+    lines = ['%s:' % name, '', 'Description:', '    ' + desc, '',
+             'Parents: ' + ' '.join(parents),
+             'Children: ' + ' '.join(children), '']
+    for title, writable in (('Writable Attributes:', True),
+                            ('Read-Only Attributes:', False)):
+        lines.append(title)
+        lines.extend('    %s (%s)' % (a[0], a[1]) for a in attrs
+                     if (len(a) < 3 or a[2]) == writable)
+        lines.append('')
+    lines.append('Relations: ' + ' '.join(relations))
+    return '\n'.join(lines)
+
+
+def _handles(value):
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(str(v) for v in value)
+    return [h.lower() for h in _HANDLE_RE.findall(str(value))]
+
+
+def _to_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _condition(session, text):
+    """Return predicate of object for a GetObjectsCommand condition.
+
+    Conditions are comparisons, attr='value' or attr!='value', joined by AND
+    and OR.  AND binds more tightly than OR.
+
+    """
+    if not text or not text.strip():
+        return lambda obj: True
+    alternatives = []
+    for part in re.split(r'\s+OR\s+', text.strip(), flags=re.I):
+        terms = []
+        for term in re.split(r'\s+AND\s+', part, flags=re.I):
+            m = _COND_RE.match(term)
+            if m is None:
+                raise EmulatorError(400, 'invalid condition: %s' % text)
+            attr, op, v1, v2, v3 = m.groups()
+            value = [v for v in (v1, v2, v3) if v is not None][0]
+            terms.append((attr, op == '=', value))
+        alternatives.append(terms)
+
+    def match(obj):
+        for terms in alternatives:
+            if all((session.get_attr(obj, attr) == value) == eq
+                   for attr, eq, value in terms):
+                return True
+        return False
+
+    return match
+
+
+class _Request(object):
+
+    """Parts of one request, as seen by the endpoint handlers."""
+
+    def __init__(self, method, container, resource, query, headers, body):
+        self.method = method
+        self.container = container
+        self.resource = resource
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.session = None
+        self.objects = 0
+
+    def names(self):
+        """Return names in query, such as attributes to get."""
+        return [k for k, v in self.query]
+
+    def form(self):
+        """Return dictionary of form or JSON parameters in body."""
+        if not self.body:
+            return {}
+        ctype = self.headers.get('content-type', '')
+        if ctype.startswith(_JSON):
+            return self.json()
+        text = self.body.decode('utf-8')
+        return dict(parse_qsl(text, keep_blank_values=True))
+
+    def json(self):
+        try:
+            return json.loads(self.body.decode('utf-8'))
+        except ValueError:
+            raise EmulatorError(400, 'invalid JSON in request body')
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StcEmulator/1.0'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_HEAD(self):
+        self._handle('HEAD')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def log_message(self, format, *args):
+        if self.server.emulator.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _read_body(self):
+        if self.headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if not size:
+                    while self.rfile.readline().strip():
+                        pass
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        length = int(self.headers.get('content-length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _handle(self, method):
+        emu = self.server.emulator
+        body = self._read_body()
+        request_bytes = len(body)
+        parts = urlsplit(self.path)
+        headers = dict((k.lower(), v) for k, v in self.headers.items())
+        path = parts.path.strip('/').split('/', 1)
+        rsp_headers = {}
+        container = ''
+        req = None
+        try:
+            if path[0] != 'stcapi':
+                raise EmulatorError(404, 'not found: %s' % parts.path)
+            container, _, resource = (path[1] if len(path) > 1 else
+                                      '').partition('/')
+            if container == 'bulk':
+                sub, _, resource = resource.partition('/')
+                container = 'bulk/' + sub
+            if headers.get('content-encoding', '').lower() == 'gzip':
+                if not emu.accept_gzip:
+                    raise EmulatorError(415, 'content-encoding not supported')
+                body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            query = [(unquote(k), unquote(v)) for k, _, v in
+                     (item.partition('=') for item in
+                      parts.query.split('&') if item)]
+            req = _Request(method, container, unquote(resource), query,
+                           headers, body)
+            status, data = emu.dispatch(req)
+            model = emu.model(method, container)
+        except EmulatorError as e:
+            req = None
+            status, data = e.status, {'message': e.message}
+            rsp_headers.update(getattr(e, 'headers', {}))
+            model = emu.model(method, container)
+        except Exception as e:
+            req = None
+            status, data = 500, {'message': 'internal error: %s' % e}
+            model = emu.model(method, container)
+
+        if isinstance(data, tuple):
+            data, rsp_headers = data
+            content = data
+        elif data is None:
+            content = b''
+        else:
+            content = json.dumps(data).encode('utf-8')
+            content += model.padding(req.objects if req else 0)
+            rsp_headers['Content-Type'] = _JSON
+        if (emu.gzip_responses and content and status != 206 and
+                'gzip' in headers.get('accept-encoding', '')):
+            z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            content = z.compress(content) + z.flush()
+            rsp_headers['Content-Encoding'] = 'gzip'
+
+        wait = model.delay(request_bytes, len(content))
+        if wait:
+            time.sleep(wait)
+        self.send_response(status)
+        for k, v in rsp_headers.items():
+            self.send_header(k, v)
+        if status == 204:
+            content = b''
+        else:
+            self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if method != 'HEAD' and content:
+            self.wfile.write(content)
+
+
+class StcEmulator(object):
+
+    """
+    Threaded HTTP server that emulates the STC ReST API.
+
+    Arguments:
+    host           -- Address to listen on.
+    port           -- Port to listen on.  Zero to use any free port.
+    models         -- Dictionary of EndpointModel by endpoint.  Keys are
+                      'METHOD container' or 'container', such as
+                      'GET objects', 'perform', or 'bulk/objects'.  The key
+                      '*' sets the model of all other endpoints.
+    seed           -- Seed of the random variation of endpoint models.
+    object_attrs   -- Number of extra attributes, Attr1 to AttrN, given to
+                      each new object, to emulate objects with many
+                      attributes.
+    attr_size      -- Length of the values of the extra attributes.
+    api_version    -- ReST API version reported by GET system.
+    stc_version    -- TestCenter version reported by system1.
+    bulk_api       -- Report the bulk-api feature in GET system.
+    accept_gzip    -- Accept gzip encoded request bodies.  If False, they
+                      are rejected with status 415.
+    gzip_responses -- Gzip response bodies if the client accepts it.
+    verbose        -- Log each request to stderr.
+
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, models=None, seed=0,
+                 object_attrs=0, attr_size=8, api_version=DEFAULT_API_VERSION,
+                 stc_version=DEFAULT_STC_VERSION, bulk_api=True,
+                 accept_gzip=True, gzip_responses=False, verbose=False):
+        self.host = host
+        self.port = port
+        self.object_attrs = object_attrs
+        self.attr_size = attr_size
+        self.api_version = api_version
+        self.stc_version = stc_version
+        self.bulk_api = bulk_api
+        self.accept_gzip = accept_gzip
+        self.gzip_responses = gzip_responses
+        self.verbose = verbose
+        self._seed = seed
+        self._models = {}
+        self._default_model = EndpointModel()
+        self._lock = threading.RLock()
+        self._sessions = {}
+        self._counts = {}
+        self._server = None
+        self._thread = None
+        for key, model in (models or {}).items():
+            self.set_model(key, model)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def url(self):
+        """Base URL of the emulated ReST API."""
+        return 'http://%s:%s/stcapi' % (self.host, self.port)
+
+    def start(self):
+        """Start serving requests in a background thread."""
+        if self._server is not None:
+            return
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.emulator = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='StcEmulator')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving requests, and close the listening socket."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def set_model(self, endpoint, model):
+        """Set the EndpointModel of an endpoint.
+
+        Arguments:
+        endpoint -- 'METHOD container', 'container', or '*' for all other
+                    endpoints.
+        model    -- EndpointModel to use.
+
+        """
+        key = endpoint.strip()
+        model.seed('%s:%s' % (self._seed, key))
+        with self._lock:
+            if key == '*':
+                self._default_model = model
+            else:
+                self._models[key] = model
+
+    def model(self, method, container):
+        """Return the EndpointModel of a request."""
+        models = self._models
+        return (models.get('%s %s' % (method, container)) or
+                models.get(container) or self._default_model)
+
+    def stats(self):
+        """Return dictionary of request counts, keyed by 'METHOD container'.
+
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def reset_stats(self):
+        with self._lock:
+            self._counts = {}
+
+    def session_ids(self):
+        with self._lock:
+            return sorted(self._sessions)
+
+    def dispatch(self, req):
+        """Handle a request, and return (status, data).
+
+        Data is None for no content, a (bytes, headers) tuple for a raw
+        response, or any other value to send as JSON.
+
+        """
+        key = '%s %s' % (req.method, req.container)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+        handler = getattr(self, '_ep_' + req.container.replace('/', '_'),
+                          None)
+        if handler is None:
+            raise EmulatorError(404, 'no such container: %s' % req.container)
+        if req.container not in ('sessions', 'system', 'help'):
+            req.session = self._session(req)
+        elif req.container == 'help' and req.resource:
+            if req.resource not in HELP_COMMANDS:
+                req.session = self._session(req)
+        if req.session is not None:
+            with req.session.lock:
+                return handler(req)
+        return handler(req)
+
+    ###########################################################################
+    # endpoint handlers
+    #
+
+    def _ep_sessions(self, req):
+        if req.method == 'GET':
+            with self._lock:
+                if not req.resource:
+                    return 200, sorted(self._sessions)
+                ses = self._sessions.get(req.resource)
+            if ses is None:
+                raise EmulatorError(404, 'session not found: %s' %
+                                    req.resource)
+            return 200, {'session_id': ses.sid, 'name': ses.name,
+                         'user_id': ses.user, 'started': ses.created,
+                         'version': self.stc_version,
+                         'test_state': ses.get_attr(
+                             ses.objects['sequencer1'], 'TestState')}
+        if req.method == 'POST':
+            params = req.form()
+            user = params.get('userid', '')
+            with self._lock:
+                name = params.get('sessionname') or (
+                    'Session%d' % (len(self._sessions) + 1))
+                sid = '%s - %s' % (name, user)
+                if sid in self._sessions:
+                    raise EmulatorError(409, 'session already exists: %s' %
+                                        sid)
+                self._sessions[sid] = _Session(sid, user, name, self)
+            return 201, {'session_id': sid}
+        if req.method == 'DELETE':
+            with self._lock:
+                if req.resource not in self._sessions:
+                    raise EmulatorError(404, 'session not found: %s' %
+                                        req.resource)
+                if 'false' not in req.names():
+                    del self._sessions[req.resource]
+            return 204, None
+        raise _not_allowed(req)
+
+    def _ep_system(self, req):
+        features = ['bulk-api'] if self.bulk_api else []
+        return 200, {'stcapi_version': self.api_version,
+                     'stc_version': self.stc_version,
+                     'features': features}
+
+    def _ep_help(self, req):
+        if not req.resource:
+            return 200, {'message': 'Spirent TestCenter Automation API '
+                         'emulator.  Use help commands for a list of '
+                         'commands.'}
+        if req.resource == 'commands':
+            return 200, list(HELP_COMMANDS)
+        if req.resource == 'list':
+            names = req.names()
+            commands = bool(names) and names[0].lower() == 'commands'
+            pattern = names[1].lower() if len(names) > 1 else '*'
+            return 200, sorted(
+                t for t in HELP_TYPES if
+                t.endswith('Command') == commands and
+                fnmatch.fnmatchcase(t.lower(), pattern))
+        name = _help_type(req.resource)
+        if name is None and req.session is not None:
+            obj = req.session.objects.get(req.resource.lower())
+            if obj is not None:
+                name = _help_type(obj.type)
+        if name is None:
+            raise EmulatorError(404, 'no help for %s' % (req.resource,))
+        return 200, {'message': _help_text(name)}
+
+    def _ep_apply(self, req):
+        return 204, None
+
+    def _ep_log(self, req):
+        params = req.form()
+        req.session.log.append((params.get('log_level'),
+                                params.get('message')))
+        return 204, None
+
+    def _ep_objects(self, req):
+        ses = req.session
+        if req.method == 'GET':
+            obj = ses.lookup(req.resource)
+            names = req.names()
+            if len(names) == 1:
+                return 200, ses.get_attr(obj, names[0])
+            return 200, ses.attributes(obj, names)
+        if req.method == 'POST':
+            params = req.form()
+            obj_type = params.pop('object_type', None)
+            if not obj_type:
+                raise EmulatorError(400, 'missing object_type')
+            under = params.pop('under', None)
+            parent = ses.lookup(under) if under else ses.objects['project1']
+            obj = ses.create(obj_type, parent, params)
+            return 201, {'handle': obj.handle}
+        if req.method == 'PUT':
+            ses.config(ses.lookup(req.resource), req.form())
+            return 204, None
+        if req.method == 'DELETE':
+            ses.delete(ses.lookup(req.resource))
+            return 204, None
+        raise _not_allowed(req)
+
+    def _ep_perform(self, req):
+        if req.method != 'POST':
+            raise _not_allowed(req)
+        return 200, self._perform(req, req.form())
+
+    def _ep_bulk_perform(self, req):
+        if req.method != 'POST':
+            raise _not_allowed(req)
+        data = self._perform(req, req.form())
+        data['status'] = 'success'
+        return 200, data
+
+    def _ep_bulk_objects(self, req):
+        ses = req.session
+        if req.method == 'GET':
+            depth = int(req.headers.get('x-stc-api-children-depth') or 1)
+            objs = ses.locate(req.resource)
+            req.objects = len(objs)
+            names = req.names() or None
+            return 200, {'status': 'success',
+                         'objects': [ses.to_dict(o, names, depth)
+                                     for o in objs]}
+        if req.method == 'PUT':
+            objs = ses.locate(req.resource)
+            attrs = req.json()
+            if isinstance(attrs, list):
+                if len(attrs) != len(objs):
+                    raise EmulatorError(
+                        400, '%d attribute sets for %d objects' %
+                        (len(attrs), len(objs)))
+                for obj, a in zip(objs, attrs):
+                    ses.config(obj, a)
+            else:
+                for obj in objs:
+                    ses.config(obj, attrs or {})
+            return 200, {'status': 'success',
+                         'handles': [o.handle for o in objs]}
+        if req.method == 'POST':
+            params = req.json()
+            obj_type = params.pop('object_type', None)
+            under = params.pop('under', None)
+            entries = params.pop('bulklist', None)
+            if entries is None:
+                entries = [params]
+            created = []
+            for entry in entries:
+                entry = dict(entry)
+                parent = ses.lookup(entry.pop('under', None) or under or
+                                    'project1')
+                etype = entry.pop('object_type', None) or obj_type
+                if not etype:
+                    raise EmulatorError(400, 'missing object_type')
+                created.append(self._bulk_create(ses, etype, parent, entry))
+            req.objects = len(created)
+            return 201, {'status': 'success', 'handles': created}
+        if req.method == 'DELETE':
+            objs = [ses.lookup(h) for h in _handles(req.resource)]
+            for obj in objs:
+                if obj.handle in ses.objects:
+                    ses.delete(obj)
+            return 200, {'status': 'success'}
+        raise _not_allowed(req)
+
+    def _ep_files(self, req):
+        ses = req.session
+        if req.method in ('GET', 'HEAD'):
+            if not req.resource:
+                return 200, sorted(ses.files)
+            content = ses.files.get(req.resource)
+            if content is None:
+                raise EmulatorError(404, 'file not found: %s' % req.resource)
+            status, content, headers = _file_response(req, content)
+            return status, (content, headers)
+        if req.method == 'PUT':
+            name = req.resource or _disposition_name(req.headers)
+            if not name:
+                raise EmulatorError(400, 'missing file name')
+            ses.files[name] = req.body
+            return 201, {'name': name, 'size': len(req.body)}
+        if req.method == 'POST':
+            ctype = req.headers.get('content-type', '')
+            if ctype.startswith('multipart/form-data'):
+                uploaded = []
+                for name, content in _multipart_files(req.body, ctype):
+                    ses.files[name] = content
+                    uploaded.append({'name': name, 'size': len(content)})
+                if len(uploaded) == 1:
+                    return 201, uploaded[0]
+                return 201, uploaded
+            name = _disposition_name(req.headers)
+            if not name:
+                raise EmulatorError(400, 'missing file name')
+            ses.files[name] = req.body
+            return 201, {'name': name, 'size': len(req.body)}
+        if req.method == 'DELETE':
+            if ses.files.pop(req.resource, None) is None:
+                raise EmulatorError(404, 'file not found: %s' % req.resource)
+            return 204, None
+        raise _not_allowed(req)
+
+    def _ep_connections(self, req):
+        ses = req.session
+        if req.method == 'GET':
+            if not req.resource:
+                return 200, sorted(c for c, up in ses.chassis.items() if up)
+            if req.resource not in ses.chassis:
+                raise EmulatorError(404, 'chassis not found: %s' %
+                                    req.resource)
+            return 200, {'IsConnected': ses.chassis[req.resource],
+                         'Hostname': req.resource}
+        if req.method == 'PUT':
+            ses.chassis[req.resource] = True
+            return 200, req.resource
+        if req.method == 'DELETE':
+            if req.resource not in ses.chassis:
+                raise EmulatorError(404, 'chassis not found: %s' %
+                                    req.resource)
+            ses.chassis[req.resource] = False
+            return 204, None
+        if req.method == 'POST':
+            params = req.form()
+            action = params.pop('action', '')
+            if action in ('connectall', 'disconnectall'):
+                addrs = set(ses.chassis)
+                for obj in ses.objects.values():
+                    loc = obj.attrs.get('location', '') if (
+                        obj.type == 'port') else ''
+                    if loc.startswith('//'):
+                        addrs.add(loc[2:].split('/')[0])
+            elif action in ('connect', 'disconnect'):
+                addrs = set(params)
+            else:
+                raise EmulatorError(400, 'invalid action: %s' % action)
+            up = not action.startswith('disconnect')
+            for addr in addrs:
+                ses.chassis[addr] = up
+            return 200, sorted(addrs)
+        raise _not_allowed(req)
+
+    def _ep_chassis(self, req):
+        ses = req.session
+        if req.method != 'GET':
+            raise _not_allowed(req)
+        if not req.resource:
+            return 200, sorted(c for c, up in ses.chassis.items() if up)
+        if not ses.chassis.get(req.resource):
+            raise EmulatorError(404, 'chassis not connected: %s' %
+                                req.resource)
+        return 200, {'Hostname': req.resource,
+                     'Model': 'STC Emulator',
+                     'Slots': [{'Index': 1, 'Ports': 8}]}
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _session(self, req):
+        sid = req.headers.get('x-stc-api-session')
+        if not sid:
+            raise EmulatorError(400, 'no session: missing X-STC-API-Session')
+        with self._lock:
+            ses = self._sessions.get(sid)
+        if ses is None:
+            raise EmulatorError(404, 'session not found: %s' % sid)
+        return ses
+
+    def _bulk_create(self, ses, obj_type, parent, attrs):
+        """Create object with nested children, and return its handle.
+
+        Attribute values that are dictionaries, or lists of dictionaries,
+        are created as children of the object, of the type named by the key.
+
+        """
+        plain = {}
+        nested = []
+        for name, value in attrs.items():
+            if isinstance(value, dict):
+                nested.append((name, [value]))
+            elif (isinstance(value, list) and value and
+                  all(isinstance(v, dict) for v in value)):
+                nested.append((name, value))
+            else:
+                plain[name] = value
+        obj = ses.create(obj_type, parent, plain)
+        for child_type, children in nested:
+            for child in children:
+                self._bulk_create(ses, child_type, obj, child)
+        return obj.handle
+
+    def _perform(self, req, params):
+        ses = req.session
+        command = params.pop('command', '')
+        cmd = command.lower()
+        if cmd.endswith('command'):
+            cmd = cmd[:-7]
+        result = dict(params)
+        result.update({'State': 'COMPLETED', 'Status': ''})
+        if not cmd:
+            raise EmulatorError(400, 'missing command')
+        if cmd == 'getobjects':
+            objs = self._get_objects(ses, params)
+            req.objects = len(objs)
+            props = params.get('PropertyList', '').split()
+            values = dict((o.handle, ses.attributes(o, props or None))
+                          for o in objs)
+            result['ObjectList'] = ' '.join(o.handle for o in objs)
+            result['PropertyValues'] = json.dumps(values)
+        elif cmd == 'devicecreate':
+            result['ReturnList'] = ' '.join(self._device_create(ses, params))
+        elif cmd == 'delete':
+            for obj in [ses.lookup(h) for h in
+                        _handles(params.get('ConfigList', ''))]:
+                if obj.handle in ses.objects:
+                    ses.delete(obj)
+        elif cmd == 'loadfromxml':
+            name = params.get('FileName') or params.get('filename', '')
+            if name not in ses.files:
+                raise EmulatorError(400, 'file not found: %s' % name)
+        elif cmd == 'saveasxml':
+            name = params.get('FileName') or params.get('filename', '')
+            if not name:
+                raise EmulatorError(400, 'missing FileName')
+            ses.files[name] = _to_xml(ses, ses.objects['project1'])
+        elif cmd == 'sequencerstart':
+            seq = ses.objects['sequencer1']
+            seq.set('TestState', 'PASSED')
+            seq.set('State', 'IDLE')
+        elif cmd == 'resultssubscribe':
+            parent = ses.lookup(params.get('Parent') or 'project1')
+            rds = ses.subscribe(parent, params.get('ConfigType', ''),
+                                params.get('ResultType', ''),
+                                params.get('RecordsPerPage'))
+            result['ReturnedDataSet'] = rds.handle
+        elif cmd == 'resultdatasetunsubscribe':
+            rds = ses.lookup(params.get('ResultDataSet', ''))
+            for res in ses.datasets.get(rds.handle, ()):
+                if res.handle in ses.objects:
+                    ses.delete(res)
+            ses.delete(rds)
+        return result
+
+    def _device_create(self, ses, params):
+        """Create devices for DeviceCreateCommand, and return handles."""
+        parent = ses.lookup(params.get('ParentList') or 'project1')
+        dev_type = params.get('DeviceType') or 'EmulatedDevice'
+        port = params.get('Port')
+        stack = params.get('IfStack', '').split()
+        handles = []
+        for i in range(int(params.get('CreateCount') or 1)):
+            dev = ses.create(dev_type, parent)
+            if port:
+                ses.config(dev, {'AffiliationPort-targets': port})
+            for if_type in stack:
+                ses.create(if_type, dev)
+            handles.append(dev.handle)
+        return handles
+
+    def _get_objects(self, ses, params):
+        class_name = params.get('ClassName', '').lower()
+        if not class_name:
+            raise EmulatorError(400, 'missing ClassName')
+        roots = _handles(params.get('RootList', '')) or ['system1']
+        match = _condition(ses, params.get('Condition'))
+        found = []
+        seen = set()
+        for root in roots:
+            for obj in ses.descendants(ses.lookup(root)):
+                if (obj.type == class_name and obj.handle not in seen and
+                        match(obj)):
+                    seen.add(obj.handle)
+                    found.append(obj)
+        return found
+
+
+def _not_allowed(req):
+    return EmulatorError(405, 'method %s not allowed on %s' %
+                         (req.method, req.container))
+
+
+def _file_response(req, content):
+    """Return (status, content, headers) for a file, honoring a byte Range.
+
+    """
+    etag = '"%s"' % hashlib.md5(content).hexdigest()
+    headers = {'Content-Type': 'application/octet-stream',
+               'Accept-Ranges': 'bytes', 'ETag': etag}
+    rng = req.headers.get('range', '')
+    if_range = req.headers.get('if-range')
+    m = re.match(r'^bytes=(\d*)-(\d*)$', rng.strip())
+    if m is None or (if_range and if_range != etag):
+        return 200, content, headers
+    size = len(content)
+    first, last = m.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(size - int(last or 0), 0)
+        end = size - 1
+    if start >= size or start > end:
+        headers['Content-Range'] = 'bytes */%d' % size
+        raise _RangeError(headers)
+    headers['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+    return 206, content[start:end + 1], headers
+
+
+class _RangeError(EmulatorError):
+
+    def __init__(self, headers):
+        super(_RangeError, self).__init__(416, 'range not satisfiable')
+        self.headers = headers
+
+
+def _disposition_name(headers):
+    m = re.search(r'filename="?([^";]+)"?',
+                  headers.get('content-disposition', ''))
+    return m.group(1) if m else None
+
+
+def _multipart_files(body, ctype):
+    """Return list of (file_name, content) in multipart/form-data body."""
+    m = re.search(r'boundary="?([^";]+)"?', ctype)
+    if m is None:
+        raise EmulatorError(400, 'missing multipart boundary')
+    delim = b'--' + m.group(1).encode('ascii')
+    files = []
+    for part in body.split(delim)[1:]:
+        if part.startswith(b'--'):
+            break
+        head, _, content = part.partition(b'\r\n\r\n')
+        if content.endswith(b'\r\n'):
+            content = content[:-2]
+        name = re.search(br'filename="([^"]*)"', head)
+        if name is not None:
+            files.append((name.group(1).decode('utf-8'), content))
+    return files
+
+
+def _to_xml(ses, obj, indent=0):
+    """Return object tree as XML bytes, in the style of a saved config."""
+    attrs = ''.join(' %s="%s"' % (obj.names[k], _xml_escape(v))
+                    for k, v in sorted(obj.attrs.items()))
+    pad = '  ' * indent
+    if not obj.children:
+        text = '%s<%s id="%s"%s/>\n' % (pad, obj.type, obj.handle, attrs)
+    else:
+        text = '%s<%s id="%s"%s>\n%s%s</%s>\n' % (
+            pad, obj.type, obj.handle, attrs,
+            ''.join(_to_xml(ses, c, indent + 1).decode('utf-8')
+                    for c in obj.children), pad, obj.type)
+    if indent == 0:
+        text = '<?xml version="1.0" encoding="UTF-8"?>\n' + text
+    return text.encode('utf-8')
+
+
+def _xml_escape(value):
+    return (value.replace('&', '&amp;').replace('<', '&lt;')
+            .replace('"', '&quot;'))
+
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser(
+        prog='stcemulator',
+        description='Serve an emulated STC ReST API for testing clients.')
+    ap.add_argument('--host', default='127.0.0.1',
+                    help='Address to listen on (default 127.0.0.1).')
+    ap.add_argument('--port', type=int, default=8888,
+                    help='Port to listen on, 0 for any (default 8888).')
+    ap.add_argument('--latency', type=float, default=0.0,
+                    help='Seconds to wait before each response.')
+    ap.add_argument('--per-kb', type=float, default=0.0,
+                    help='Additional seconds to wait per KiB of body.')
+    ap.add_argument('--jitter', type=float, default=0.0,
+                    help='Random variation of wait, as fraction of it.')
+    ap.add_argument('--seed', type=int, default=0,
+                    help='Seed of random variation.')
+    ap.add_argument('--object-attrs', type=int, default=0,
+                    help='Extra attributes given to each object.')
+    ap.add_argument('--verbose', '-v', action='store_true',
+                    help='Log each request.')
+    args = ap.parse_args()
+
+    model = EndpointModel(args.latency, args.per_kb, args.jitter)
+    emu = StcEmulator(args.host, args.port, {'*': model}, seed=args.seed,
+                      object_attrs=args.object_attrs, verbose=args.verbose)
+    emu.start()
+    print('serving emulated STC ReST API at', emu.url)
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emu.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -15,17 +15,110 @@ import time
 import os
 import socket
 import json
+import collections
+import threading
 from requests.utils import quote
 
 try:
     from . import resthttp
+    from . import attrcache
+    from . import coalesce
+    from . import columns
+    from . import helpcache
+    from . import jsonstream
+    from . import pipeline
+    from . import results
+    from . import snapshot
+    from . import uploads
+    from . import validate
 except ValueError:
     import resthttp
+    import attrcache
+    import coalesce
+    import columns
+    import helpcache
+    import jsonstream
+    import pipeline
+    import results
+    import snapshot
+    import uploads
+    import validate
 
 # Use this port if it is not specified when creating StcHttp, or by the
 # STC_SERVER_PORT environment variable.
 DEFAULT_PORT = 80
 
+# Number of files uploaded at once by upload_files.
+UPLOAD_PARALLEL = 4
+
+# Number of servers checked at once by probe_servers.
+PROBE_PARALLEL = 16
+
+# Seconds probe_servers waits to connect to, and hear from, each server.
+PROBE_TIMEOUT = 2.0
+
+# Root objects searched by each GetObjectsCommand sent by query_objects.
+QUERY_CHUNK_ROOTS = 100
+
+
+def probe_servers(servers, port=None, timeout=PROBE_TIMEOUT,
+                  parallel=PROBE_PARALLEL):
+    """Check which of many STC servers can be reached, concurrently.
+
+    Each server is sent a GET of its sessions, with a short timeout.  Servers
+    are checked at the same time, so servers that are down delay the result by
+    about the timeout, not by the timeout for each one.
+
+    Arguments:
+    servers  -- List of server addresses, as 'host' or 'host:port'.
+    port     -- Port of servers given without one.  Use environment variable
+                STC_SERVER_PORT or DEFAULT_PORT if None.
+    timeout  -- Seconds to wait to connect to, and get a response from, each
+                server.
+    parallel -- Maximum number of servers to check at once.
+
+    Return:
+    Dictionary of {server: session_list}, where session_list is the list of
+    session IDs on the server, or None if the server could not be reached.
+
+    """
+    if not port:
+        port = os.environ.get('STC_SERVER_PORT', DEFAULT_PORT)
+    pending = collections.deque(servers)
+    results = dict.fromkeys(servers)
+
+    def worker():
+        while True:
+            try:
+                server = pending.popleft()
+            except IndexError:
+                return
+            host, srv_port = server, port
+            if server.startswith('['):
+                host, _, rest = server[1:].partition(']')
+                if rest.startswith(':'):
+                    srv_port = rest[1:]
+            elif server.count(':') == 1:
+                host, srv_port = server.split(':')
+            url = resthttp.RestHttp.url('http', host, srv_port, 'stcapi')
+            rest = resthttp.RestHttp(url, timeout=timeout, pool_size=1)
+            try:
+                status, data = rest.get_request('sessions')
+                results[server] = data if isinstance(data, list) else []
+            except Exception:
+                pass
+            finally:
+                rest.close()
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(parallel, len(pending)))]
+    for t in threads:
+        t.daemon = True
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
 
 class StcHttp(object):
 
@@ -35,7 +128,13 @@ class StcHttp(object):
     """
 
     def __init__(self, server=None, port=None, api_version=1,
-                 debug_print=False, timeout=None):
+                 debug_print=False, timeout=None,
+                 pool_size=resthttp.DEFAULT_POOL_SIZE, pool_idle_timeout=None,
+                 pool_max_requests=None, share_pool=False, retry=None,
+                 circuit_breaker=False, compress=False,
+                 compress_threshold=resthttp.DEFAULT_COMPRESS_THRESHOLD,
+                 lazy=False, coalesce=False, cache=False, help_cache=False,
+                 validate=False):
         """Initialize the REST API wrapper object.
 
         If the port to connect to is not specified by the port argument, or by
@@ -49,6 +148,39 @@ class StcHttp(object):
         api_version -- What API version to use.
         debug_print -- Enable debug print statements.
         timeout     -- Number of seconds to wait for a response.
+        pool_size   -- Number of persistent connections to keep open.
+        pool_idle_timeout -- Seconds a connection may be idle before it is
+                             closed instead of reused.  None for no limit.
+        pool_max_requests -- Requests sent on a connection before it is
+                             reopened.  None for no limit.
+        share_pool  -- Share connections with other StcHttp objects, in this
+                       process, that connect to the same server.
+        retry       -- Optional resthttp.RetryPolicy for retrying requests
+                       that fail with connection errors, timeouts, or
+                       retryable status codes.  None to not retry.
+        circuit_breaker -- True to use the circuit breaker shared by all
+                       clients of the server, which probes it with a GET of
+                       sessions, or a resthttp.CircuitBreaker to use.  While
+                       the circuit is open, calls fail fast with
+                       resthttp.CircuitOpenError.
+        compress    -- Gzip compress bulkcreate and bulkconfig request
+                       bodies.  If the server rejects a compressed body, then
+                       it is sent again uncompressed, and compression is
+                       turned off.
+        compress_threshold -- Compress bodies of at least this many bytes.
+        lazy        -- Do not check that the server can be reached when this
+                       object is created.  If it cannot, then the first
+                       request fails with resthttp.ConnectionError.
+        coalesce    -- Buffer config writes and send them as bulk requests,
+                       if the server supports the bulk API.  See
+                       set_coalescing.
+        cache       -- Cache attribute values read by get, until they are
+                       changed through this object.  See set_get_cache.
+        help_cache  -- Keep help in a persistent cache for the server's
+                       version, shared by all processes.  See set_help_cache.
+        validate    -- Check object types, attributes, and relations given to
+                       create and config calls before sending them.  See
+                       set_validation.
 
         """
         if not server:
@@ -62,18 +194,45 @@ class StcHttp(object):
         rest = None
 
         url = resthttp.RestHttp.url('http', server, port, 'stcapi')
-        rest = resthttp.RestHttp(url, debug_print=debug_print, timeout=timeout)
-        try:
-            rest.get_request('sessions')
-        except (socket.error, resthttp.ConnectionError,
-                resthttp.RestHttpError):
-            raise RuntimeError('Cannot connect to STC server: %s:%s' %
-                               (server, port))
+        if circuit_breaker is True:
+            circuit_breaker = resthttp.get_circuit_breaker(
+                url, probe_path='sessions')
+        rest = resthttp.RestHttp(url, debug_print=debug_print, timeout=timeout,
+                                 pool_size=pool_size,
+                                 pool_idle_timeout=pool_idle_timeout,
+                                 pool_max_requests=pool_max_requests,
+                                 share_pool=share_pool, retry=retry,
+                                 circuit_breaker=circuit_breaker or None,
+                                 compress=compress,
+                                 compress_threshold=compress_threshold)
+        if not lazy:
+            try:
+                rest.get_request('sessions')
+            except (socket.error, resthttp.ConnectionError,
+                    resthttp.RestHttpError):
+                raise RuntimeError('Cannot connect to STC server: %s:%s' %
+                                   (server, port))
 
         rest.add_header('X-Spirent-API-Version', str(api_version))
         self._rest = rest
         self._sid = None
         self._api_ver = None
+        self._upload_indexes = {}
+        self._coalesce = None
+        self._writes = None
+        self._writes_lock = threading.Lock()
+        self._cache = None
+        self._help_dir = None
+        self._help_cache = None
+        self._validator = None
+        if coalesce:
+            self.set_coalescing(True)
+        if cache:
+            self.set_get_cache(True)
+        if help_cache:
+            self.set_help_cache(True)
+        if validate:
+            self.set_validation(True)
 
     def session_id(self):
         return self._sid
@@ -86,6 +245,254 @@ class StcHttp(object):
         """Seconds to wait for a response.  Any zero-value means no timeout."""
         self._rest.set_timeout(timeout)
 
+    def set_retry_policy(self, retry):
+        """Set resthttp.RetryPolicy for failed requests.  None to not retry."""
+        self._rest.set_retry_policy(retry)
+
+    def set_compression(self, enabled, threshold=None):
+        """Turn gzip compression of bulk request bodies on or off.
+
+        Arguments:
+        enabled   -- True to compress bulkcreate and bulkconfig bodies.
+        threshold -- Optional minimum size, in bytes, of bodies to compress.
+
+        """
+        self._rest.set_compression(enabled, threshold)
+
+    def compression_stats(self):
+        """Return counts of compressed requests and responses, and of bytes
+        saved by compressing them.
+
+        Return:
+        {'requests': num_compressed_requests,
+         'request_bytes_saved': num_bytes,
+         'responses': num_compressed_responses,
+         'response_bytes_saved': num_bytes,
+         'rejected': True if the server rejected a compressed body}
+
+        """
+        return self._rest.compression_stats()
+
+    def set_coalescing(self, enabled,
+                       max_objects=coalesce.DEFAULT_MAX_OBJECTS,
+                       max_delay=coalesce.DEFAULT_MAX_DELAY):
+        """Turn coalescing of config writes into bulk requests on or off.
+
+        While on, config buffers the attributes written to each object, and
+        repeated writes to the same object are merged.  Buffered writes are
+        sent as bulk requests when enough objects have been written, when the
+        oldest write has waited long enough, or before any other call, such
+        as get, perform, apply, or delete, that could see the writes, and
+        before joining or ending a session.  Errors from writes are raised by
+        the call that sent them.
+
+        If the server does not support the bulk API, then config writes are
+        sent one at a time, as when coalescing is off.
+
+        Arguments:
+        enabled     -- True to coalesce config writes.
+        max_objects -- Send writes when this many objects have been written.
+        max_delay   -- Send writes when the oldest has waited this many
+                       seconds.  None to wait until another call or flush.
+
+        """
+        self.flush()
+        with self._writes_lock:
+            self._writes = None
+            self._coalesce = (max_objects, max_delay) if enabled else None
+
+    def coalesce_stats(self):
+        """Return counts of config writes buffered, writes merged into an
+        earlier write to the same object, bulk requests sent, objects written
+        by them, and bulk requests that failed and were sent one object at a
+        time.
+
+        Return:
+        {'writes': num_writes, 'merged': num_merged, 'requests': num_requests,
+         'objects': num_objects, 'fallbacks': num_fallbacks}
+
+        """
+        if self._writes is None:
+            return {'writes': 0, 'merged': 0, 'requests': 0, 'objects': 0,
+                    'fallbacks': 0}
+        return self._writes.stats()
+
+    def flush(self):
+        """Send config writes buffered by coalescing."""
+        if self._writes is not None:
+            self._writes.flush()
+
+    def set_get_cache(self, enabled,
+                      max_entries=attrcache.DEFAULT_MAX_ENTRIES, ttls=None,
+                      default_ttl=None):
+        """Turn caching of attribute values read by get on or off.
+
+        While on, get returns cached values of attributes it has read before,
+        and only requests those it has not.  Cached values of an object are
+        discarded when it is configured, children of an object are discarded
+        when one is created under it, and all values are discarded on delete,
+        perform, apply, and any bulk call, since these can change any object.
+
+        Values changed on the server in other ways, such as by another client
+        or by a running test, are not seen until they expire.  For this,
+        states and results are not cached, unless ttls says otherwise.
+
+        Arguments:
+        enabled     -- True to cache attribute values.
+        max_entries -- Maximum number of values cached.  The least recently
+                       used value is discarded to make room for a new one.
+        ttls        -- Dictionary of seconds values are valid, by
+                       'objecttype.attribute' pattern, ex: {'port.*': 5}.
+                       A value of 0 means not cached.  None to use
+                       attrcache.DEFAULT_TTLS.
+        default_ttl -- Seconds that values not matched by ttls are valid.
+                       None to keep them until invalidated.
+
+        """
+        if enabled:
+            self._cache = attrcache.AttributeCache(max_entries, ttls,
+                                                   default_ttl)
+        else:
+            self._cache = None
+
+    def get_cache_stats(self):
+        """Return counts of attribute values found and not found in the get
+        cache, values evicted to make room, invalidations, and values cached.
+
+        Return:
+        {'hits': num_hits, 'misses': num_misses, 'hit_ratio': hits_fraction,
+         'evictions': num_evicted, 'invalidations': num_invalidations,
+         'entries': num_cached}
+
+        """
+        if self._cache is None:
+            return {'hits': 0, 'misses': 0, 'hit_ratio': 0.0, 'evictions': 0,
+                    'invalidations': 0, 'entries': 0}
+        return self._cache.stats()
+
+    def set_help_cache(self, enabled, directory=None):
+        """Turn the persistent help cache on or off.
+
+        While on, help answers from a cache of help text kept in files for
+        the BLL version of the session, and only requests help that is not
+        cached.  Use warm_help_cache to fill the cache at once.
+
+        Arguments:
+        enabled   -- True to use the help cache.
+        directory -- Directory holding a cache for each version.  None to use
+                     environment variable STC_HELP_CACHE_DIR, or
+                     helpcache.DEFAULT_CACHE_DIR.
+
+        """
+        self._help_dir = (directory or '') if enabled else None
+        self._help_cache = None
+
+    def help_cache(self):
+        """Return helpcache.HelpCache for the version of the session, or None
+        if the help cache is off or a session is not started.
+
+        """
+        if self._help_dir is None or not self.started():
+            return None
+        cache = self._help_cache
+        if cache is None or cache[0] != self._sid:
+            cache = (self._sid, helpcache.HelpCache(self.bll_version(),
+                                                    self._help_dir))
+            self._help_cache = cache
+        return cache[1]
+
+    def warm_help_cache(self, parallel=helpcache.WARM_PARALLEL):
+        """Fetch help on every config type and command, that is not already
+        in the help cache, using parallel requests.
+
+        This only needs to be done once for each TestCenter version.
+
+        Arguments:
+        parallel -- Maximum number of help requests to send at once.
+
+        Return:
+        Number of help subjects fetched.
+
+        """
+        self._check_session()
+        cache = self.help_cache()
+        if cache is None:
+            raise RuntimeError('help cache is not on')
+        return cache.warm(self._fetch_help, parallel)
+
+    def help_metadata(self, subject):
+        """Return attributes, relations, parents, and children of an object
+        or command type, parsed from its help.  See helpcache.parse_help.
+
+        If the help cache is on, then cached help is used if there is any.
+
+        """
+        cache = self.help_cache()
+        if cache is None:
+            return helpcache.parse_help(self._fetch_help(subject, None))
+        meta = cache.metadata(subject)
+        if meta is None:
+            cache.put(subject, self._fetch_help(subject, None))
+            meta = cache.metadata(subject)
+        return meta
+
+    def set_validation(self, enabled):
+        """Turn client-side validation of create and config calls on or off.
+
+        While on, create, config, bulkcreate, bulkcreateex, and bulkconfig
+        check the object types, attribute names, relation names, and values
+        of simple attribute types, such as bool, u32, and ip, against the
+        help of each type, and raise validate.ValidationError, listing the
+        problems, without sending the request.
+
+        The help of each type is requested once, or read from the help cache
+        if it is on.  See set_help_cache.
+
+        """
+        if enabled:
+            self._validator = validate.Validator(self.help_metadata)
+        else:
+            self._validator = None
+
+    def circuit_breaker(self):
+        """Return the resthttp.CircuitBreaker, or None if not using one.
+
+        Call its state() or stats() methods to see the state of the circuit.
+
+        """
+        return self._rest.circuit_breaker()
+
+    def conn_stats(self):
+        """Return counts of requests sent, connections opened and reused, and
+        of retries.
+
+        Return:
+        {'requests': num_requests, 'opened': num_opened, 'reused': num_reused,
+         'retries': num_retries}
+
+        """
+        return self._rest.conn_stats()
+
+    def stats(self):
+        """Return latency, size, and status metrics of requests.
+
+        Metrics are keyed by 'METHOD container', such as 'GET objects' or
+        'POST perform'.  Each entry has the number of requests and errors,
+        bytes sent and received, counts by status, and a summary (count, mean,
+        max, p50, p90, p99 seconds) of each part of the requests: total,
+        connect, ttfb (time to first response byte), and transfer.
+
+        """
+        return self._rest.stats()
+
+    def reset_stats(self):
+        """Discard collected request metrics."""
+        self._rest.reset_stats()
+
+    def prometheus_metrics(self):
+        """Return request metrics in Prometheus text exposition format."""
+        return self._rest.prometheus_metrics()
+
     def new_session(self, user_name=None, session_name=None,
                     kill_existing=False, analytics=None):
         """Create a new test session.
@@ -114,6 +521,8 @@ class StcHttp(object):
             session_name = ''
         if not user_name or not user_name.strip():
             user_name = ''
+        # Send buffered writes to the session they were made in.
+        self._close_writes()
         params = {'userid': user_name, 'sessionname': session_name}
         if analytics not in (None, ''):
             params['analytics'] = str(analytics).lower()
@@ -139,12 +548,16 @@ class StcHttp(object):
 
         self._rest.add_header('X-STC-API-Session', sid)
         self._sid = sid
+        self._clear_cache()
         return sid
 
     def join_session(self, sid):
         """Attach to an existing session."""
+        # Send buffered writes to the session they were made in.
+        self._close_writes()
         self._rest.add_header('X-STC-API-Session', sid)
         self._sid = sid
+        self._clear_cache()
         try:
             status, data = self._rest.get_request('objects', 'system1',
                                                   ['version', 'name'])
@@ -191,15 +604,21 @@ class StcHttp(object):
             if not self.started():
                 return False
 
+            # Send buffered writes while the session can still take them.
+            self._close_writes()
+
             sid = self._sid
             self._sid = None
             self._rest.del_header('X-STC-API-Session')
+            self._clear_cache()
 
         if end_tcsession is None:
             if self._dbg_print:
                 print('===> detached from session')
             return True
 
+        self._upload_indexes.pop(sid, None)
+
         try:
             if end_tcsession:
                 if self._dbg_print:
@@ -333,12 +752,14 @@ class StcHttp(object):
         return data
 
     def server_info(self):
+        self.flush()
         status, data = self._rest.get_request('objects', 'system1')
         return data
 
     def apply(self):
         """Send test configuration to chassis."""
         self._check_session()
+        self._clear_cache()
         self._rest.put_request(None, 'apply')
 
     def get(self, handle, *args):
@@ -362,10 +783,17 @@ class StcHttp(object):
         returned.  NOTE: If the string contains multiple substrings, then the
         client will need to parse these.
 
+        If the get cache is on, then cached values are returned without a
+        request.  See set_get_cache.
+
         """
         self._check_session()
-        status, data = self._rest.get_request('objects', str(handle), args)
-        return data
+        cache = self._cache
+        if cache is None or not args:
+            status, data = self._rest.get_request('objects', str(handle),
+                                                  args)
+            return data
+        return self._cached_get(cache, handle, args)
 
     def create(self, object_type, under=None, attributes=None, **kwattrs):
         """Create a new automation object.
@@ -404,7 +832,16 @@ class StcHttp(object):
             params.update(attributes)
         if kwattrs:
             params.update(kwattrs)
-
+        if self._validator is not None:
+            self._validator.check_create(object_type, params)
+
+        cache = self._cache
+        if cache is not None:
+            if any(k.lower().endswith(('-targets', '-sources'))
+                   for k in params):
+                cache.invalidate_relations()
+            else:
+                cache.invalidate_children(under or 'project1')
         status, data = self._rest.post_request('objects', None, params)
         return data
 
@@ -416,6 +853,7 @@ class StcHttp(object):
 
         """
         self._check_session()
+        self._clear_cache()
         self._rest.delete_request('objects', str(handle))
 
     def perform(self, command, params=None, **kwargs):
@@ -436,6 +874,8 @@ class StcHttp(object):
 
         """
         self._check_session()
+        self._clear_cache()
+        self._clear_uploads()
         if not params:
             params = {}
         if kwargs:
@@ -458,13 +898,30 @@ class StcHttp(object):
         kwattrs    -- Optional keyword attributes (name=value pairs).
 
         """
-        self._check_session()
         if kwattrs:
             if attributes:
                 attributes.update(kwattrs)
             else:
                 attributes = kwattrs
-        self._rest.put_request('objects', str(handle), attributes)
+        self._config(handle, attributes, True)
+
+    def config_now(self, handle, attributes=None, **kwattrs):
+        """Sets object attributes, like config, but sends the write with
+        this call even if writes are coalesced, so that an error in the write
+        is raised by this call.  Buffered writes are not flushed.
+
+        Arguments:
+        handle     -- Handle of object to modify.
+        attributes -- Dictionary of attributes (name-value pairs).
+        kwattrs    -- Optional keyword attributes (name=value pairs).
+
+        """
+        if kwattrs:
+            if attributes:
+                attributes.update(kwattrs)
+            else:
+                attributes = kwattrs
+        self._config(handle, attributes, False)
 
     def chassis(self):
         """Get list of chassis known to test session."""
@@ -572,20 +1029,18 @@ class StcHttp(object):
         Return:
         String of help information.
 
-        """
-        if subject:
-            if subject not in (
-                'commands', 'create', 'config', 'get', 'delete', 'perform',
-                'connect', 'connectall', 'disconnect', 'disconnectall',
-                'apply', 'log', 'help'):
-                self._check_session()
-            status, data = self._rest.get_request('help', subject, args)
-        else:
-            status, data = self._rest.get_request('help')
+        If the help cache is on, then cached help is returned without a
+        request.  See set_help_cache.
 
-        if isinstance(data, (list, tuple, set)):
-            return ' '.join((str(i) for i in data))
-        return data['message']
+        """
+        cache = self.help_cache() if subject else None
+        if cache is None:
+            return self._fetch_help(subject, args)
+        text = cache.get(subject, args)
+        if text is None:
+            text = self._fetch_help(subject, args)
+            cache.put(subject, text, args)
+        return text
 
     def log(self, level, msg):
         """Write a diagnostic message to a log file or to standard output.
@@ -604,14 +1059,20 @@ class StcHttp(object):
         self._rest.post_request(
             'log', None, {'log_level': level.upper(), 'message': msg})
 
-    def download(self, file_name, save_as=None):
+    def download(self, file_name, save_as=None,
+                 parallel=resthttp.DOWNLOAD_PARALLEL):
         """Download the specified file from the server.
 
+        Large files are downloaded in byte ranges over parallel connections,
+        and an interrupted download is resumed where it left off when the
+        same file is downloaded to the same path again.
+
         Arguments:
         file_name -- Name of file resource to save.
         save_as   -- Optional path name to write file to.  If not specified,
                      then file named by the last part of the resource path is
                      downloaded to current directory.
+        parallel  -- Maximum number of connections to download the file with.
 
         Return: (save_path, bytes)
         save_path -- Path where downloaded file was saved.
@@ -629,7 +1090,8 @@ class StcHttp(object):
                         raise RuntimeError(save_dir + " is not a directory")
 
             status, save_path, bytes = self._rest.download_file(
-                'files', file_name, save_as, 'application/octet-stream')
+                'files', file_name, save_as, 'application/octet-stream',
+                parallel=parallel)
         except resthttp.RestHttpError as e:
             raise RuntimeError('failed to download "%s": %s' % (file_name, e))
         return save_path, bytes
@@ -654,13 +1116,127 @@ class StcHttp(object):
             saved[name] = bytes
         return saved
 
-    def upload(self, src_file_path, dst_file_name=None):
-        """Upload the specified file to the server."""
+    def upload(self, src_file_path, dst_file_name=None, dedup=False):
+        """Upload the specified file to the server.
+
+        Arguments:
+        src_file_path -- Path of local file to upload.
+        dst_file_name -- Optional name to give file on server.  Default is
+                         the name of the local file.
+        dedup         -- If True, and a file with identical contents has
+                         already been uploaded to this session with the same
+                         name, then return the upload information of that
+                         file instead of uploading again.  Uploaded files are
+                         forgotten on perform and bulkperform, since commands
+                         may replace files on the server.
+
+        Return:
+        Dictionary of upload information, including the 'name' of the file on
+        the server.
+
+        """
         self._check_session()
+        index = self._upload_index()
+        digest = None
+        if dedup:
+            digest = index.digest(src_file_path)
+            data = index.lookup(
+                digest, dst_file_name or os.path.basename(src_file_path),
+                os.path.getsize(src_file_path))
+            if data is not None:
+                if self._dbg_print:
+                    print('===> %s already uploaded as %s' %
+                          (src_file_path, data.get('name')))
+                return data
         status, data = self._rest.upload_file(
             'files', src_file_path, dst_file_name)
+        if isinstance(data, dict):
+            index.add(digest, data)
         return data
 
+    def upload_files(self, src_files, parallel=UPLOAD_PARALLEL, dedup=True):
+        """Upload multiple files at once, over parallel connections.
+
+        Arguments:
+        src_files -- List of paths of local files to upload, or dictionary of
+                     {src_file_path: dst_file_name} where dst_file_name may be
+                     None to use the name of the local file.
+        parallel  -- Maximum number of files to upload at once.
+        dedup     -- Skip uploading files whose contents have already been
+                     uploaded to this session with the same name (see
+                     upload).
+
+        Return:
+        Dictionary of {src_file_path: upload_info}.
+
+        """
+        self._check_session()
+        if not isinstance(src_files, dict):
+            src_files = dict.fromkeys(src_files)
+        pending = collections.deque(src_files.items())
+        results = {}
+        errors = []
+
+        def worker():
+            while not errors:
+                try:
+                    src, dst = pending.popleft()
+                except IndexError:
+                    return
+                try:
+                    results[src] = self.upload(src, dst, dedup)
+                except Exception as e:
+                    errors.append((src, e))
+                    return
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(min(parallel, len(pending)))]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+
+        if errors:
+            src, e = errors[0]
+            raise RuntimeError('failed to upload "%s": %s' % (src, e))
+        return results
+
+    def upload_stats(self):
+        """Return counts of files uploaded to this session, of uploads that
+        were skipped because the file was already uploaded, and of bytes not
+        uploaded.
+
+        Return:
+        {'files': num_files, 'hits': num_skipped, 'bytes_skipped': num_bytes}
+
+        """
+        return self._upload_index().stats()
+
+    def pipeline(self, max_inflight=pipeline.DEFAULT_MAX_INFLIGHT):
+        """Return a Pipeline that sends calls concurrently.
+
+        The get, config, create, delete, and perform methods of the pipeline
+        return a pipeline.Future right away, instead of waiting for the
+        response.  Calls on the same handle are sent in order.  Errors are
+        raised together, as pipeline.PipelineError, when the pipeline is
+        flushed or closed.  Config writes buffered by coalescing are sent
+        first, and pipelined config calls are not coalesced, so that an
+        error is reported against the call that made it.  Use as a context
+        manager to close on exit:
+
+            with stc.pipeline(max_inflight=32) as p:
+                for port in ports:
+                    p.config(port, active=False)
+
+        Arguments:
+        max_inflight -- Maximum number of calls sent at once.  Create this
+                        object with a pool_size of at least this many.
+
+        """
+        self._check_session()
+        return pipeline.Pipeline(self, max_inflight)
+
     def wait_until_complete(self, timeout=None):
         """Wait until sequencer is finished.
 
@@ -694,6 +1270,125 @@ class StcHttp(object):
     def _check_session(self):
         if not self.started():
             raise RuntimeError('must first join session')
+        if self._writes is not None:
+            self._writes.flush()
+
+    def _config(self, handle, attributes, buffered):
+        """Write attributes of object, buffering the write if coalescing
+        writes and buffered is True.
+
+        """
+        if not self.started():
+            raise RuntimeError('must first join session')
+        if self._validator is not None:
+            self._validator.check_config(handle, attributes)
+        if self._cache is not None:
+            self._cache.invalidate(handle, attributes or ())
+        writes = self._write_buffer() if buffered else None
+        if writes is not None:
+            writes.add(handle, attributes or {})
+            return
+        self._rest.put_request('objects', str(handle), attributes)
+
+    def _fetch_help(self, subject, args):
+        if subject:
+            if subject not in (
+                'commands', 'create', 'config', 'get', 'delete', 'perform',
+                'connect', 'connectall', 'disconnect', 'disconnectall',
+                'apply', 'log', 'help'):
+                self._check_session()
+            status, data = self._rest.get_request('help', subject, args)
+        else:
+            status, data = self._rest.get_request('help')
+
+        if isinstance(data, (list, tuple, set)):
+            return ' '.join((str(i) for i in data))
+        return data['message']
+
+    def _clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    def _cached_get(self, cache, handle, args):
+        """Get attributes, requesting only those not in cache."""
+        values = {}
+        missing = []
+        for name in args:
+            found, value = cache.get(handle, name)
+            if found:
+                values[name] = value
+            else:
+                missing.append(name)
+        if missing:
+            generation = cache.generation()
+            status, data = self._rest.get_request('objects', str(handle),
+                                                  missing)
+            if len(missing) == 1:
+                data = {missing[0]: data}
+            elif not isinstance(data, dict):
+                return data
+            else:
+                by_name = dict((k.lower(), v) for k, v in data.items())
+                if any(n.lower() not in by_name for n in missing):
+                    # Names not matched; return what the server did.
+                    values.update(data)
+                    return values
+                data = dict((n, by_name[n.lower()]) for n in missing)
+            for name, value in data.items():
+                cache.put(handle, name, value, generation)
+            values.update(data)
+        if len(args) == 1:
+            return values[args[0]]
+        return values
+
+    def _write_buffer(self):
+        """Return buffer of coalesced config writes, or None if not
+        coalescing writes.
+
+        """
+        if self._coalesce is None or self._writes is not None:
+            return self._writes
+        with self._writes_lock:
+            if self._coalesce is not None and self._writes is None:
+                if self.has_bulk_ops():
+                    max_objects, max_delay = self._coalesce
+                    self._writes = coalesce.WriteBuffer(
+                        self._send_bulk_config, self._send_config,
+                        max_objects, max_delay)
+                else:
+                    self._coalesce = None
+        return self._writes
+
+    def _close_writes(self):
+        """Send buffered config writes to the current session, and discard
+        the buffer, so that none of its writes go to another session.  A new
+        buffer is made for the next write.
+
+        """
+        with self._writes_lock:
+            writes, self._writes = self._writes, None
+        if writes is not None:
+            writes.close()
+
+    def _send_bulk_config(self, handles, attr_list):
+        self._rest.bulk_put_request('bulk/objects', quote(' '.join(handles)),
+                                    json.dumps(attr_list))
+
+    def _send_config(self, handle, attrs):
+        self._rest.put_request('objects', handle, attrs)
+
+    def _upload_index(self):
+        """Return the index of files uploaded to the current session."""
+        index = self._upload_indexes.get(self._sid)
+        if index is None:
+            index = self._upload_indexes.setdefault(self._sid,
+                                                    uploads.UploadIndex())
+        return index
+
+    def _clear_uploads(self):
+        index = self._upload_indexes.get(self._sid)
+        if index is not None:
+            index.clear()
 
     def _get_api_version(self):
         if not self._api_ver:
@@ -738,6 +1433,7 @@ class StcHttp(object):
 
         """
         self._check_session()
+        self._clear_cache()
         if kwattrs:
             if attributes:
                 if isinstance(attributes, dict):
@@ -747,7 +1443,11 @@ class StcHttp(object):
                         attr.update(kwattrs)
             else:
                 attributes = kwattrs
-        
+        if self._validator is not None:
+            for attrs in (attributes if isinstance(attributes, list) else
+                          [attributes]):
+                self._validator.check_config(locations, attrs)
+
         attributes = json.dumps(attributes)
         status, data = self._rest.bulk_put_request('bulk/objects', quote(locations), attributes)
         return data
@@ -779,6 +1479,7 @@ class StcHttp(object):
 
         """
         self._check_session()
+        self._clear_cache()
         params = {'object_type': object_type}
         if under:
             params['under'] = under
@@ -795,6 +1496,12 @@ class StcHttp(object):
         else:
             if kwattrs:
                 params.update(kwattrs)
+        if self._validator is not None:
+            if 'bulklist' in params:
+                self._validator.check_create_list(params['bulklist'],
+                                                  object_type)
+            elif params.get('object_type'):
+                self._validator.check_create(params['object_type'], params)
 
         myparams = json.dumps(params)
         status, data = self._rest.bulk_post_request('bulk/objects', None, myparams)
@@ -819,6 +1526,173 @@ class StcHttp(object):
         status, data = self._rest.bulk_get_request('bulk/objects', quote(locations), args, depth)
         return data
 
+    def iter_bulkget(self, locations, args=None, depth=1, prefix=None):
+        """Iterate over objects returned by bulkget as they are received.
+
+        The response is parsed incrementally as it arrives, so the first
+        object is available early and memory use does not grow with the size
+        of the response.
+
+        Arguments:
+        locations -- Locations of objects to get.
+        args      -- Zero or more attributes or relationships.
+        depth     -- Depth of children to include with each object.
+        prefix    -- Optional location of objects within the response, as
+                     dotted keys with 'item' for array elements.  If None,
+                     the elements of the first array of objects are returned.
+
+        Return:
+        Iterator over object dictionaries.
+
+        """
+        self._check_session()
+        chunks = self._rest.stream_request(
+            'GET', 'bulk/objects', quote(locations), args,
+            headers={'X-STC-API-Children-Depth': str(depth)})
+        return jsonstream.JsonStream(chunks).items(prefix)
+
+    def iter_objects(self, class_name, property_list, condition=None,
+                     root_list=None):
+        """Iterate over objects found by GetObjectsCommand as received.
+
+        The PropertyValues document, that the command returns as a string
+        embedded in the response, is parsed incrementally as it arrives.
+
+        Arguments:
+        class_name    -- Type of objects to get.
+        property_list -- Properties to get, as list or space-separated string.
+        condition     -- Optional condition that objects must match.
+                         Ex: "AsPath='1114' OR AsPath='1123'"
+        root_list     -- Optional handles, as list or space-separated string,
+                         of objects to search under.
+
+        Return:
+        Iterator over (handle, {property: value}) tuples.
+
+        """
+        self._check_session()
+        if isinstance(property_list, (list, tuple)):
+            property_list = ' '.join(property_list)
+        params = {'command': 'GetObjectsCommand', 'ClassName': class_name,
+                  'PropertyList': property_list}
+        if condition:
+            params['Condition'] = condition
+        if root_list:
+            if isinstance(root_list, (list, tuple)):
+                root_list = ' '.join(root_list)
+            params['RootList'] = root_list
+        chunks = self._rest.stream_request('POST', 'perform', params=params)
+
+        def objects():
+            stream = jsonstream.JsonStream(chunks)
+            if not stream.find('PropertyValues'):
+                return
+            values = jsonstream.JsonStream(stream.iter_string())
+            if values.peek() == '{':
+                for handle, props in values.kvitems():
+                    yield handle, props
+            else:
+                for props in values.items('item'):
+                    yield props.get('handle'), props
+
+        return objects()
+
+    def query_objects(self, cls, props, condition=None, roots=None,
+                      chunk_size=QUERY_CHUNK_ROOTS):
+        """Get properties of all objects of a type, as columns.
+
+        Objects are found with GetObjectsCommand, and its PropertyValues are
+        parsed as they are received, into a column for each property.  To
+        keep memory bounded for very large classes, on the server and in the
+        response, pass roots, such as the children of project1, and they are
+        searched chunk_size roots at a time.
+
+        Arguments:
+        cls        -- Type of objects to get.
+        props      -- Properties to get, as list or space-separated string.
+                      Ex: ['Name', 'ipv4networkblock.StartIpList']
+        condition  -- Optional condition that objects must match.
+                      Ex: "AsPath='1114' OR AsPath='1123'"
+        roots      -- Optional handles, as list or space-separated string,
+                      of objects to search under.
+        chunk_size -- Number of roots searched by each command.
+
+        Return:
+        columns.ColumnTable with object handles as keys and a column for
+        each property.
+
+        """
+        if not isinstance(props, (list, tuple)):
+            props = props.split()
+        table = columns.ColumnTable(props)
+        if roots is None:
+            chunks = [None]
+        else:
+            if not isinstance(roots, (list, tuple)):
+                roots = roots.split()
+            chunk_size = max(1, chunk_size or len(roots))
+            chunks = [roots[i:i + chunk_size]
+                      for i in range(0, len(roots), chunk_size)]
+        seen = set()
+        for chunk in chunks:
+            for handle, values in self.iter_objects(cls, props, condition,
+                                                    chunk):
+                if handle not in seen:
+                    seen.add(handle)
+                    table.append(handle, values)
+        return table
+
+    def result_reader(self, dataset, properties=None, records_per_page=None):
+        """Return reader of the results of a subscribed ResultDataSet.
+
+        Each page of results is read with one bulkget of the counters of all
+        its result objects, into a column for each counter.  See
+        results.ResultReader.
+
+        Arguments:
+        dataset          -- Handle of ResultDataSet, as returned by
+                            ResultsSubscribeCommand.
+        properties       -- Optional counters to read, as list or
+                            space-separated string.  Ex: ['TotalFrameCount',
+                            'L1BitRate'].  If None, read all attributes.
+        records_per_page -- If given, set RecordsPerPage of the data set.
+
+        Return:
+        results.ResultReader object.
+
+        """
+        self._check_session()
+        return results.ResultReader(self, dataset, properties,
+                                    records_per_page)
+
+    def snapshot(self, root='project1', depth=snapshot.DEFAULT_DEPTH,
+                 relations=None):
+        """Get a subtree of objects with bulkget, and return it as a graph.
+
+        The subtree is fetched with one bulkget, or two if relations are
+        given, and parsed as it is received.  The snapshot is then searched
+        by handle, type, name, parent, children, and relations without any
+        requests.  See snapshot.Snapshot.
+
+        Arguments:
+        root      -- Handle, or space-separated handles, of objects at the
+                     top of the subtree.
+        depth     -- Levels of objects, counting the root, to include.
+        relations -- Optional relation names, such as
+                     ['AffiliationPort-targets'], to also get for each
+                     object.  Relations returned with the attributes of
+                     objects are always included.
+
+        Return:
+        snapshot.Snapshot object.
+
+        """
+        self._check_session()
+        snap = snapshot.Snapshot(self.iter_bulkget(root, None, depth))
+        if relations:
+            snap.add_relations(self.iter_bulkget(root, list(relations), depth))
+        return snap
+
     def bulkperform(self, command, params=None, **kwargs):
         """Execute a command.
 
@@ -832,6 +1706,8 @@ class StcHttp(object):
 
         """
         self._check_session()
+        self._clear_cache()
+        self._clear_uploads()
         if not params:
             params = {}
         if kwargs:
@@ -848,5 +1724,6 @@ class StcHttp(object):
 
         """
         self._check_session()
+        self._clear_cache()
         status, data = self._rest.delete_request('bulk/objects', str(handles))
         return data
@@ -20,8 +20,10 @@ import atexit
 import getpass
 
 try:
+    from . import resthttp
     from . import stchttp
 except ValueError:
+    import resthttp
     import stchttp
 
 
@@ -236,7 +238,11 @@ class StcPythonRest(object):
             server = os.environ.get('STC_SERVER_ADDRESS')
             if not server:
                 raise EnvironmentError('STC_SERVER_ADDRESS not set')
-        self._stc = stchttp.StcHttp(server)
+        # The first request of the new session checks that the server can be
+        # reached, so do not make a separate request to check.
+        self._stc = stchttp.StcHttp(
+            server, lazy=True,
+            help_cache=os.environ.get('STC_HELP_CACHE') == '1')
         if not session_name:
             session_name = os.environ.get('STC_SESSION_NAME')
             if not session_name or session_name == '__NEW_TEST_SESSION__':
@@ -252,6 +258,14 @@ class StcPythonRest(object):
             # Try to get existing_session from environ if not passed in.
             existing_session = os.environ.get('EXISTING_SESSION')
 
+        try:
+            return self._start_session(user_name, session_name,
+                                       existing_session)
+        except resthttp.ConnectionError:
+            self._stc = None
+            raise RuntimeError('Cannot connect to STC server: %s' % server)
+
+    def _start_session(self, user_name, session_name, existing_session):
         if existing_session:
             existing_session = existing_session.lower()
             if existing_session == 'kill':
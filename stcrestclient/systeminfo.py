@@ -28,7 +28,8 @@ def stc_system_info(stc_addr):
     STC information.
 
     """
-    stc = stchttp.StcHttp(stc_addr)
+    # Getting the list of sessions checks that the server can be reached.
+    stc = stchttp.StcHttp(stc_addr, lazy=True)
     sessions = stc.sessions()
     if sessions:
         # If a session already exists, use it to get STC information.
@@ -28,9 +28,11 @@ if __name__ == '__main__' and __package__ is None:
     __package__ = 'stcrestclient'
 
 try:
+    from . import helpcache
     from . import stchttp
     from . import resthttp
 except ValueError:
+    import helpcache
     import stchttp
     import resthttp
 
@@ -406,7 +408,7 @@ class TestCenterCommandShell(cmd.Cmd):
 
         try:
             self._stc = stchttp.StcHttp(
-                server, debug_print=self._stc.debug_print())
+                server, debug_print=self._stc.debug_print(), help_cache=True)
         except RuntimeError as e:
             print(e)
             return
@@ -901,6 +903,16 @@ class TestCenterCommandShell(cmd.Cmd):
                 return
             print(e)
 
+    def complete_stc_help(self, text, line, begidx, endidx):
+        cache = self._stc.help_cache()
+        if cache is None:
+            return []
+        names = []
+        for kind in helpcache.LIST_KINDS:
+            names.extend(cache.names(kind) or ())
+        text = text.lower()
+        return [n for n in names if n.lower().startswith(text)]
+
     def do_wait_until_complete(self, timeout):
         """Wait until the sequencer is finished: wait_until_complete 30
 
@@ -1089,7 +1101,7 @@ def main():
     tccsh._port = args.port
     try:
         tccsh._stc = stchttp.StcHttp(args.server, args.port,
-                                     debug_print=args.debug)
+                                     debug_print=args.debug, help_cache=True)
         if cmds:
             tccsh.preloop()
             for c in cmds:
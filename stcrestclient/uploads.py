@@ -0,0 +1,111 @@
+"""
+Content-hash index of files uploaded to a test session.
+
+UploadIndex remembers the content hash and name of each file uploaded to a
+session, so that uploading a byte-identical file to the same name again can be
+skipped.
+
+"""
+from __future__ import absolute_import
+
+import hashlib
+import os
+import threading
+
+# Bytes read at a time when hashing a file.
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """Return SHA-256 hex digest of the contents of file at path."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class UploadIndex(object):
+
+    """
+    Index of files uploaded to one session, by content hash and name.
+
+    Digests of local files are cached by path, size, and modification time, so
+    an unchanged file is only read once to hash it.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._uploads = {}
+        self._digests = {}
+        self._hits = 0
+        self._bytes_skipped = 0
+
+    def digest(self, path):
+        """Return content digest of local file at path."""
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_size, st.st_mtime)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            digest = file_digest(path)
+            with self._lock:
+                self._digests[key] = digest
+        return digest
+
+    def lookup(self, digest, dst_name, size=0):
+        """Return upload info of file already uploaded with same content to
+        the name dst_name.  Return None if there is no such file.
+
+        """
+        with self._lock:
+            info = self._uploads.get((digest, dst_name))
+            if info is None:
+                return None
+            self._hits += 1
+            self._bytes_skipped += size
+            return dict(info)
+
+    def add(self, digest, info):
+        """Record upload info of a file uploaded with the given digest.
+
+        Files uploaded earlier with the same name are forgotten, since the
+        server copy has been replaced.
+
+        """
+        with self._lock:
+            self._discard_name(info.get('name'))
+            if digest is not None:
+                self._uploads[(digest, info.get('name'))] = dict(info)
+
+    def discard_name(self, name):
+        """Forget the file uploaded with the given name."""
+        with self._lock:
+            self._discard_name(name)
+
+    def clear(self):
+        """Forget all uploaded files, such as when a command may have
+        replaced them on the server.
+
+        """
+        with self._lock:
+            self._uploads.clear()
+
+    def stats(self):
+        """Return dictionary of files indexed, uploads skipped, and bytes
+        not uploaded because the file was already on the server.
+
+        """
+        with self._lock:
+            return {'files': len(self._uploads), 'hits': self._hits,
+                    'bytes_skipped': self._bytes_skipped}
+
+    def _discard_name(self, name):
+        if not name:
+            return
+        for key in [k for k in self._uploads if k[1] == name]:
+            del self._uploads[key]
@@ -0,0 +1,240 @@
+"""
+Client-side validation of object types, attributes, and relations.
+
+Validator checks the object types and attribute names given to create and
+config calls, and the values of attributes with simple types, against the
+metadata parsed from the help of each type.  A mistake is then reported
+before any request is sent, instead of by the server, and, for bulk calls,
+before some of the objects have been created.
+
+With the help cache on, the metadata of each type is read from files, so
+validation needs no requests once the cache is warm.
+
+"""
+from __future__ import absolute_import
+
+import re
+import threading
+
+try:
+    from . import resthttp
+except ValueError:
+    import resthttp
+
+# Errors listed in the message of a ValidationError.
+MAX_LISTED = 5
+
+# Ranges of integer attribute types.
+_INT_RANGES = {
+    'u8': (0, 0xff), 'u16': (0, 0xffff), 'u32': (0, 0xffffffff),
+    'u64': (0, 0xffffffffffffffff), 's8': (-0x80, 0x7f),
+    's16': (-0x8000, 0x7fff), 's32': (-0x80000000, 0x7fffffff),
+    's64': (-0x8000000000000000, 0x7fffffffffffffff)}
+_BOOLS = ('true', 'false', '1', '0')
+_IPV4 = re.compile(r'^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})$')
+_MAC = re.compile(r'^[0-9a-f]{1,2}([-:.])([0-9a-f]{1,2}\1){4}[0-9a-f]{1,2}$',
+                  re.I)
+_HANDLE_NUM = re.compile(r'\d+$')
+_PREDICATE = re.compile(r'\[[^\]]*\]')
+_RELATION_SIDES = ('-targets', '-sources')
+# Parameters of create requests that are not attributes.
+_PARAMS = ('object_type', 'under', 'bulklist')
+
+
+class ValidationError(RuntimeError):
+
+    """
+    Request is not valid for the object types it names.
+
+    The errors attribute is a list of messages, one for each problem found.
+
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        msg = '; '.join(errors[:MAX_LISTED])
+        if len(errors) > MAX_LISTED:
+            msg += '; and %d more' % (len(errors) - MAX_LISTED,)
+        RuntimeError.__init__(self, 'invalid request: ' + msg)
+
+
+class Validator(object):
+
+    """
+    Checks requests against metadata of object types.
+
+    Types whose help lists no attributes, such as when the help is in a form
+    that could not be parsed, are checked to exist, but their attributes are
+    not checked.
+
+    Arguments:
+    metadata -- Callable, metadata(type_name), that returns the metadata of
+                a type, as returned by helpcache.parse_help.  It may raise
+                resthttp.RestHttpError if there is no help on the type.
+
+    """
+
+    def __init__(self, metadata):
+        self._metadata = metadata
+        self._lock = threading.Lock()
+        self._types = {}
+
+    def type_info(self, object_type):
+        """Return metadata of object type, or None if it is not known."""
+        key = object_type.lower()
+        try:
+            return self._types[key]
+        except KeyError:
+            pass
+        try:
+            meta = self._metadata(object_type)
+        except resthttp.RestHttpError as e:
+            if e.http_status not in (400, 404):
+                raise
+            meta = None
+        with self._lock:
+            return self._types.setdefault(key, meta)
+
+    def check_create(self, object_type, attributes):
+        """Raise ValidationError if object type, or any of its attributes,
+        children created with it, or their attributes, are not valid.
+
+        """
+        errors = []
+        self._check_object(object_type, attributes, errors)
+        if errors:
+            raise ValidationError(errors)
+
+    def check_create_list(self, attr_list, object_type=None):
+        """Raise ValidationError listing the problems with any of the
+        objects described by a list of attribute dictionaries, each with
+        an object_type, or of the given object_type.
+
+        """
+        errors = []
+        for i, attrs in enumerate(attr_list):
+            obj_type = attrs.get('object_type') or object_type
+            if not obj_type:
+                errors.append('object %d: missing object_type' % (i,))
+                continue
+            found = []
+            self._check_object(obj_type, attrs, found)
+            errors.extend('object %d: %s' % (i, e) for e in found)
+        if errors:
+            raise ValidationError(errors)
+
+    def check_config(self, handle, attributes):
+        """Raise ValidationError if attributes are not valid for the type of
+        object, given by a handle, handle path, or location.
+
+        """
+        obj_type = handle_type(handle)
+        errors = []
+        if obj_type is not None:
+            self._check_object(obj_type, attributes, errors, create=False)
+        if errors:
+            raise ValidationError(errors)
+
+    ###########################################################################
+    # private methods
+    #
+
+    def _check_object(self, object_type, attributes, errors, create=True):
+        meta = self.type_info(object_type)
+        if meta is None:
+            errors.append('unknown object type: %s' % (object_type,))
+            return
+        attr_meta = meta['attributes']
+        children = set(c.lower() for c in meta['children'])
+        relations = set(r.lower() for r in meta['relations'])
+        for name, value in (attributes or {}).items():
+            key = name.lower()
+            if key in _PARAMS:
+                continue
+            if create and (isinstance(value, dict) or (
+                    isinstance(value, list) and value and
+                    all(isinstance(v, dict) for v in value))):
+                # Children created with the object.
+                if children and key not in children:
+                    errors.append('%s cannot have children of type %s' %
+                                  (object_type, name))
+                    continue
+                for child in (value if isinstance(value, list) else [value]):
+                    self._check_object(name, child, errors)
+                continue
+            if key.endswith(_RELATION_SIDES):
+                rel = key.rsplit('-', 1)[0]
+                if relations and rel not in relations:
+                    errors.append('%s has no relation %s' %
+                                  (object_type, name))
+                continue
+            if key.startswith('children-'):
+                if children and key[9:] not in children:
+                    errors.append('%s has no children of type %s' %
+                                  (object_type, name[9:]))
+                continue
+            if not attr_meta or '.' in key:
+                continue
+            info = attr_meta.get(key)
+            if info is None:
+                errors.append('%s has no attribute %s' % (object_type, name))
+            elif info['readonly']:
+                errors.append('%s.%s is read-only' % (object_type, name))
+            elif not valid_value(info['type'], value):
+                errors.append('%s.%s: %r is not a valid %s' % (
+                    object_type, name, value, info['type']))
+
+
+def handle_type(handle):
+    """Return object type of handle, handle path, or location, or None if
+    it has none, such as for a list of handles.
+
+    Ex: 'port' for 'port1', 'ipv4if' for 'emulateddevice1.ipv4if', and
+    'bgprouterconfig' for '//emulateddevice[@name="dev"]/bgprouterconfig'.
+
+    """
+    handle = str(handle).strip()
+    if not handle or ' ' in _PREDICATE.sub('', handle):
+        return None
+    last = _PREDICATE.sub('', handle).rstrip('/').split('/')[-1]
+    last = last.split('.')[-1]
+    return _HANDLE_NUM.sub('', last) or None
+
+
+def valid_value(attr_type, value):
+    """Return True if value is valid for attribute type, or if the type is
+    not one that is checked.  Lists are given as space-separated strings or
+    as lists, and each item is checked.
+
+    """
+    if not attr_type:
+        return True
+    attr_type = attr_type.lower()
+    if isinstance(value, (list, tuple)):
+        return all(valid_value(attr_type, v) for v in value)
+    if isinstance(value, bool):
+        return attr_type == 'bool'
+    text = str(value).strip()
+    items = text.split() or ['']
+    if attr_type == 'bool':
+        return all(i.lower() in _BOOLS for i in items)
+    if attr_type in _INT_RANGES:
+        lo, hi = _INT_RANGES[attr_type]
+        for i in items:
+            try:
+                # Decimal, even with leading zeros, unless it has 0x.
+                n = int(i, 16 if '0x' in i[:3].lower() else 10)
+            except ValueError:
+                return False
+            if n < lo or n > hi:
+                return False
+        return True
+    if attr_type == 'ip':
+        for i in items:
+            m = _IPV4.match(i)
+            if m is None or any(int(g) > 255 for g in m.groups()):
+                return False
+        return True
+    if attr_type == 'mac':
+        return all(_MAC.match(i) for i in items)
+    return True
@@ -0,0 +1,19 @@
+import pytest
+
+from stcrestclient import stcemulator, stchttp
+
+
+@pytest.fixture
+def emulator():
+    emu = stcemulator.StcEmulator('127.0.0.1')
+    emu.start()
+    yield emu
+    emu.stop()
+
+
+@pytest.fixture
+def stc(emulator):
+    client = stchttp.StcHttp('127.0.0.1', emulator.port)
+    client.new_session('tester', 'test')
+    yield client
+    client.end_session(timeout=0)
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from stcrestclient import asyncresthttp, asyncstchttp, resthttp
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_no_requests_session():
+    rest = asyncresthttp.AsyncRestHttp('http://127.0.0.1:1/stcapi')
+    assert rest._session is None
+
+
+def test_calls(emulator):
+    async def main():
+        stc = asyncstchttp.AsyncStcHttp('127.0.0.1', emulator.port)
+        await stc.new_session('tester', 'test')
+        ports = await asyncio.gather(*[stc.create('port', 'project1')
+                                       for _ in range(10)])
+        names = await asyncio.gather(*[stc.get(p, 'Name') for p in ports])
+        await stc.end_session(timeout=0)
+        await stc.close()
+        return ports, names
+
+    ports, names = _run(main())
+    assert len(set(ports)) == 10
+    assert all(n.lower().startswith('port') for n in names)
+
+
+def test_upload_dedup(emulator, tmp_path):
+    path = tmp_path / 'config.xml'
+    path.write_bytes(b'<StcSystem/>' * 100)
+
+    async def main():
+        stc = asyncstchttp.AsyncStcHttp('127.0.0.1', emulator.port)
+        await stc.new_session('tester', 'test')
+        await stc.upload(str(path), dedup=True)
+        emulator.reset_stats()
+        await stc.upload(str(path), dedup=True)
+        await stc.end_session(timeout=0)
+        await stc.close()
+
+    _run(main())
+    assert not emulator.stats().get('POST files')
+
+
+def test_retry_when_reused_connection_resets(emulator, monkeypatch):
+    write = asyncresthttp.AsyncRestHttp._write_request
+    resets = []
+
+    async def reset_once(self, writer, head, data, rec):
+        if not resets:
+            resets.append(1)
+            raise ConnectionResetError('reset by peer')
+        return await write(self, writer, head, data, rec)
+
+    async def main():
+        rest = asyncresthttp.AsyncRestHttp(emulator.url)
+        await rest.get_request('system')
+        monkeypatch.setattr(asyncresthttp.AsyncRestHttp, '_write_request',
+                            reset_once)
+        status, data = await rest.get_request('system')
+        await rest.close()
+        return status, rest.conn_stats()
+
+    status, stats = _run(main())
+    assert status == 200
+    assert resets
+    assert stats['opened'] == 2
+
+
+@pytest.mark.parametrize('reply', [b'', b'garbage\r\n', b'HTTP/1.1 OK\r\n'])
+def test_bad_status_line(reply):
+    async def handle(reader, writer):
+        await reader.readline()
+        writer.write(reply)
+        await writer.drain()
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        rest = asyncresthttp.AsyncRestHttp('http://127.0.0.1:%d/stcapi' %
+                                           port)
+        try:
+            with pytest.raises(resthttp.ConnectionError):
+                await rest.get_request('system')
+        finally:
+            await rest.close()
+            server.close()
+            await server.wait_closed()
+
+    _run(main())
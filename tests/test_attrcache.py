@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from stcrestclient import attrcache
+
+
+@pytest.fixture
+def port(stc):
+    stc.set_get_cache(True)
+    return stc.create('port', 'project1', Name='Port A')
+
+
+def gets(emulator):
+    return emulator.stats().get('GET objects', 0)
+
+
+def test_repeated_get(emulator, stc, port):
+    emulator.reset_stats()
+    assert stc.get(port, 'Name') == 'Port A'
+    assert stc.get(port, 'name') == 'Port A'
+    assert stc.get(port, 'Name', 'Location') == {'Name': 'Port A',
+                                                'Location': ''}
+    assert stc.get(port, 'Location', 'Name') == {'Name': 'Port A',
+                                                'Location': ''}
+    # Only Location was requested by the third get.
+    assert gets(emulator) == 2
+    stats = stc.get_cache_stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (4, 2, 2)
+
+
+def test_config_invalidates(emulator, stc, port):
+    stc.get(port, 'Name', 'Location')
+    stc.config(port, name='Port B')
+    emulator.reset_stats()
+    assert stc.get(port, 'Location') == ''
+    assert gets(emulator) == 0
+    assert stc.get(port, 'Name') == 'Port B'
+    assert gets(emulator) == 1
+
+
+def test_create_invalidates_children(emulator, stc, port):
+    assert stc.get(port, 'children') == ''
+    block = stc.create('StreamBlock', port)
+    assert stc.get(port, 'children') == block
+    assert stc.get('project1', 'children').split()[-1] == port
+
+
+@pytest.mark.parametrize('call', [
+    lambda stc: stc.perform('DeviceCreateCommand', ParentList='project1'),
+    lambda stc: stc.delete('port1'),
+    lambda stc: stc.bulkconfig('port', Name='x'),
+    lambda stc: stc.apply(),
+])
+def test_cleared(emulator, stc, port, call):
+    stc.get('project1', 'Name')
+    call(stc)
+    assert stc.get_cache_stats()['entries'] == 0
+
+
+def test_volatile_not_cached(emulator, stc, port):
+    emulator.reset_stats()
+    for _ in range(2):
+        stc.get(port, 'Status')
+        stc.get('project1', 'TestState')
+    assert gets(emulator) == 4
+    assert stc.get_cache_stats()['entries'] == 0
+
+
+def test_ttls(emulator, stc, port):
+    stc.set_get_cache(True, ttls={'port.name': 0.05,
+                                  'port.location': 0})
+    stc.get(port, 'Name', 'Location')
+    emulator.reset_stats()
+    stc.get(port, 'Name')
+    assert gets(emulator) == 0
+    stc.get(port, 'Location')
+    assert gets(emulator) == 1
+    time.sleep(0.06)
+    stc.get(port, 'Name')
+    assert gets(emulator) == 2
+
+
+def test_cache_off(emulator, stc, port):
+    stc.set_get_cache(False)
+    emulator.reset_stats()
+    stc.get(port, 'Name')
+    stc.get(port, 'Name')
+    assert gets(emulator) == 2
+    assert stc.get_cache_stats()['entries'] == 0
+
+
+def test_lru():
+    cache = attrcache.AttributeCache(max_entries=2)
+    cache.put('port1', 'Name', 'a')
+    cache.put('port2', 'Name', 'b')
+    assert cache.get('PORT1', 'name') == (True, 'a')
+    cache.put('port3', 'Name', 'c')
+    assert cache.get('port2', 'Name') == (False, None)
+    assert cache.get('port1', 'Name') == (True, 'a')
+    assert cache.stats()['evictions'] == 1
+
+
+def test_stale_put_dropped():
+    cache = attrcache.AttributeCache()
+    generation = cache.generation()
+    cache.invalidate('port1', ['Name'])
+    cache.put('port1', 'Name', 'old', generation)
+    assert cache.get('port1', 'Name') == (False, None)
+
+
+def test_relations_invalidated():
+    cache = attrcache.AttributeCache()
+    cache.put('port1', 'AffiliationPort-sources', 'emulateddevice1')
+    cache.put('emulateddevice1', 'AffiliationPort-targets', 'port1')
+    cache.put('emulateddevice1', 'Name', 'dev')
+    cache.invalidate('emulateddevice2', ['AffiliationPort-targets'])
+    assert len(cache) == 1
+    assert cache.get('emulateddevice1', 'Name') == (True, 'dev')
@@ -0,0 +1,150 @@
+import time
+
+import pytest
+
+from stcrestclient import coalesce, stcemulator, stchttp
+
+
+@pytest.fixture
+def ports(stc):
+    return [stc.create('port', 'project1') for _ in range(5)]
+
+
+def sent(emulator):
+    """Return counts of requests, leaving out the GET system made to
+    check for the bulk API when the first write is buffered.
+
+    """
+    stats = emulator.stats()
+    stats.pop('GET system', None)
+    return stats
+
+
+def test_writes_merged(emulator, stc, ports):
+    stc.set_coalescing(True, max_delay=None)
+    emulator.reset_stats()
+    for i, port in enumerate(ports):
+        stc.config(port, Name='port %d' % i)
+    stc.config(ports[0], {'name': 'first', 'Location': '//10.0.0.1/1/1'})
+    assert sent(emulator) == {}
+
+    # A get sees the writes, so they are sent first.
+    assert stc.get(ports[0], 'Name') == 'first'
+    assert sent(emulator) == {'PUT bulk/objects': 1, 'GET objects': 1}
+    assert [stc.get(h, 'Name') for h in ports[1:]] == [
+        'port %d' % i for i in range(1, 5)]
+    assert stc.get(ports[0], 'Location') == '//10.0.0.1/1/1'
+    assert stc.coalesce_stats() == {'writes': 6, 'merged': 1,
+                                    'requests': 1, 'objects': 5,
+                                    'fallbacks': 0}
+
+
+def test_max_objects(emulator, stc, ports):
+    stc.set_coalescing(True, max_objects=2, max_delay=None)
+    emulator.reset_stats()
+    for port in ports:
+        stc.config(port, Name='x')
+    assert sent(emulator) == {'PUT bulk/objects': 2}
+    stc.flush()
+    assert sent(emulator) == {'PUT bulk/objects': 3}
+
+
+def test_max_delay(emulator, stc, ports):
+    stc.set_coalescing(True, max_delay=0.01)
+    emulator.reset_stats()
+    stc.config(ports[0], Name='x')
+    stc.config(ports[1], Name='y')
+    deadline = time.time() + 5
+    while not sent(emulator) and time.time() < deadline:
+        time.sleep(0.01)
+    assert sent(emulator) == {'PUT bulk/objects': 1}
+
+
+def test_failed_write(emulator, stc, ports):
+    stc.set_coalescing(True, max_delay=None)
+    stc.config(ports[0], Name='a')
+    stc.config('nosuch1', Name='b')
+    stc.config(ports[1], Name='c')
+    emulator.reset_stats()
+    with pytest.raises(RuntimeError) as e:
+        stc.flush()
+    assert 'nosuch1' in str(e.value)
+    # The bulk request fails, and the writes are sent one at a time.
+    assert sent(emulator) == {'PUT bulk/objects': 1, 'PUT objects': 3}
+    assert stc.coalesce_stats()['fallbacks'] == 1
+    assert stc.get(ports[0], 'Name') == 'a'
+    assert stc.get(ports[1], 'Name') == 'c'
+
+
+def test_turned_off(emulator, stc, ports):
+    stc.set_coalescing(True, max_delay=None)
+    stc.config(ports[0], Name='a')
+    emulator.reset_stats()
+    stc.set_coalescing(False)
+    assert sent(emulator) == {'PUT bulk/objects': 1}
+    stc.config(ports[1], Name='b')
+    assert sent(emulator) == {'PUT bulk/objects': 1, 'PUT objects': 1}
+
+
+def test_without_bulk_api():
+    with stcemulator.StcEmulator('127.0.0.1', bulk_api=False) as emu:
+        stc = stchttp.StcHttp('127.0.0.1', emu.port, coalesce=True)
+        stc.new_session('tester', 'test')
+        port = stc.create('port', 'project1')
+        emu.reset_stats()
+        stc.config(port, Name='x')
+        assert sent(emu) == {'PUT objects': 1}
+        stc.end_session(timeout=0)
+
+
+def test_write_buffer():
+    sent = []
+
+    def send_bulk(handles, attr_list):
+        if 'bad' in handles:
+            raise RuntimeError('bulk failed')
+        sent.append(('bulk', handles, attr_list))
+
+    def send_one(handle, attrs):
+        if handle == 'bad':
+            raise RuntimeError('no such object')
+        sent.append(('one', handle, attrs))
+
+    buf = coalesce.WriteBuffer(send_bulk, send_one, max_objects=3,
+                               max_delay=None)
+    buf.add('port1', {'Name': 'a', 'Active': 'true'})
+    buf.add('port2', {'Name': 'b'})
+    buf.add('port1', {'name': 'c'})
+    assert len(buf) == 2
+    buf.flush()
+    assert sent == [('bulk', ['port1', 'port2'],
+                     [{'Active': 'true', 'name': 'c'}, {'Name': 'b'}])]
+
+    del sent[:]
+    buf.add('port1', {'Name': 'd'})
+    buf.add('bad', {'Name': 'e'})
+    with pytest.raises(RuntimeError) as e:
+        buf.flush()
+    assert str(e.value) == 'failed to config bad: no such object'
+    assert sent == [('one', 'port1', {'Name': 'd'})]
+    assert buf.stats() == {'writes': 5, 'merged': 1, 'requests': 1,
+                           'objects': 2, 'fallbacks': 1}
+
+
+@pytest.mark.parametrize('switch', ['new', 'join'])
+def test_writes_stay_in_session(emulator, stc, switch):
+    stc.set_coalescing(True, max_delay=60)
+    first = stc._sid
+    other = stchttp.StcHttp('127.0.0.1', emulator.port)
+    second = other.new_session('tester', 'other')
+    stc.config('project1', Name='fromA')
+    if switch == 'new':
+        stc.end_session(None)
+        assert stc.new_session('tester', 'other2') != first
+    else:
+        stc.join_session(second)
+    assert stc.get('project1', 'Name') == 'Project 1'
+    stc.config('project1', Name='fromB')
+    stc.join_session(first)
+    assert stc.get('project1', 'Name') == 'fromA'
+    other.end_session(timeout=0)
@@ -0,0 +1,58 @@
+import array
+import math
+
+import pytest
+
+from stcrestclient import columns
+
+
+def _column(values):
+    col = columns.Column('c')
+    for v in values:
+        col.append(v)
+    return col
+
+
+@pytest.mark.parametrize('values', [
+    ['10', '1.50', 'x'],
+    ['1.10', '2.0', '1e5', 'abc'],
+    ['7', '-0', '0.0', '3.14159265358979', 'v1'],
+    ['1', '0011'],
+    [10, '2.50', 'q'],
+])
+def test_widen_to_str_keeps_given_text(values):
+    col = _column(values)
+    assert col.kind == 'str'
+    assert list(col) == [str(v) for v in values]
+
+
+def test_kinds():
+    assert _column(['1', '2', 3]).kind == 'int'
+    assert isinstance(_column(['1', '2']).values, array.array)
+    col = _column(['1', '2.5'])
+    assert col.kind == 'float'
+    assert list(col) == [1.0, 2.5]
+    assert _column(['0011']).kind == 'str'
+    assert _column([True]).kind == 'str'
+
+
+def test_missing_values():
+    col = _column(['1', None, '3'])
+    assert col.kind == 'float'
+    assert math.isnan(col[1])
+    col.append('x')
+    assert list(col) == ['1', None, '3', 'x']
+
+
+def test_table_append_and_extend():
+    table = columns.ColumnTable(['A'])
+    table.append('h1', {'a': '1'})
+    table.append('h2', {'B': 'x', 'A': '2'}, extend=True)
+    table.append('h3', {'b': 'y', 'c': 'ignored'})
+    assert table.names == ['A', 'B']
+    assert table['a'].kind == 'float'
+    assert list(table['a'])[:2] == [1.0, 2.0]
+    assert math.isnan(table['a'][2])
+    assert list(table['B']) == [None, 'x', 'y']
+    assert table.keys == ['h1', 'h2', 'h3']
+    assert dict(table.rows())['h2'] == {'A': 2.0, 'B': 'x'}
@@ -0,0 +1,63 @@
+import pytest
+
+from stcrestclient import resthttp, stcemulator, stchttp
+
+
+def _bulk_posts(emu):
+    return emu.stats().get('POST bulk/objects', 0)
+
+
+def _sent(stc):
+    return stc.stats().get('POST bulk/objects', {}).get('requests', 0)
+
+
+def test_compressed_bulkcreate(emulator, stc):
+    stc.set_compression(True, 1)
+    emulator.reset_stats()
+    stc.bulkcreate('port', [{'Name': 'p%d' % i} for i in range(20)])
+    assert _bulk_posts(emulator) == 1
+    stats = stc.compression_stats()
+    assert stats['requests'] == 1
+    assert not stats['rejected']
+
+
+def test_error_is_not_sent_again(emulator, stc):
+    stc.set_compression(True, 1)
+    emulator.reset_stats()
+    with pytest.raises(resthttp.RestHttpError) as e:
+        stc.bulkcreate('port', [{'Name': 'p%d' % i} for i in range(20)] +
+                       [{'Name': 'p20', 'children': 'x'}])
+    assert e.value.http_status == 400
+    assert _bulk_posts(emulator) == 1
+
+
+def test_rejected_encoding_sent_uncompressed():
+    with stcemulator.StcEmulator('127.0.0.1', accept_gzip=False) as emu:
+        stc = stchttp.StcHttp('127.0.0.1', emu.port)
+        stc.new_session('tester', 'test')
+        stc.set_compression(True, 1)
+        stc.bulkcreate('port', [{'Name': 'p%d' % i} for i in range(20)])
+        assert _sent(stc) == 2
+        assert _bulk_posts(emu) == 1
+        assert stc.compression_stats()['rejected']
+        stc.bulkcreate('port', [{'Name': 'p%d' % i} for i in range(20)])
+        assert _sent(stc) == 3
+        stc.end_session(timeout=0)
+
+
+class _Response(object):
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+
+@pytest.mark.parametrize('status, text, rejected', [
+    (415, 'unsupported media type', True),
+    (400, 'Content-Encoding gzip is not supported', True),
+    (400, 'invalid encoding of attribute value', False),
+    (400, 'cannot create gzip file: bad name', False),
+    (500, 'content-encoding failed', False),
+])
+def test_compression_rejected(status, text, rejected):
+    assert resthttp.compression_rejected(_Response(status, text)) == rejected
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from stcrestclient import resthttp
+
+SEGMENT = 16384
+CONTENT = bytes(bytearray(i * 7 % 251 for i in range(7 * SEGMENT + 100)))
+
+
+@pytest.fixture
+def remote(stc, tmpdir):
+    src = str(tmpdir.join('capture.pcap'))
+    with open(src, 'wb') as f:
+        f.write(CONTENT)
+    stc.upload(src, 'capture.pcap')
+    return 'capture.pcap'
+
+
+def download(stc, name, path, parallel=2):
+    return stc._rest.download_file('files', name, path, parallel=parallel,
+                                   segment_size=SEGMENT)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def write_state(path, state, part=b''):
+    with open(path + '.part', 'wb') as f:
+        f.write(part)
+    with open(path + '.part.json', 'w') as f:
+        json.dump(state, f)
+
+
+def test_download_ranges(emulator, stc, remote, tmpdir):
+    path = str(tmpdir.join('out.pcap'))
+    emulator.reset_stats()
+    assert download(stc, remote, path, parallel=3)[2] == len(CONTENT)
+    assert read(path) == CONTENT
+    assert emulator.stats()['GET files'] == 8
+    assert not os.path.exists(path + '.part')
+    assert not os.path.exists(path + '.part.json')
+
+
+def test_download_stream(emulator, stc, remote, tmpdir):
+    path = str(tmpdir.join('out.pcap'))
+    save_path, size = stc.download(remote, path, parallel=1)
+    assert (save_path, size) == (path, len(CONTENT))
+    assert read(path) == CONTENT
+
+
+def test_resume_ranges(monkeypatch, emulator, stc, remote, tmpdir):
+    path = str(tmpdir.join('out.pcap'))
+    rest = stc._rest
+    fetch_range = rest._fetch_range
+
+    def interrupted(url, query_items, headers, container, f, start, end):
+        if start >= 4 * SEGMENT:
+            raise IOError('interrupted')
+        return fetch_range(url, query_items, headers, container, f, start,
+                           end)
+
+    monkeypatch.setattr(rest, '_fetch_range', interrupted)
+    with pytest.raises(RuntimeError):
+        download(stc, remote, path)
+    with open(path + '.part.json') as f:
+        done = json.load(f)['done']
+    assert done and set(done) <= set(range(4))
+
+    monkeypatch.undo()
+    emulator.reset_stats()
+    download(stc, remote, path)
+    assert read(path) == CONTENT
+    assert emulator.stats()['GET files'] == 8 - len(done)
+
+
+def test_resume_ranges_of_changed_file(emulator, stc, remote, tmpdir):
+    path = str(tmpdir.join('out.pcap'))
+    write_state(path, {'mode': 'ranges', 'size': len(CONTENT),
+                       'validator': '"old"', 'segment_size': SEGMENT,
+                       'done': [0, 1, 2, 3, 4, 5, 6]},
+                b'x' * len(CONTENT))
+    emulator.reset_stats()
+    download(stc, remote, path)
+    assert read(path) == CONTENT
+    assert emulator.stats()['GET files'] == 8
+
+
+def test_resume_stream(emulator, stc, remote, tmpdir):
+    path = str(tmpdir.join('out.pcap'))
+    etag = '"%s"' % hashlib.md5(CONTENT).hexdigest()
+    write_state(path, {'mode': 'stream', 'size': len(CONTENT),
+                       'validator': etag}, CONTENT[:1000])
+    emulator.reset_stats()
+    download(stc, remote, path, parallel=1)
+    assert read(path) == CONTENT
+    assert emulator.stats() == {'HEAD files': 1, 'GET files': 1}
+
+
+def test_resume_complete_stream(emulator, stc, remote, tmpdir):
+    path = str(tmpdir.join('out.pcap'))
+    etag = '"%s"' % hashlib.md5(CONTENT).hexdigest()
+    write_state(path, {'mode': 'stream', 'size': len(CONTENT),
+                       'validator': etag}, CONTENT)
+    download(stc, remote, path, parallel=1)
+    assert read(path) == CONTENT
+
+
+def test_no_resume(emulator, stc, remote, tmpdir):
+    path = str(tmpdir.join('out.pcap'))
+    etag = '"%s"' % hashlib.md5(CONTENT).hexdigest()
+    write_state(path, {'mode': 'stream', 'size': len(CONTENT),
+                       'validator': etag}, b'x' * 1000)
+    stc._rest.download_file('files', remote, path, parallel=1, resume=False)
+    assert read(path) == CONTENT
+
+
+def test_missing_file(stc, tmpdir):
+    with pytest.raises(resthttp.RestHttpError):
+        download(stc, 'nosuch.pcap', str(tmpdir.join('out.pcap')))
+
+
+def test_no_resume_without_validator(monkeypatch, emulator, stc, remote,
+                                     tmpdir):
+    path = str(tmpdir.join('out.pcap'))
+    rest = stc._rest
+    monkeypatch.setattr(rest, '_probe_download',
+                        lambda *args: (len(CONTENT), None))
+    write_state(path, {'mode': 'stream', 'size': len(CONTENT),
+                       'validator': None}, b'x' * 1000)
+    download(stc, remote, path, parallel=1)
+    assert read(path) == CONTENT
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+from stcrestclient import helpcache, stcemulator
+
+
+def fetcher(calls, fail=()):
+    """Return fetch function for warm that answers from the emulator's help
+    text, and records the subjects asked for.
+
+    """
+    def fetch(subject, args):
+        calls.append(subject)
+        if subject in fail:
+            raise RuntimeError('no help')
+        if subject == 'list':
+            commands = args[0] == 'commands'
+            return ' '.join(sorted(t for t in stcemulator.HELP_TYPES
+                                   if t.endswith('Command') == commands))
+        return stcemulator._help_text(subject)
+    return fetch
+
+
+def test_parse_help():
+    meta = helpcache.parse_help(stcemulator._help_text('Port'))
+    assert meta['name'] == 'Port'
+    assert meta['parents'] == ['Project']
+    assert meta['relations'] == ['AffiliationPort']
+    assert 'Port' in helpcache.parse_help(
+        stcemulator._help_text('Project'))['children']
+    assert meta['attributes']['name'] == {'name': 'Name', 'type': 'string',
+                                          'readonly': False}
+    assert meta['description'] == 'Test port.'
+    meta = helpcache.parse_help(stcemulator._help_text('Sequencer'))
+    assert meta['attributes']['state'] == {'name': 'State', 'type': 'enum',
+                                           'readonly': True}
+
+
+def test_parse_list():
+    assert helpcache.parse_list('Port  Project\n') == ['Port', 'Project']
+    assert helpcache.parse_list('Port - a port\nProject - the project\n') == [
+        'Port', 'Project']
+
+
+def test_shared_by_version(tmpdir):
+    directory = str(tmpdir)
+    cache = helpcache.HelpCache('4.90', directory)
+    assert cache.get('port') is None
+    cache.put('port', 'Port:\nParents: Project\n')
+    cache.put('list', 'Port Project', ('configTypes', '*'))
+
+    other = helpcache.HelpCache('4.90', directory)
+    assert other.get('port') == 'Port:\nParents: Project\n'
+    assert other.metadata('port')['parents'] == ['Project']
+    assert other.names('configTypes') == ['Port', 'Project']
+    assert other.names('commands') is None
+    assert helpcache.HelpCache('5.00', directory).get('port') is None
+
+    other.clear()
+    assert other.get('port') is None
+    assert helpcache.HelpCache('4.90', directory).get('port') is None
+
+
+def test_unwritable_directory(tmpdir):
+    # The cache directory can not be created under a regular file.
+    blocker = tmpdir.join('file')
+    blocker.write('')
+    cache = helpcache.HelpCache('4.90', str(blocker))
+    cache.put('port', 'Port:')
+    assert cache.get('port') == 'Port:'
+    assert not os.path.exists(cache.path)
+
+
+def test_warm(tmpdir):
+    cache = helpcache.HelpCache('4.90', str(tmpdir))
+    calls = []
+    fetched = cache.warm(fetcher(calls), parallel=4)
+    assert fetched == len(calls) == len(stcemulator.HELP_TYPES) + 2
+    assert cache.is_complete()
+    assert cache.metadata('Port')['name'] == 'Port'
+    assert helpcache.HelpCache('4.90', str(tmpdir)).warm(fetcher(calls)) == 0
+
+
+def test_warm_error(tmpdir):
+    cache = helpcache.HelpCache('4.90', str(tmpdir))
+    calls = []
+    with pytest.raises(RuntimeError) as e:
+        cache.warm(fetcher(calls, fail=('Port',)))
+    assert 'Port' in str(e.value)
+    assert not cache.is_complete()
+    # Only the type that failed is fetched again.
+    del calls[:]
+    assert cache.warm(fetcher(calls)) == 1
+    assert calls == ['Port']
+    assert cache.is_complete()
+
+
+def test_help_cached(emulator, stc, tmpdir):
+    stc.set_help_cache(True, str(tmpdir))
+    emulator.reset_stats()
+    text = stc.help('port')
+    assert stc.help('port') == text
+    assert emulator.stats().get('GET help', 0) == 1
+    assert stc.help_metadata('port')['name'] == 'Port'
+
+
+def test_help_unwritable_cache(emulator, stc, tmpdir):
+    blocker = tmpdir.join('file')
+    blocker.write('')
+    stc.set_help_cache(True, str(blocker))
+    assert stc.help('port').startswith('Port:')
+    emulator.reset_stats()
+    stc.help('port')
+    assert emulator.stats().get('GET help', 0) == 0
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from stcrestclient import jsonstream
+
+
+def _chunks(text, *cuts):
+    bounds = (0,) + cuts + (len(text),)
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def _embedded_values(chunks):
+    stream = jsonstream.JsonStream(chunks)
+    assert stream.find('PropertyValues')
+    return ''.join(stream.iter_string())
+
+
+EMBEDDED = json.dumps({'h1': {'Name': u'x\xe9y', 'Path': 'C:\\users\\me',
+                              'Emoji': u'\U0001f600'}})
+DOCUMENT = json.dumps({'State': 'COMPLETED', 'PropertyValues': EMBEDDED})
+
+
+@pytest.mark.parametrize('cut', range(1, len(DOCUMENT)))
+def test_iter_string_every_cut(cut):
+    assert _embedded_values(_chunks(DOCUMENT, cut)) == EMBEDDED
+
+
+def test_iter_string_one_char_chunks():
+    assert _embedded_values(list(DOCUMENT)) == EMBEDDED
+
+
+def test_iter_string_escaped_backslash_before_u():
+    text = json.dumps({'PropertyValues': '\\\\u00e9 \\u \\\\\\u00e9'})
+    expected = json.loads(text)['PropertyValues']
+    for cut in range(1, len(text)):
+        for cut2 in range(cut + 1, len(text)):
+            assert _embedded_values(_chunks(text, cut, cut2)) == expected
+
+
+@pytest.mark.parametrize('cut', range(1, 60))
+def test_items_every_cut(cut):
+    doc = {'objects': [{'handle': 'port%d' % i, 'Name': u'p\xe9 "%d"' % i}
+                       for i in range(5)]}
+    text = json.dumps(doc)
+    items = list(jsonstream.JsonStream(_chunks(text, cut)).items())
+    assert items == doc['objects']
+
+
+def test_kvitems():
+    text = json.dumps({'h1': {'a': 1}, 'h2': {'a': 2}})
+    stream = jsonstream.JsonStream(_chunks(text, 7, 13))
+    assert list(stream.kvitems()) == [('h1', {'a': 1}), ('h2', {'a': 2})]
+
+
+def test_unterminated_string():
+    stream = jsonstream.JsonStream(['{"PropertyValues": "abc'])
+    assert stream.find('PropertyValues')
+    with pytest.raises(ValueError):
+        list(stream.iter_string())
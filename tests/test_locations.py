@@ -0,0 +1,76 @@
+import pytest
+
+from stcrestclient import locations, resthttp, stcemulator, stchttp
+
+
+# Locations only read the objects, so tests share one session.
+@pytest.fixture(scope='module')
+def stc():
+    with stcemulator.StcEmulator('127.0.0.1') as emu:
+        client = stchttp.StcHttp('127.0.0.1', emu.port)
+        client.new_session('tester', 'test')
+        yield client
+        client.end_session(timeout=0)
+
+
+@pytest.fixture(scope='module')
+def tree(stc):
+    for name in ('Port A', 'Port B', 'Lab'):
+        stc.create('port', 'project1', Name=name)
+    for name in ('dev "1"', 'dev 2'):
+        stc.create('EmulatedDevice', 'project1', Name=name)
+    for port in ('port1', 'port1', 'port2'):
+        stc.create('StreamBlock', port)
+    return stc.snapshot()
+
+
+@pytest.mark.parametrize('location, expected', [
+    ('port', 'port1 port2 port3'),
+    ('/port', 'port1 port2 port3'),
+    ('port1', 'port1'),
+    ('port[@name ^= port]', 'port1 port2'),
+    ('port[name *= "T A"]', 'port1'),
+    ('port[@name ~= a]', 'port1 port3'),
+    ("port[@name != 'lab']", 'port1 port2'),
+    ('port[@name="port b"]/streamblock', 'streamblock3'),
+    ('port/streamblock[0]', 'streamblock1 streamblock3'),
+    ('port[1]', 'port2'),
+    ('port[@name ^= port][1]', 'port2'),
+    ('//streamblock', 'streamblock1 streamblock2 streamblock3'),
+    ('*/streamblock', 'streamblock1 streamblock2 streamblock3'),
+    ('emulateddevice[@name = \'dev "1"\']', 'emulateddevice1'),
+    ('xpath:port[2] emulateddevice port3', 'port3 emulateddevice1 '
+     'emulateddevice2'),
+    ('port[@name=none]', ''),
+])
+def test_locate(stc, tree, location, expected):
+    handles = tree.locate(location)
+    assert handles == expected.split()
+    # The server finds the same objects.
+    objs = stc.bulkget(location)['objects']
+    assert [o['handle'] for o in objs] == handles
+
+
+@pytest.mark.parametrize('location', [
+    '', 'port[@name', 'port[@name ?= a]', 'port/[0]', 'po rt[',
+])
+def test_invalid(stc, tree, location):
+    with pytest.raises(ValueError):
+        locations.compile(location)
+    if location.strip():
+        with pytest.raises(resthttp.RestHttpError) as e:
+            stc.bulkget(location)
+        assert e.value.http_status == 400
+
+
+def test_compile_cached():
+    loc = locations.compile('port[@name ^= port]/streamblock')
+    assert locations.compile('port[@name ^= port]/streamblock') is loc
+    assert repr(loc) == '<Location port[@name ^= port]/streamblock>'
+
+
+def test_expand(tree):
+    assert locations.expand(tree, '//streamblock', 2) == [
+        'streamblock1 streamblock2', 'streamblock3']
+    assert locations.expand(tree, 'port') == ['port1 port2 port3']
+    assert locations.expand(tree, 'nosuch') == []
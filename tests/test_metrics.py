@@ -0,0 +1,112 @@
+import pytest
+
+from stcrestclient import metrics
+
+
+def histogram(values, buckets=(1.0, 2.0, 4.0)):
+    h = metrics.Histogram(buckets)
+    for v in values:
+        h.observe(v)
+    return h
+
+
+def test_buckets():
+    h = histogram([0.5, 1.0, 1.5, 3.0, 10.0])
+    # A value equal to a bound is counted in that bound's bucket.
+    assert h.counts == [2, 1, 1, 1]
+    assert h.cumulative() == [(1.0, 2), (2.0, 3), (4.0, 4),
+                              (float('inf'), 5)]
+    assert (h.count, h.sum, h.max) == (5, 16.0, 10.0)
+
+
+@pytest.mark.parametrize('q, expected', [
+    (10, 0.25), (40, 1.0), (50, 1.5), (80, 4.0), (100, 10.0),
+])
+def test_percentile(q, expected):
+    h = histogram([0.5, 1.0, 1.5, 3.0, 10.0])
+    assert h.percentile(q) == pytest.approx(expected)
+
+
+def test_percentile_not_above_max():
+    h = histogram([0.3])
+    assert h.percentile(99) == 0.3
+    assert h.summary() == {'count': 1, 'mean': 0.3, 'max': 0.3, 'p50': 0.3,
+                           'p90': 0.3, 'p99': 0.3}
+
+
+def test_empty():
+    h = histogram([])
+    assert h.percentile(50) is None
+    assert h.summary() == {'count': 0}
+
+
+def finish(m, method, container, status, ttfb=0.0, request_bytes=0,
+           response_bytes=0):
+    rec = m.start(method, container)
+    rec.ttfb = ttfb
+    rec.request_bytes = request_bytes
+    rec.response_bytes = response_bytes
+    rec.status = status
+    m.finish(rec)
+
+
+def test_stats():
+    m = metrics.RequestMetrics()
+    finish(m, 'GET', 'objects', 200, ttfb=0.002, response_bytes=100)
+    finish(m, 'GET', 'objects', 404, ttfb=0.004, response_bytes=50)
+    finish(m, 'GET', 'objects', None)
+    finish(m, 'PUT', 'objects', 204, request_bytes=30)
+    stats = m.stats()
+    assert sorted(stats) == ['GET objects', 'PUT objects']
+    get = stats['GET objects']
+    assert (get['requests'], get['errors']) == (3, 1)
+    assert get['statuses'] == {200: 1, 404: 1}
+    assert (get['request_bytes'], get['response_bytes']) == (0, 150)
+    assert get['ttfb']['count'] == 3
+    assert get['ttfb']['max'] == 0.004
+    assert stats['PUT objects']['request_bytes'] == 30
+    m.reset()
+    assert m.stats() == {}
+
+
+def test_prometheus():
+    m = metrics.RequestMetrics(buckets=(0.01, 1.0))
+    finish(m, 'GET', 'objects', 200, ttfb=0.005, response_bytes=100)
+    finish(m, 'GET', 'objects', None, ttfb=0.5)
+    finish(m, 'POST', 'say "hi"', 201, request_bytes=7)
+    text = m.prometheus('p', {'retries': 2})
+    lines = text.splitlines()
+    assert text.endswith('\n')
+
+    labels = 'method="GET",container="objects"'
+    assert '# TYPE p_ttfb_seconds histogram' in lines
+    assert '# TYPE p_request_duration_seconds histogram' in lines
+    assert 'p_ttfb_seconds_bucket{%s,le="0.01"} 1' % labels in lines
+    assert 'p_ttfb_seconds_bucket{%s,le="1.0"} 2' % labels in lines
+    assert 'p_ttfb_seconds_bucket{%s,le="+Inf"} 2' % labels in lines
+    assert 'p_ttfb_seconds_sum{%s} 0.505' % labels in lines
+    assert 'p_ttfb_seconds_count{%s} 2' % labels in lines
+    assert 'p_response_bytes_total{%s} 100' % labels in lines
+    assert 'p_responses_total{%s,status="200"} 1' % labels in lines
+    assert 'p_responses_total{%s,status="error"} 1' % labels in lines
+    assert ('p_request_bytes_total{method="POST",container="say \\"hi\\""} 7'
+            in lines)
+    assert lines[-2:] == ['# TYPE p_retries_total counter',
+                          'p_retries_total 2']
+
+
+def test_client_metrics(emulator, stc):
+    stc.reset_stats()
+    stc.get('project1', 'Name')
+    stc.get('project1', 'Name')
+    with pytest.raises(Exception):
+        stc.get('nosuch1', 'Name')
+    get = stc.stats()['GET objects']
+    assert get['requests'] == 3
+    assert get['statuses'] == {200: 2, 404: 1}
+    assert get['response_bytes'] > 0
+    assert get['total']['count'] == 3
+    text = stc.prometheus_metrics()
+    assert ('stcrestclient_responses_total{method="GET",container="objects",'
+            'status="200"} 2') in text
+    assert 'stcrestclient_connections_opened_total' in text
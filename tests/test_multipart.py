@@ -0,0 +1,143 @@
+import threading
+
+import pytest
+
+from stcrestclient import multipart
+
+
+@pytest.fixture
+def local(tmpdir):
+    """Return function that writes a local file and returns its path."""
+    def write(name, content):
+        path = str(tmpdir.join(name))
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+    return write
+
+
+def expected(parts, boundary='b'):
+    body = b''
+    for field, name, content in parts:
+        body += (b'--' + boundary.encode() + b'\r\n'
+                 b'Content-Disposition: form-data; name="' + field.encode() +
+                 b'"; filename="' + name.encode() + b'"\r\n'
+                 b'Content-Type: application/octet-stream\r\n\r\n' +
+                 content + b'\r\n')
+    return body + b'--' + boundary.encode() + b'--\r\n'
+
+
+def test_body(local):
+    big = bytes(bytearray(i % 251 for i in range(3 * multipart.CHUNK_SIZE)))
+    opened = open(local('c.txt', b'xxcontent'), 'rb')
+    opened.seek(2)
+    files = [('file', ('a.bin', local('a.bin', big), None)),
+             ('file', ('empty.txt', local('empty.txt', b''), None)),
+             ('file', ('c.txt', opened, None))]
+    body = multipart.MultipartEncoder(files, boundary='b')
+    want = expected([('file', 'a.bin', big), ('file', 'empty.txt', b''),
+                     ('file', 'c.txt', b'content')])
+    assert len(body) == len(want)
+
+    # Read in small pieces, the body is the same as read at once.
+    pieces = []
+    while True:
+        piece = body.read(1000)
+        if not piece:
+            break
+        assert len(piece) <= 1000
+        pieces.append(piece)
+    assert b''.join(pieces) == want
+    assert body.tell() == len(want)
+    assert [s['name'] for s in body.file_stats()] == [
+        'a.bin', 'empty.txt', 'c.txt']
+
+    body.seek(0)
+    assert b''.join(body) == want
+    # Files given open are not closed.
+    assert not opened.closed
+    opened.close()
+
+
+def test_progress(local):
+    calls = []
+    content = b'x' * (multipart.CHUNK_SIZE + 10)
+    body = multipart.MultipartEncoder(
+        [('file', ('a.bin', local('a.bin', content), None))],
+        lambda name, sent, size, rate: calls.append((name, sent, size)))
+    body.read()
+    assert calls[-1] == ('a.bin', len(content), len(content))
+    assert len(calls) == 2
+
+
+def test_names_quoted(local):
+    path = local('a.txt', b'a')
+    body = multipart.MultipartEncoder([('file', ('say "hi".txt', path,
+                                                 'text/plain'))])
+    assert b'filename="say %22hi%22.txt"' in body.read()
+    for name in ('a\r\nX-Injected: 1', 'a\nb', 'a\rb'):
+        with pytest.raises(ValueError):
+            multipart.MultipartEncoder([('file', (name, path, None))])
+    with pytest.raises(ValueError):
+        multipart.MultipartEncoder([('fi\nle', ('a.txt', path, None))])
+
+
+def test_changed_size(local):
+    path = local('a.txt', b'abc')
+    body = multipart.MultipartEncoder([('file', ('a.txt', path, None))])
+    local('a.txt', b'a')
+    with pytest.raises(IOError):
+        body.read()
+
+
+def test_open_file_limit(local):
+    limit = threading.BoundedSemaphore(1)
+    content = b'x' * (3 * multipart.CHUNK_SIZE)
+    first = multipart.MultipartEncoder(
+        [('file', ('a.bin', local('a.bin', content), None))],
+        open_files=limit)
+    second = multipart.MultipartEncoder(
+        [('file', ('b.bin', local('b.bin', content), None))],
+        open_files=limit)
+    first.read(multipart.CHUNK_SIZE)
+    # The first encoder has its file open, so the second must wait.
+    assert not limit.acquire(False)
+
+    done = threading.Event()
+
+    def read_second():
+        second.read()
+        done.set()
+
+    t = threading.Thread(target=read_second)
+    t.daemon = True
+    t.start()
+    assert not done.wait(0.1)
+    first.read()
+    assert done.wait(5)
+    t.join()
+    # Both files are closed, and the limit released.
+    assert limit.acquire(False)
+    limit.release()
+
+
+def test_close_releases_limit(local):
+    limit = threading.BoundedSemaphore(1)
+    content = b'x' * (2 * multipart.CHUNK_SIZE)
+    body = multipart.MultipartEncoder(
+        [('file', ('a.bin', local('a.bin', content), None))],
+        open_files=limit)
+    body.read(100)
+    body.close()
+    assert limit.acquire(False)
+    limit.release()
+
+
+def test_set_max_open_files(monkeypatch):
+    monkeypatch.setattr(multipart, '_open_files', multipart._open_files)
+    multipart.set_max_open_files(2)
+    body = multipart.MultipartEncoder([])
+    assert body._limit is multipart._open_files
+    for _ in range(2):
+        assert multipart._open_files.acquire(False)
+    assert not multipart._open_files.acquire(False)
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from stcrestclient import pipeline
+
+
+def test_pipeline_calls(stc):
+    ports = [stc.create('port', 'project1') for _ in range(10)]
+    with stc.pipeline(max_inflight=4) as p:
+        for i, port in enumerate(ports):
+            p.config(port, Name='port %d' % i)
+        dev = p.create('EmulatedDevice', 'project1')
+        p.config(dev, Name='mydev')
+        name = p.get(dev, 'Name')
+    assert name.result() == 'mydev'
+    assert [stc.get(h, 'Name') for h in ports] == [
+        'port %d' % i for i in range(10)]
+
+
+@pytest.mark.parametrize('coalesce', [False, True])
+def test_error_reported_against_call(stc, coalesce):
+    stc.set_coalescing(coalesce, max_delay=None)
+    stc.create('port', 'project1')
+    p = stc.pipeline()
+    bad = p.config('nosuch1', Name='x')
+    p.config('port1', Name='ok')
+    p.get('port1', 'Name')
+    with pytest.raises(pipeline.PipelineError) as e:
+        p.close()
+    assert [desc for desc, _ in e.value.errors] == ['config nosuch1']
+    assert bad.exception() is not None
+    assert stc.get('port1', 'Name') == 'ok'
+
+
+def test_failed_dependency(stc):
+    with pytest.raises(pipeline.PipelineError) as e:
+        with stc.pipeline() as p:
+            h = p.create('port', 'nosuch1')
+            p.config(h, Name='x')
+    descs = [desc for desc, _ in e.value.errors]
+    assert descs == ['create port', 'config result of create port']
+
+
+class _Recorder(object):
+
+    """Stands in for StcHttp, recording the order calls start and end.
+    Creates wait until two are sent at once.
+
+    """
+
+    def __init__(self):
+        self.events = []
+        self.together = threading.Barrier(2, timeout=5)
+
+    def create(self, object_type, under, attrs):
+        self.events.append('start ' + object_type)
+        self.together.wait()
+        self.events.append('end ' + object_type)
+        return object_type
+
+    def config_now(self, handle, attrs):
+        self.events.append('config ' + handle)
+
+
+def test_sibling_creates_concurrent():
+    stc = _Recorder()
+    with pipeline.Pipeline(stc, max_inflight=4) as p:
+        p.config('project1', {'Name': 'x'})
+        a = p.create('port', 'project1')
+        b = p.create('emulateddevice', 'project1')
+        p.config('project1', {'Name': 'y'})
+    assert (a.result(), b.result()) == ('port', 'emulateddevice')
+    assert stc.events[0] == 'config project1'
+    assert sorted(stc.events[1:3]) == ['start emulateddevice', 'start port']
+    assert stc.events[-1] == 'config project1'
@@ -0,0 +1,87 @@
+import threading
+
+from stcrestclient import stchttp
+
+
+def client(emulator, **kwargs):
+    stc = stchttp.StcHttp('127.0.0.1', emulator.port, **kwargs)
+    stc.new_session('tester', 'test')
+    return stc
+
+
+def test_connection_reused(emulator):
+    stc = client(emulator)
+    start = stc.conn_stats()
+    for _ in range(10):
+        stc.get('project1', 'Name')
+    stats = stc.conn_stats()
+    assert stats['requests'] - start['requests'] == 10
+    assert stats['opened'] == 1
+    assert stats['reused'] == stats['requests'] - 1
+    stc.end_session(timeout=0)
+
+
+def test_max_requests(emulator):
+    stc = client(emulator, pool_max_requests=3)
+    for _ in range(8):
+        stc.get('project1', 'Name')
+    stats = stc.conn_stats()
+    assert stats['requests'] >= 8
+    # Each connection is used for 3 requests, then another is opened.
+    assert stats['opened'] == (stats['requests'] + 2) // 3
+    stc.end_session(timeout=0)
+
+
+def test_concurrent_calls(emulator):
+    stc = client(emulator, pool_size=4)
+    start = stc.conn_stats()
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(10):
+                stc.get('project1', 'Name')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    stats = stc.conn_stats()
+    assert stats['requests'] - start['requests'] == 40
+    assert 1 <= stats['opened'] <= 4
+    assert stats['opened'] + stats['reused'] == stats['requests']
+    stc.end_session(timeout=0)
+
+
+def test_shared_pool(emulator):
+    first = client(emulator, share_pool=True)
+    first.get('project1', 'Name')
+    second = stchttp.StcHttp('127.0.0.1', emulator.port, share_pool=True)
+    second.join_session(first.session_id())
+    for _ in range(5):
+        second.get('project1', 'Name')
+    # The second object only uses the connection the first one opened, and
+    # counts only its own requests.
+    stats = second.conn_stats()
+    assert stats['opened'] == 0
+    assert stats['reused'] == stats['requests'] >= 5
+    assert first.conn_stats()['opened'] == 1
+
+    # Closing a shared pool leaves its connections open for the others.
+    second._rest.close()
+    first.get('project1', 'Name')
+    assert first.conn_stats()['opened'] == 1
+    first.end_session(timeout=0)
+
+
+def test_pools_not_shared(emulator):
+    first = client(emulator)
+    second = stchttp.StcHttp('127.0.0.1', emulator.port)
+    second.join_session(first.session_id())
+    second.get('project1', 'Name')
+    assert second.conn_stats()['opened'] == 1
+    first.end_session(timeout=0)
@@ -0,0 +1,67 @@
+import socket
+import time
+
+import pytest
+
+from stcrestclient import resthttp, stcemulator, stchttp
+
+
+@pytest.fixture(scope='module')
+def dead_port():
+    """Return port of an emulator that has been stopped."""
+    with stcemulator.StcEmulator('127.0.0.1') as emu:
+        port = emu.port
+    return port
+
+
+@pytest.fixture
+def silent():
+    """Return ports of listening sockets that never respond."""
+    socks = []
+    for _ in range(4):
+        s = socket.socket()
+        s.bind(('127.0.0.1', 0))
+        s.listen(8)
+        socks.append(s)
+    yield [s.getsockname()[1] for s in socks]
+    for s in socks:
+        s.close()
+
+
+def test_probe_servers(emulator, stc, dead_port):
+    live = '127.0.0.1:%d' % emulator.port
+    dead = '127.0.0.1:%d' % dead_port
+    results = stchttp.probe_servers([live, dead], timeout=2)
+    assert results == {live: [stc.session_id()], dead: None}
+
+
+def test_probe_default_port(emulator, monkeypatch):
+    assert stchttp.probe_servers(['127.0.0.1'], port=emulator.port) == {
+        '127.0.0.1': []}
+    monkeypatch.setenv('STC_SERVER_PORT', str(emulator.port))
+    assert stchttp.probe_servers(['127.0.0.1']) == {'127.0.0.1': []}
+
+
+def test_probe_concurrent(silent):
+    servers = ['127.0.0.1:%d' % port for port in silent]
+    start = time.time()
+    results = stchttp.probe_servers(servers, timeout=0.5, parallel=4)
+    # Servers are checked at once, so the wait is not one timeout each.
+    assert time.time() - start < 1.5
+    assert results == dict.fromkeys(servers)
+
+
+def test_lazy(emulator, dead_port):
+    with pytest.raises(RuntimeError):
+        stchttp.StcHttp('127.0.0.1', dead_port)
+    stc = stchttp.StcHttp('127.0.0.1', dead_port, lazy=True)
+    with pytest.raises(resthttp.ConnectionError):
+        stc.new_session('tester', 'test')
+    assert not stc.started()
+
+    emulator.reset_stats()
+    stc = stchttp.StcHttp('127.0.0.1', emulator.port, lazy=True)
+    assert emulator.stats() == {}
+    stc.new_session('tester', 'test')
+    assert stc.started()
+    stc.end_session(timeout=0)
@@ -0,0 +1,50 @@
+import pytest
+
+from stcrestclient import results
+
+
+@pytest.fixture
+def dataset(stc):
+    stc.perform('DeviceCreateCommand', ParentList='project1',
+                CreateCount=25)
+    rsp = stc.perform('ResultsSubscribeCommand', Parent='project1',
+                      ConfigType='EmulatedDevice',
+                      ResultType='AnalyzerPortResults', RecordsPerPage=10)
+    return rsp['ReturnedDataSet']
+
+
+def test_pages(emulator, stc, dataset):
+    reader = stc.result_reader(dataset, ['TotalFrameCount', 'L1BitRate'])
+    assert reader.page_count() == 3
+    emulator.reset_stats()
+    pages = list(reader)
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert emulator.stats().get('GET bulk/objects') == 3
+    page = pages[0]
+    assert page.names == ['TotalFrameCount', 'L1BitRate']
+    assert page['TotalFrameCount'].kind == 'int'
+    assert page['L1BitRate'].kind == 'float'
+    assert page.keys[0] == 'analyzerportresults1'
+
+
+def test_read_all_columns(stc, dataset):
+    table = stc.result_reader(dataset, records_per_page=7).read_all()
+    assert len(table) == 25
+    assert 'TotalOctetCount' in table
+    assert 'parent' not in table
+    assert 'children' not in table
+    assert not [n for n in table.names if n.lower().endswith(
+        ('-targets', '-sources'))]
+
+
+def test_requested_parent_kept(stc, dataset):
+    table = stc.result_reader(dataset, 'parent TotalFrameCount').read_page(1)
+    assert list(table['parent'])[:2] == ['emulateddevice1',
+                                         'emulateddevice2']
+
+
+def test_without_bulk(stc, dataset):
+    reader = results.ResultReader(stc, dataset, ['TotalFrameCount'],
+                                  bulk=False)
+    bulk = stc.result_reader(dataset, ['TotalFrameCount'])
+    assert reader.read_page(2).keys == bulk.read_page(2).keys
@@ -0,0 +1,160 @@
+import csv
+import json
+import os
+
+import pytest
+
+from stcrestclient import columns, resultsink
+
+
+def table(rows, names=()):
+    t = columns.ColumnTable(names)
+    for key, values in rows:
+        t.append(key, values, True)
+    return t
+
+
+def read_csv(path):
+    with open(path) as f:
+        return list(csv.reader(f))
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_csv(tmpdir):
+    path = str(tmpdir.join('soak.csv'))
+    with resultsink.open_sink(path) as sink:
+        sink.write(table([('r1', {'Frames': '10', 'Rate': '1.5'}),
+                          ('r2', {'Frames': '20', 'Rate': None})]), 100.0)
+        sink.flush()
+        sink.write(table([('r1', {'Frames': '11', 'Rate': '2.5'})]), 101.0)
+    assert sink.rows == 3
+    assert read_csv(path) == [
+        ['handle', 'timestamp', 'Frames', 'Rate'],
+        ['r1', '100.0', '10', '1.5'],
+        ['r2', '100.0', '20', ''],
+        ['r1', '101.0', '11', '2.5']]
+    assert sink.writer.paths == [path]
+
+
+def test_csv_new_part(tmpdir):
+    path = str(tmpdir.join('soak.csv'))
+    with resultsink.open_sink(path, row_group_rows=1) as sink:
+        sink.write(table([('r1', {'Frames': '10'})]))
+        sink.write(table([('r2', {'Frames': '20', 'Errors': '1'})]))
+    part = str(tmpdir.join('soak.1.csv'))
+    assert sink.writer.paths == [path, part]
+    assert read_csv(path) == [['handle', 'Frames'], ['r1', '10']]
+    assert read_csv(part) == [['handle', 'Frames', 'Errors'],
+                              ['r2', '20', '1']]
+
+
+def test_csv_append(tmpdir):
+    path = str(tmpdir.join('soak.csv'))
+    rows = table([('r1', {'Frames': '10'})])
+    with resultsink.open_sink(path) as sink:
+        sink.write(rows)
+    with resultsink.open_sink(path, append=True) as sink:
+        sink.write(rows)
+    assert read_csv(path) == [['handle', 'Frames'], ['r1', '10'],
+                              ['r1', '10']]
+    with resultsink.open_sink(path, append=True) as sink:
+        sink.write(table([('r1', {'Rate': '1.5'})]))
+    assert len(read_csv(path)) == 3
+    assert read_csv(str(tmpdir.join('soak.1.csv'))) == [
+        ['handle', 'Frames', 'Rate'], ['r1', '', '1.5']]
+
+
+def test_jsonl(tmpdir):
+    path = str(tmpdir.join('soak.jsonl'))
+    with resultsink.open_sink(path, row_group_rows=1) as sink:
+        sink.write(table([('r1', {'Frames': '10'})]))
+        sink.write(table([('r2', {'Frames': '1.5', 'Errors': None})]))
+        sink.write(table([('r3', {'Errors': 'none'})]))
+    assert read_jsonl(path) == [
+        {'handle': 'r1', 'Frames': 10},
+        {'handle': 'r2', 'Frames': 1.5, 'Errors': None},
+        {'handle': 'r3', 'Frames': None, 'Errors': 'none'}]
+    assert sink.writer.paths == [path]
+
+
+def test_unknown_extension(tmpdir):
+    with pytest.raises(ValueError):
+        resultsink.open_sink(str(tmpdir.join('soak.txt')))
+
+
+def test_sample(emulator, stc, tmpdir):
+    stc.perform('DeviceCreateCommand', ParentList='project1',
+                CreateCount=5)
+    rds = stc.perform('ResultsSubscribeCommand', Parent='project1',
+                      ConfigType='EmulatedDevice',
+                      ResultType='AnalyzerPortResults',
+                      RecordsPerPage=2)['ReturnedDataSet']
+    reader = stc.result_reader(rds, ['TotalFrameCount', 'L1BitRate'])
+    path = str(tmpdir.join('soak.jsonl'))
+    emulator.reset_stats()
+    with resultsink.open_sink(path) as sink:
+        assert sink.sample(reader, 0.01, count=2) == 2
+    assert sink.samples == 2
+    assert emulator.stats()['GET bulk/objects'] == 6
+    rows = read_jsonl(path)
+    assert len(rows) == 10
+    assert list(rows[0]) == ['handle', 'timestamp', 'TotalFrameCount',
+                             'L1BitRate']
+    assert rows[0]['handle'] == 'analyzerportresults1'
+    assert len(set(r['timestamp'] for r in rows)) == 2
+    assert rows[5]['timestamp'] - rows[0]['timestamp'] >= 0.01
+
+
+def test_sample_callable(tmpdir):
+    path = str(tmpdir.join('soak.csv'))
+    calls = []
+
+    def source():
+        calls.append(1)
+        return table([('r1', {'Frames': str(len(calls))})])
+
+    with resultsink.open_sink(path) as sink:
+        assert sink.sample(source, 0, duration=0) == 0
+        assert sink.sample(source, 0, count=3) == 3
+    assert [r[2] for r in read_csv(path)[1:]] == ['1', '2', '3']
+
+
+def test_parquet(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmpdir.join('soak.parquet'))
+    with resultsink.open_sink(path, row_group_rows=2) as sink:
+        sink.write(table([('r%d' % i, {'Frames': str(i), 'Rate': '1.5'})
+                          for i in range(5)]))
+        sink.write(table([('r5', {'Frames': '5', 'Rate': None})]))
+    f = pq.ParquetFile(path)
+    assert f.metadata.num_row_groups == 3
+    assert str(f.schema_arrow.field('Frames').type) == 'int64'
+    assert str(f.schema_arrow.field('Rate').type) == 'double'
+    t = f.read()
+    assert t.column('Frames').to_pylist() == list(range(6))
+    assert t.column('Rate').to_pylist() == [1.5] * 5 + [None]
+    assert t.column('handle').to_pylist()[-1] == 'r5'
+
+
+def test_parquet_new_parts(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmpdir.join('soak.parquet'))
+    with resultsink.open_sink(path, row_group_rows=1) as sink:
+        sink.write(table([('r1', {'Frames': '1'}),
+                          ('r2', {'Frames': '2.5'}),
+                          ('r3', {'Frames': 'n/a'})]))
+    part1 = str(tmpdir.join('soak.1.parquet'))
+    part2 = str(tmpdir.join('soak.2.parquet'))
+    assert sink.writer.paths == [path, part1, part2]
+    assert pq.read_table(path).column('Frames').to_pylist() == [1]
+    assert pq.read_table(part1).column('Frames').to_pylist() == [2.5]
+    assert pq.read_table(part2).column('Frames').to_pylist() == ['n/a']
+
+    with resultsink.open_sink(path, append=True) as sink:
+        sink.write(table([('r4', {'Frames': '4'})]))
+    assert sink.writer.paths == [str(tmpdir.join('soak.3.parquet'))]
+    assert os.path.exists(path)
@@ -0,0 +1,155 @@
+import time
+
+import pytest
+
+from stcrestclient import resthttp, stcemulator
+
+
+def fail_next(monkeypatch, emulator, count, status=503, container=None):
+    """Make the next count requests to container fail with status."""
+    dispatch = emulator.dispatch
+    failed = []
+
+    def flaky(req):
+        if len(failed) < count and container in (None, req.container):
+            failed.append(req.method)
+            raise stcemulator.EmulatorError(status, 'injected failure')
+        return dispatch(req)
+
+    monkeypatch.setattr(emulator, 'dispatch', flaky)
+    return failed
+
+
+@pytest.fixture
+def dead_url():
+    emu = stcemulator.StcEmulator('127.0.0.1')
+    emu.start()
+    url = emu.url
+    emu.stop()
+    return url
+
+
+def test_retry_delay():
+    policy = resthttp.RetryPolicy(max_retries=2, backoff=1.0, jitter=False)
+    assert policy.retry_delay('GET', 1, 0.0) == 1.0
+    assert policy.retry_delay('GET', 2, 0.0, 503) == 2.0
+    assert policy.retry_delay('GET', 3, 0.0, 503) is None
+    assert policy.retry_delay('GET', 1, 0.0, 400) is None
+    # POST may have been carried out, unless it was never sent.
+    assert policy.retry_delay('POST', 1, 0.0) is None
+    assert policy.retry_delay('POST', 1, 0.0, sent=False) == 1.0
+    assert policy.retry_delay('POST', 1, 0.0, 502) is None
+    assert policy.retry_delay('POST', 1, 0.0, 503) == 1.0
+    assert policy.retry_delay('GET', 1, 0.0, 429, retry_after=7) == 7
+    assert policy.retry_delay('GET', 1, 119.5, 503) is None
+
+
+def test_parse_retry_after():
+    parse = resthttp.RetryPolicy.parse_retry_after
+    assert parse('3') == 3.0
+    assert parse('-1') == 0.0
+    assert parse('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse('soon') is None
+    assert parse(None) is None
+
+
+def test_get_retried(monkeypatch, emulator, stc):
+    stc.set_retry_policy(resthttp.RetryPolicy(backoff=0.01, jitter=False))
+    failed = fail_next(monkeypatch, emulator, 2, container='objects')
+    assert stc.get('project1', 'name') == 'Project 1'
+    assert failed == ['GET', 'GET']
+    assert stc.conn_stats()['retries'] == 2
+
+
+def test_post_retried_only_if_not_processed(monkeypatch, emulator, stc):
+    stc.set_retry_policy(resthttp.RetryPolicy(backoff=0.01, jitter=False))
+    fail_next(monkeypatch, emulator, 1, 503, 'objects')
+    assert stc.create('port', 'project1') == 'port1'
+    assert stc.conn_stats()['retries'] == 1
+
+    failed = fail_next(monkeypatch, emulator, 1, 502, 'objects')
+    with pytest.raises(resthttp.RestHttpError):
+        stc.create('port', 'project1')
+    assert failed == ['POST']
+    assert stc.conn_stats()['retries'] == 1
+
+
+def test_retries_exhausted(monkeypatch, emulator, stc):
+    stc.set_retry_policy(resthttp.RetryPolicy(max_retries=2, backoff=0.01,
+                                              jitter=False))
+    failed = fail_next(monkeypatch, emulator, 10, container='objects')
+    with pytest.raises(resthttp.RestHttpError):
+        stc.get('project1', 'name')
+    assert len(failed) == 3
+
+
+def test_connection_refused_retried(dead_url):
+    rest = resthttp.RestHttp(dead_url, retry=resthttp.RetryPolicy(
+        max_retries=2, backoff=0.01, jitter=False))
+    with pytest.raises(resthttp.ConnectionError):
+        rest.post_request('objects', None, {'object_type': 'port'})
+    assert rest.conn_stats()['retries'] == 2
+
+
+def test_circuit_breaker():
+    breaker = resthttp.CircuitBreaker(failure_threshold=2,
+                                      reset_timeout=0.05)
+    assert not breaker.before_request()
+    breaker.record_failure()
+    breaker.record_status(200)
+    breaker.record_failure()
+    assert breaker.state() == breaker.CLOSED
+    breaker.record_status(503)
+    assert breaker.state() == breaker.OPEN
+    with pytest.raises(resthttp.CircuitOpenError):
+        breaker.before_request()
+    time.sleep(0.06)
+    assert breaker.before_request()
+    assert breaker.state() == breaker.HALF_OPEN
+    # Only one probe at a time.
+    with pytest.raises(resthttp.CircuitOpenError):
+        breaker.before_request()
+    breaker.release()
+    assert breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state() == breaker.OPEN
+    stats = breaker.stats()
+    assert stats['trips'] == 2
+    assert stats['rejected'] == 2
+    assert stats['retry_in'] > 0
+
+
+def test_circuit_opens_on_server_errors(monkeypatch, emulator):
+    breaker = resthttp.CircuitBreaker(failure_threshold=3,
+                                      reset_timeout=0.1)
+    rest = resthttp.RestHttp(emulator.url, circuit_breaker=breaker)
+    failed = fail_next(monkeypatch, emulator, 3)
+    for _ in range(3):
+        with pytest.raises(resthttp.RestHttpError):
+            rest.get_request('system')
+    assert breaker.state() == breaker.OPEN
+
+    # Rejected without a request to the server.
+    requests = rest.conn_stats()['requests']
+    with pytest.raises(resthttp.CircuitOpenError):
+        rest.get_request('system')
+    assert rest.conn_stats()['requests'] == requests
+    assert len(failed) == 3
+
+    time.sleep(0.11)
+    assert rest.get_request('system')[0] == 200
+    assert breaker.state() == breaker.CLOSED
+    rest.close()
+
+
+def test_circuit_opens_on_connection_errors(dead_url):
+    breaker = resthttp.CircuitBreaker(failure_threshold=2,
+                                      reset_timeout=60)
+    rest = resthttp.RestHttp(dead_url, circuit_breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(resthttp.ConnectionError) as e:
+            rest.get_request('system')
+        assert not isinstance(e.value, resthttp.CircuitOpenError)
+    with pytest.raises(resthttp.CircuitOpenError):
+        rest.get_request('system')
+    assert breaker.stats()['rejected'] == 1
@@ -0,0 +1,108 @@
+import pytest
+
+from stcrestclient import snapshot
+
+
+def tree():
+    """Return object dictionaries of a project, as bulkget returns them."""
+    return [{
+        'handle': 'project1', 'Name': 'Project 1', 'children': [
+            {'handle': 'port1', 'name': 'Port A', 'children': [
+                {'handle': 'streamblock1', 'Name': 'flow'},
+                {'handle': 'streamblock2', 'Name': 'Flow'}]},
+            {'handle': 'port2', 'Name': 'Port B',
+             'children': 'StreamBlock3 StreamBlock4'},
+            {'handle': 'emulateddevice1', 'Name': 'dev',
+             'AffiliationPort-targets': 'port1', 'children': [
+                 {'handle': 'ipv4if1', 'object_type': 'Ipv4If'}]},
+            {'handle': 'EmulatedDevice2', 'Name': 'dev',
+             'AffiliationPort-targets': 'port1 port9'},
+        ]}]
+
+
+@pytest.fixture
+def snap():
+    return snapshot.Snapshot(tree())
+
+
+def test_objects(snap):
+    assert len(snap) == 8
+    assert [o.handle for o in snap.roots] == ['project1']
+    assert 'PORT1' in snap and 'port9' not in snap
+    assert snap['Port1'].get('NAME') == 'Port A'
+    assert snap['ipv4if1'].type == 'ipv4if'
+    assert snap.get('nosuch1') is None
+    with pytest.raises(KeyError):
+        snap['nosuch1']
+    assert snap.parent('streamblock2') == 'port1'
+    assert snap.parent('project1') is None
+
+
+def test_by_type(snap):
+    assert snap.by_type('Port') == ['port1', 'port2']
+    assert snap.by_type('emulateddevice') == ['emulateddevice1',
+                                              'emulateddevice2']
+    assert snap.by_type('Ipv4If') == ['ipv4if1']
+    assert snap.by_type('bgprouterconfig') == []
+
+
+def test_by_name(snap):
+    assert snap.by_name('FLOW') == ['streamblock1', 'streamblock2']
+    assert snap.by_name('dev') == ['emulateddevice1', 'emulateddevice2']
+    assert snap.by_name('none') == []
+
+
+def test_children_and_descendants(snap):
+    assert snap.children('project1', 'port') == ['port1', 'port2']
+    # Children below the depth of the snapshot are known by handle only.
+    assert snap.children('port2') == ['streamblock3', 'streamblock4']
+    assert snap.descendants('project1', 'StreamBlock') == [
+        'streamblock1', 'streamblock2']
+    assert snap.descendants('project1')[:4] == [
+        'port1', 'streamblock1', 'streamblock2', 'port2']
+    assert snap.descendants('streamblock1') == []
+
+
+def test_related(snap):
+    assert snap.related('emulateddevice2', 'AffiliationPort-targets') == [
+        'port1', 'port9']
+    # Edges are added to the other side, for objects in the snapshot.
+    assert snap.related('port1', 'affiliationport-sources') == [
+        'emulateddevice1', 'emulateddevice2']
+    assert snap.related('port2', 'AffiliationPort-sources') == []
+
+
+def test_add_relations(snap):
+    snap.add_relations([{'handle': 'project1', 'children': [
+        {'handle': 'port2', 'AffiliationPort-sources': 'emulateddevice1'},
+        {'handle': 'emulateddevice1',
+         'AffiliationPort-targets': 'port1 port2'}]}])
+    assert snap.related('port2', 'AffiliationPort-sources') == [
+        'emulateddevice1']
+    assert snap.related('emulateddevice1', 'AffiliationPort-targets') == [
+        'port1', 'port2']
+    # An edge known from both sides is not repeated.
+    assert snap.related('port1', 'AffiliationPort-sources') == [
+        'emulateddevice1', 'emulateddevice2']
+
+
+def test_find(snap):
+    assert snap.find('streamblock', under='port1', name='flow') == [
+        'streamblock1', 'streamblock2']
+    assert snap.find('streamblock', under=['port2']) == []
+    assert snap.find(name='dev') == ['emulateddevice1', 'emulateddevice2']
+    assert snap.find('emulateddevice', under='project1 port1') == [
+        'emulateddevice1', 'emulateddevice2']
+
+
+def test_from_server(emulator, stc):
+    port = stc.create('port', 'project1', Name='Port A')
+    dev = stc.create('EmulatedDevice', 'project1', Name='dev')
+    stc.config(dev, {'AffiliationPort-targets': port})
+    stc.create('StreamBlock', port)
+    snap = stc.snapshot(relations=['AffiliationPort-sources'])
+    assert snap.by_type('port') == [port]
+    assert snap.by_name('port a') == [port]
+    assert snap.descendants('project1', 'streamblock') == ['streamblock1']
+    assert snap.related(port, 'AffiliationPort-sources') == [dev]
+    assert snap.related(dev, 'AffiliationPort-targets') == [port]
@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+from stcrestclient import uploads
+
+
+@pytest.fixture
+def local(tmpdir):
+    """Return function that writes a local file and returns its path."""
+    def write(name, content):
+        path = str(tmpdir.join(name))
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+    return write
+
+
+def puts(emulator):
+    return emulator.stats().get('PUT files', 0)
+
+
+def test_dedup_same_name(emulator, stc, local):
+    path = local('config.xml', b'<config/>')
+    emulator.reset_stats()
+    first = stc.upload(path, dedup=True)
+    assert stc.upload(path, dedup=True) == first
+    assert puts(emulator) == 1
+    assert stc.upload_stats() == {'files': 1, 'hits': 1,
+                                  'bytes_skipped': 9}
+    # Without dedup, the file is always uploaded.
+    stc.upload(path)
+    assert puts(emulator) == 2
+
+
+def test_dedup_needs_same_name(emulator, stc, local):
+    a = local('a.xml', b'<config/>')
+    b = local('b.xml', b'<config/>')
+    emulator.reset_stats()
+    stc.upload(a, dedup=True)
+    assert stc.upload(b, dedup=True)['name'] == 'b.xml'
+    assert stc.upload(a, 'c.xml', dedup=True)['name'] == 'c.xml'
+    assert stc.upload(a, 'c.xml', dedup=True)['name'] == 'c.xml'
+    assert puts(emulator) == 3
+    assert stc.files() == ['a.xml', 'b.xml', 'c.xml']
+
+
+def test_changed_file_uploaded(emulator, stc, local):
+    path = local('config.xml', b'<config/>')
+    stc.upload(path, dedup=True)
+    local('config.xml', b'<config version="2"/>')
+    os.utime(path, (0, 0))
+    emulator.reset_stats()
+    stc.upload(path, dedup=True)
+    assert puts(emulator) == 1
+
+
+@pytest.mark.parametrize('call', [
+    lambda stc: stc.perform('SaveAsXml', FileName='config.xml'),
+    lambda stc: stc.bulkperform('DeviceCreateCommand',
+                                ParentList='project1'),
+])
+def test_forgotten_after_command(emulator, stc, local, call):
+    path = local('config.xml', b'<config/>')
+    stc.upload(path, dedup=True)
+    try:
+        call(stc)
+    except Exception:
+        # The command may replace the file even if it fails.
+        pass
+    emulator.reset_stats()
+    stc.upload(path, dedup=True)
+    assert puts(emulator) == 1
+
+
+def test_upload_files(emulator, stc, local):
+    srcs = [local('a.xml', b'same'), local('b.xml', b'same'),
+            local('c.xml', b'other')]
+    emulator.reset_stats()
+    results = stc.upload_files(srcs, parallel=2)
+    assert sorted(r['name'] for r in results.values()) == [
+        'a.xml', 'b.xml', 'c.xml']
+    assert stc.files() == ['a.xml', 'b.xml', 'c.xml']
+    assert puts(emulator) == 3
+
+    # Uploaded again, all are skipped.
+    results = stc.upload_files({srcs[0]: None, srcs[2]: 'd.xml',
+                                srcs[1]: 'b.xml'})
+    assert results[srcs[0]]['name'] == 'a.xml'
+    assert results[srcs[2]]['name'] == 'd.xml'
+    assert puts(emulator) == 4
+    assert stc.upload_stats()['hits'] == 2
+
+
+def test_upload_files_error(stc, local, tmpdir):
+    srcs = [local('a.xml', b'a'), str(tmpdir.join('missing.xml'))]
+    with pytest.raises(RuntimeError) as e:
+        stc.upload_files(srcs)
+    assert 'missing.xml' in str(e.value)
+
+
+def test_index(local):
+    index = uploads.UploadIndex()
+    path = local('a.xml', b'abc')
+    digest = index.digest(path)
+    assert digest == uploads.file_digest(path)
+    index.add(digest, {'name': 'a.xml'})
+    index.add(digest, {'name': 'b.xml'})
+    assert index.lookup(digest, 'a.xml', 3) == {'name': 'a.xml'}
+    assert index.lookup(digest, 'c.xml') is None
+
+    # Another file uploaded to the name replaces it.
+    index.add('other', {'name': 'a.xml'})
+    assert index.lookup(digest, 'a.xml') is None
+    index.discard_name('b.xml')
+    assert index.lookup(digest, 'b.xml') is None
+    assert index.stats() == {'files': 1, 'hits': 1, 'bytes_skipped': 3}
+    index.clear()
+    assert index.stats()['files'] == 0
@@ -0,0 +1,49 @@
+import pytest
+
+from stcrestclient import stchttp, validate
+
+
+@pytest.mark.parametrize('attr_type,value', [
+    ('u16', '08'), ('u32', '007'), ('u8', '0'), ('u8', '255'),
+    ('u32', '0x1f'), ('u32', '0XFF'), ('s8', '-0x80'), ('s16', '-08'),
+    ('u16', '1 02 3'), ('u32', 7), ('bool', 'TRUE'), ('bool', False),
+    ('ip', '10.0.0.1'), ('mac', '00:10:94:00:00:01'), ('string', 'x y'),
+])
+def test_valid_value(attr_type, value):
+    assert validate.valid_value(attr_type, value)
+
+
+@pytest.mark.parametrize('attr_type,value', [
+    ('u8', '256'), ('u8', '-1'), ('u16', '0x10000'), ('u32', '1.5'),
+    ('u32', 'abc'), ('u32', '0b11'), ('s8', '128'), ('bool', 'yes'),
+    ('ip', '10.0.0.256'), ('ip', '10.0.0'), ('mac', '00:10:94:00:00'),
+])
+def test_invalid_value(attr_type, value):
+    assert not validate.valid_value(attr_type, value)
+
+
+def test_handle_type():
+    assert validate.handle_type('port1') == 'port'
+    assert validate.handle_type('emulateddevice1.ipv4if') == 'ipv4if'
+    assert validate.handle_type(
+        '//emulateddevice[@name="dev 1"]/bgprouterconfig') == \
+        'bgprouterconfig'
+    assert validate.handle_type('port1 port2') is None
+
+
+def test_client_validation(emulator, stc):
+    stc.set_validation(True)
+    port = stc.create('port', 'project1', Location='//10.1.1.1/1/1')
+    dev = stc.create('EmulatedDevice', 'project1', DeviceCount='008')
+    stc.config(dev, {'RouterId': '192.0.2.1', 'AffiliationPort-targets':
+                     port})
+    emulator.reset_stats()
+    with pytest.raises(validate.ValidationError) as e:
+        stc.createx('port', 'project1', NoSuchAttr='1')
+    assert 'NoSuchAttr' in str(e.value)
+    with pytest.raises(validate.ValidationError):
+        stc.config(dev, DeviceCount='-1')
+    with pytest.raises(validate.ValidationError):
+        stc.createx('NoSuchType', 'project1')
+    sent = emulator.stats()
+    assert not sent.get('POST objects') and not sent.get('PUT objects')